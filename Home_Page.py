@@ -5,15 +5,14 @@ st.set_page_config(
 )
 
 st.sidebar.success("Select a model above")
-st.session_state["features"] = None
-st.session_state["targets"] = None
-st.session_state["data"] = None
+st.session_state["dataset"] = None
 
 st.header("Instruction")
 
 st.write(""" 
 1. Head to EDA page to get you data assessed
 2. Head to the page with the model you want to try. For now you can choose only the baseline model.
+    If the file is too large to fit in memory, use the Out-of-Core Baseline page: it streams the file in chunks
 3. After you train you model you can donwload it neatly packed in a zip archive with all the necessary
      things for running you own streamlit inference application
 4. Unzip the archive as a folder, open the folder directory in terminal and run 
@@ -64,5 +63,21 @@ st.write("""
         ```bash
         streamlit run interface.py
         ```
+
+6. To score files without the browser (e.g. in nightly jobs), run the command line tool from the same folder.
+    It splits the files into chunks, scores them on all cores and reports rows per second
+
+    ```bash
+    python batch_predict.py "data/*.csv" --text-columns text title --target-column target --output-dir results --format csv
+    ```
+
+7. To let other services query the model, start the local HTTP server. It merges concurrent requests into micro batches
+    (`--max-batch-size`, `--max-wait-ms`) and answers `POST /predict` with `{"text": "..."}` or `{"texts": [...]}`
+    (add `"proba": true` to get class probabilities). `load_test.py` measures its latency and throughput
+
+    ```bash
+    python server.py --port 8000 --max-batch-size 256 --max-wait-ms 5
+    python load_test.py --url http://127.0.0.1:8000/predict --concurrency 16 --requests 2000
+    ```
 """)
 
@@ -0,0 +1,272 @@
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+import zipfile
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import pandas as pd
+import sklearn
+
+from benchmarks.synthetic import generate_corpus
+from core.Dataset import PandasDataset
+from core.parallel_utils import CORES_VARIABLE, available_cores
+from pipelines.build_tfidf_logreg import build_tfidf_logreg
+from pipelines.oof_cache import clear_cache
+from utils.constants import THRESHOLD
+from utils.data_utils import analyse_data_annotation, clean_duplicates, clean_relevant_duplicates, return_text_and_targets
+from utils.home_utils import create_app
+from utils.profile_utils import profile_data
+
+ROOT = Path(__file__).parent.parent
+PATH_TO_TEMPLATE = ROOT / "streamlit_templates" / "text_classification"
+PATH_TO_CORE = ROOT / "core"
+PARALLEL_STAGES = ("analyse_data_annotation", "build_tfidf_logreg")
+
+
+def measure(function: Callable[[], Any], repeat: int, memory: bool, setup: Optional[Callable[[], None]] = None) -> Dict[str, float]:
+    """
+    times a function and records its peak python memory
+
+    Timing runs are done without tracemalloc, because tracing slows python code down,
+    peak memory is measured in one extra run
+
+    :param function: function without arguments
+    :param repeat: number of timed runs, the fastest one is reported
+    :param memory: whether to measure peak memory
+    :param setup: function called before every run, e.g. to drop caches
+
+    :return dictionary with seconds and peak_mb
+    """
+    timings = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+
+    result = {"seconds": min(timings), "peak_mb": None}
+
+    if memory:
+        if setup is not None:
+            setup()
+        tracemalloc.start()
+        try:
+            function()
+            result["peak_mb"] = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        finally:
+            tracemalloc.stop()
+
+    return result
+
+
+def load_exported_model(path: str) -> Any:
+    """
+    imports Model class from the unpacked application and loads the model in it
+
+    :param path: folder with unpacked application archive
+
+    :return Model instance
+    """
+    spec = importlib.util.spec_from_file_location("exported_model", os.path.join(path, "Model.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    model_path = os.path.join(path, "model")
+    if not os.path.isdir(model_path):
+        model_path = os.path.join(path, "model.joblib")
+    return module.Model(path=model_path)
+
+
+def run_size(rows: int, args: argparse.Namespace, workdir: str) -> List[Dict[str, Any]]:
+    """
+    runs every stage on one synthetic dataset
+
+    :param rows: number of rows in the dataset
+    :param args: command line arguments
+    :param workdir: temporary folder for files written by the stages
+
+    :return list of results, one per stage
+    """
+    df = generate_corpus(
+        rows=rows,
+        classes=args.classes,
+        imbalance=args.imbalance,
+        text_length=args.text_length,
+        text_columns=args.text_columns,
+        duplicate_rate=args.duplicate_rate,
+        seed=args.seed
+    )
+    text_columns = [column for column in df.columns if column != "target"]
+    path = os.path.join(workdir, f"corpus_{rows}.csv")
+    df.to_csv(path, index=False)
+
+    def load() -> pd.DataFrame:
+        with open(path, "rb") as fileobject:
+            return PandasDataset(fileobject).data
+
+    _, _, deduplicated = clean_duplicates(df)
+    _, _, relevant = clean_relevant_duplicates(df=deduplicated, text_columns=text_columns, target_column="target")
+    X, y = return_text_and_targets(df=relevant, text_columns=text_columns, target_column="target")
+    _, _, _, model = build_tfidf_logreg(X=X, y=y)
+
+    stages = [
+        ("PandasDataset", load, None),
+        ("clean_duplicates", lambda: clean_duplicates(df), None),
+        ("clean_relevant_duplicates",
+         lambda: clean_relevant_duplicates(df=deduplicated, text_columns=text_columns, target_column="target"), None),
+        ("profile_data",
+         lambda: profile_data(df=df, text_columns=text_columns, target_column="target", threshold=THRESHOLD), None),
+        ("analyse_data_annotation", lambda: analyse_data_annotation(X=X, y=y), clear_cache),
+        ("build_tfidf_logreg", lambda: build_tfidf_logreg(X=X, y=y), clear_cache),
+        ("create_app", lambda: create_app(
+            model=model,
+            log={},
+            path_to_template=PATH_TO_TEMPLATE.as_posix(),
+            path_to_core=PATH_TO_CORE.as_posix()
+        ), None),
+    ]
+
+    results = []
+    for stage, function, setup in stages:
+        if args.stages and stage not in args.stages:
+            continue
+        for cores in args.cores if stage in PARALLEL_STAGES else [args.cores[-1]]:
+            os.environ[CORES_VARIABLE] = str(cores)
+            try:
+                results.append({
+                    "stage": stage, "rows": rows, "cores": cores, **measure(function, args.repeat, args.memory, setup)
+                })
+            finally:
+                os.environ.pop(CORES_VARIABLE, None)
+            print(f"{stage:<28}{rows:>10} rows {cores:>4} cores {results[-1]['seconds']:>10.3f}s", file=sys.stderr)
+
+    if not args.stages or "Model.predict" in args.stages:
+        app_dir = os.path.join(workdir, f"application_{rows}")
+        application = create_app(
+            model=model, log={}, path_to_template=PATH_TO_TEMPLATE.as_posix(), path_to_core=PATH_TO_CORE.as_posix()
+        )
+        with zipfile.ZipFile(application) as archive:
+            archive.extractall(app_dir)
+        exported = load_exported_model(app_dir)
+
+        results.append({
+            "stage": "Model.predict",
+            "rows": rows,
+            "cores": args.cores[-1],
+            **measure(
+                lambda: exported.predict(df.copy(), text_columns=text_columns, target_column="prediction"),
+                args.repeat,
+                args.memory,
+                setup=exported.cache.clear
+            )
+        })
+        print(f"{'Model.predict':<28}{rows:>10} rows {args.cores[-1]:>4} cores {results[-1]['seconds']:>10.3f}s", file=sys.stderr)
+
+    return results
+
+
+def compare(
+    results: List[Dict[str, Any]],
+    baseline: List[Dict[str, Any]],
+    tolerance: float,
+    min_delta: float
+    ) -> pd.DataFrame:
+    """
+    compares results with a stored baseline
+
+    :param results: results of this run
+    :param baseline: results of a previous run
+    :param tolerance: slowdown ratio above which a stage counts as a regression
+    :param min_delta: slowdowns shorter than this number of seconds are treated as noise
+
+    :return dataframe with timings of both runs, their ratio and regression flag
+    """
+    current = pd.DataFrame(results).set_index(["stage", "rows", "cores"])
+    previous = pd.DataFrame(baseline)
+    if "cores" not in previous.columns:
+        # runs recorded before --cores used all the cores
+        previous["cores"] = available_cores()
+    previous = previous.set_index(["stage", "rows", "cores"])
+
+    comparison = current[["seconds", "peak_mb"]].join(
+        previous[["seconds", "peak_mb"]], rsuffix="_baseline", how="inner"
+    )
+    comparison["ratio"] = comparison["seconds"] / comparison["seconds_baseline"]
+    comparison["regression"] = (comparison["ratio"] > tolerance) & (
+        comparison["seconds"] - comparison["seconds_baseline"] > min_delta
+    )
+    return comparison
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+
+    parser = argparse.ArgumentParser(description="Times the pipeline stages on synthetic data of growing size")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 50000], help="dataset sizes")
+    parser.add_argument("--classes", type=int, default=5)
+    parser.add_argument("--imbalance", type=float, default=5, help="ratio between the largest and the smallest class")
+    parser.add_argument("--text-length", type=int, default=30, help="mean number of words in a text column")
+    parser.add_argument("--text-columns", type=int, default=2)
+    parser.add_argument("--duplicate-rate", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--stages", nargs="+", help="run only these stages")
+    parser.add_argument("--cores", type=int, nargs="+", default=[available_cores()],
+                        help="core counts to run cross validated stages with, e.g. 1 2 8 32")
+    parser.add_argument("--repeat", type=int, default=1, help="timed runs per stage, the fastest is reported")
+    parser.add_argument("--no-memory", dest="memory", action="store_false", help="skip peak memory measurement")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", help="json written by a previous run to compare with")
+    parser.add_argument("--tolerance", type=float, default=1.25, help="slowdown ratio reported as a regression")
+    parser.add_argument("--min-delta", type=float, default=0.05, help="slowdowns shorter than this (seconds) are ignored")
+    args = parser.parse_args(argv)
+
+    skipped = [cores for cores in args.cores if cores > available_cores()]
+    if skipped:
+        print(f"Skipping {skipped} cores, only {available_cores()} available", file=sys.stderr)
+    args.cores = sorted(cores for cores in args.cores if cores <= available_cores()) or [available_cores()]
+
+    warnings.filterwarnings("ignore")
+    results = []
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for rows in args.rows:
+            results.extend(run_size(rows, args, workdir))
+
+    report = {
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "available_cores": available_cores(),
+            "pandas": pd.__version__,
+            "scikit-learn": sklearn.__version__,
+        },
+        "config": {name: value for name, value in vars(args).items() if name not in ("output", "baseline")},
+        "results": results
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=4)
+    print(f"Results written to {args.output}", file=sys.stderr)
+    print(pd.DataFrame(results).pivot(index=["stage", "cores"], columns="rows", values="seconds").to_string(float_format="{:.3f}".format))
+
+    if args.baseline is None:
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)["results"]
+
+    comparison = compare(results, baseline, args.tolerance, args.min_delta)
+    print(comparison.to_string(float_format="{:.3f}".format))
+    return int(comparison["regression"].any())
+
+
+if __name__ == '__main__':
+    sys.exit(main())
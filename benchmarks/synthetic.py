@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+from typing import List
+
+ALPHABET = np.array(list("abcdefghijklmnopqrstuvwxyz"))
+
+
+def make_vocabulary(size: int, seed: int = 0) -> List[str]:
+    """
+    creates pronounceable-looking unique pseudo words
+
+    :param size: number of words
+    :param seed: random seed
+
+    :return list of words
+    """
+    rng = np.random.default_rng(seed)
+    words = set()
+    while len(words) < size:
+        lengths = rng.integers(2, 10, size=size)
+        letters = rng.choice(ALPHABET, size=(size, 9))
+        words.update("".join(row[:length]) for row, length in zip(letters, lengths))
+    return sorted(words)[:size]
+
+
+def class_proportions(classes: int, imbalance: float) -> np.ndarray:
+    """
+    geometric class distribution where the most frequent class is `imbalance` times larger than the rarest
+
+    :param classes: number of classes
+    :param imbalance: ratio between the largest and the smallest class, 1 means balanced
+
+    :return array of probabilities
+    """
+    if classes == 1:
+        return np.ones(1)
+    proportions = imbalance ** (-np.arange(classes) / (classes - 1))
+    return proportions / proportions.sum()
+
+
+def generate_corpus(
+    rows: int = 10000,
+    classes: int = 5,
+    imbalance: float = 1.0,
+    text_length: int = 30,
+    text_columns: int = 1,
+    duplicate_rate: float = 0.0,
+    vocabulary_size: int = 20000,
+    topic_share: float = 0.3,
+    seed: int = 0
+    ) -> pd.DataFrame:
+    """
+    generates deterministic synthetic text classification dataset
+
+    Words follow a Zipf distribution shared by all classes, `topic_share` of the words in every text
+    come from a class-specific part of the vocabulary, so the task is learnable but not trivial
+
+    :param rows: number of rows
+    :param classes: number of classes
+    :param imbalance: ratio between the largest and the smallest class
+    :param text_length: mean number of words in one text column
+    :param text_columns: number of text columns, named text_0, text_1, ...
+    :param duplicate_rate: share of rows that are exact copies of other rows
+    :param vocabulary_size: number of distinct words
+    :param topic_share: share of class-specific words in a text
+    :param seed: random seed, the same arguments always give the same dataframe
+
+    :return dataframe with text columns and `target` column
+
+    Example
+
+    >>> generate_corpus(rows=3, classes=2, text_length=3)
+                             text_0   target
+        0  aeghvypjk aekpuwhhi hhcxzdgz  class_1
+        1              aa hramnmq aaafc  class_1
+        2     ivkiqpnd buoevds dobwocqv  class_0
+    """
+    rng = np.random.default_rng(seed)
+    vocabulary = np.array(make_vocabulary(vocabulary_size, seed=seed), dtype=object)
+
+    zipf = 1 / np.arange(1, vocabulary_size + 1)
+    zipf /= zipf.sum()
+    topic_size = max(vocabulary_size // (classes * 4), 1)
+    topics = rng.permutation(vocabulary_size)[:classes * topic_size].reshape(classes, topic_size)
+
+    unique_rows = rows - int(rows * duplicate_rate)
+    labels = rng.choice(classes, size=unique_rows, p=class_proportions(classes, imbalance))
+
+    df = pd.DataFrame({'target': np.array([f"class_{label}" for label in range(classes)], dtype=object)[labels]})
+
+    for column in range(text_columns):
+        lengths = np.maximum(rng.poisson(text_length, size=unique_rows), 1)
+        total = lengths.sum()
+        words = rng.choice(vocabulary_size, size=total, p=zipf)
+
+        owners = np.repeat(labels, lengths)
+        topical = rng.random(total) < topic_share
+        words[topical] = topics[owners[topical], rng.integers(0, topic_size, size=topical.sum())]
+
+        tokens = vocabulary[words]
+        bounds = np.concatenate([[0], np.cumsum(lengths)])
+        df.insert(column, f"text_{column}", [" ".join(tokens[start:end]) for start, end in zip(bounds[:-1], bounds[1:])])
+
+    if unique_rows < rows:
+        copies = df.iloc[rng.integers(0, unique_rows, size=rows - unique_rows)]
+        df = pd.concat([df, copies], ignore_index=True)
+        df = df.iloc[rng.permutation(rows)].reset_index(drop=True)
+
+    return df
@@ -1,14 +1,37 @@
 import joblib
 import pandas as pd
-from typing import List
+from typing import Iterable, Iterator, List
+from core.text_utils import assemble_text
 
 
 class BaseCLFModel:
+
+    batch_size = 10000
     
-    def predict(self, df: pd.DataFrame, text_columns: List[str], target_column: str) -> pd.DataFrame:
+    def predict(self, df: pd.DataFrame, text_columns: List[str], target_column: str, explain: int = 0) -> pd.DataFrame:
         
         return NotImplementedError
 
+    def predict_chunks(
+        self,
+        chunks: Iterable[pd.DataFrame],
+        text_columns: List[str],
+        target_column: str,
+        explain: int = 0
+        ) -> Iterator[pd.DataFrame]:
+        """
+        runs inference chunk by chunk, so only one chunk is kept in memory at a time
+
+        :param chunks: iterable of dataframes for inference
+        :param text_columns: list of column names where relevant text data is stored
+        :param target_column: target name
+        :param explain: number of top contributing terms added to every prediction, 0 for none
+
+        :return iterator of dataframes with predictions
+        """
+        for chunk in chunks:
+            yield self.predict(df=chunk, text_columns=text_columns, target_column=target_column, explain=explain)
+
     @staticmethod
     def return_text(df: pd.DataFrame, text_columns: List[str]) -> pd.Series:
         """
@@ -19,22 +42,4 @@ class BaseCLFModel:
         
         :return pd.Series with all textual information in rows
         """
-        text_all = []
-
-        text_columns_amount = len(text_columns)
-
-        if text_columns_amount == 0:
-            raise ValueError("There is no text colums specified")
-
-        elif text_columns_amount == 1:
-            text_all = df[text_columns[0]].to_list()
-
-        else:
-            
-            df_text = df[text_columns]
-            df_text = df_text.applymap(
-                lambda x: '' if not isinstance(x, str) else x
-            )
-            text_all = df_text.agg(' '.join, axis=1)
-
-        return pd.Series(text_all)
\ No newline at end of file
+        return assemble_text(df=df, text_columns=text_columns)
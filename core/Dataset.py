@@ -1,25 +1,78 @@
+import itertools
 import os
-from typing import BinaryIO
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional
 
+import openpyxl
 import pandas as pd
 
+try:
+    import pyarrow
+    import pyarrow.csv
+    import pyarrow.feather
+    import pyarrow.ipc
+    import pyarrow.json
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+try:
+    import python_calamine
+except ImportError:
+    python_calamine = None
+
+SUPPORTED_EXTENSIONS = ["csv", "tsv", "xls", "xlsx", "parquet", "feather", "arrow", "jsonl"]
+PREVIEW_ROWS = 1000
+STRING_DTYPES = (str, "str", "string", "string[pyarrow]", "string[python]")
+ARROW_STRING_TYPES = {
+    pyarrow.string(): pd.StringDtype("pyarrow"),
+    pyarrow.large_string(): pd.StringDtype("pyarrow"),
+} if pyarrow is not None else {}
+
 
 class PandasDataset:
     """
     Dataset class that allows you to convert multiple formats to 1
+
+    Reading can be restricted to a few columns (with explicit dtypes) and to the first rows,
+    so wide files can be previewed first and then loaded with only the columns that matter
     """
 
-    def __init__(self, df_object: BinaryIO):
+    def __init__(
+        self,
+        df_object: BinaryIO,
+        columns: Optional[List[str]] = None,
+        nrows: Optional[int] = None,
+        dtype: Optional[Dict[str, Any]] = None
+        ):
+
+        self.columns = columns
+        self.nrows = nrows
+        self.dtype = dtype
 
         self.valid_data_types = {
             '.csv': self._read_csv,
             '.tsv': self._read_csv,
             '.xls': self._read_excel,
             '.xlsx': self._read_excel,
+            '.parquet': self._read_parquet,
+            '.feather': self._read_feather,
+            '.arrow': self._read_feather,
+            '.jsonl': self._read_jsonl,
         }
 
         self.data = self.read_data(fileobject=df_object)
 
+    @classmethod
+    def preview(cls, df_object: BinaryIO, nrows: int = PREVIEW_ROWS) -> "PandasDataset":
+        """
+        Reads only the header and the first rows of the file
+
+        :param df_object: file to preview
+        :param nrows: number of rows to read
+        :return: dataset with a sample of the data
+        """
+        return cls(df_object, nrows=nrows)
+
     def read_data(self, fileobject: BinaryIO) -> pd.DataFrame:
         """
         Given the path to the file returns extension of that file
@@ -30,16 +83,31 @@ class PandasDataset:
         """
         path = fileobject.name
         _, extension = os.path.splitext(path)
-        if extension.lower() in self.valid_data_types:
-            return self.valid_data_types[extension](fileobject=fileobject, extension=extension)
+        extension = extension.lower()
+        if extension in self.valid_data_types:
+            if hasattr(fileobject, 'seek'):
+                fileobject.seek(0)
+            return self.valid_data_types[extension](
+                fileobject=fileobject,
+                extension=extension,
+                columns=self.columns,
+                nrows=self.nrows,
+                dtype=self.dtype
+            )
         else:
             raise ValueError(f"Your data type ({extension}) is not supported, please convert your dataset "
                              f"to one of the following formats {list(self.valid_data_types.keys())}.")
 
     @staticmethod
-    def _read_csv(fileobject: BinaryIO, extension: str) -> pd.DataFrame:
+    def _read_csv(
+        fileobject: BinaryIO,
+        extension: str,
+        columns: Optional[List[str]] = None,
+        nrows: Optional[int] = None,
+        dtype: Optional[Dict[str, Any]] = None
+        ) -> pd.DataFrame:
         """
-        Reads a csv file given its path
+        Reads a csv file given its path, with multithreaded pyarrow parser when it is installed
         :param path: "../../some_file.csv"
         :return: dataframe
         """
@@ -47,17 +115,343 @@ class PandasDataset:
         if extension == '.tsv':
             sep = '\t'
 
-        return pd.read_csv(filepath_or_buffer=fileobject, sep=sep, encoding="utf-8")
+        # pyarrow parser can't stop after nrows, previews are cheaper with the C engine
+        if pyarrow is not None and nrows is None:
+            try:
+                return PandasDataset._read_csv_arrow(fileobject=fileobject, sep=sep, columns=columns, dtype=dtype)
+            except pyarrow.ArrowInvalid:
+                fileobject.seek(0)
+
+        df = pd.read_csv(
+            filepath_or_buffer=fileobject, sep=sep, encoding="utf-8", usecols=columns, nrows=nrows, dtype=dtype
+        )
+        return PandasDataset._to_arrow_strings(df) if pyarrow is not None else df
 
     @staticmethod
-    def _read_excel(fileobject: BinaryIO, extension: str) -> pd.DataFrame:
+    def _read_csv_arrow(
+        fileobject: BinaryIO,
+        sep: str,
+        columns: Optional[List[str]] = None,
+        dtype: Optional[Dict[str, Any]] = None
+        ) -> pd.DataFrame:
         """
-        Reads a xls or xlsx file given its path
+        Reads a csv file with multithreaded pyarrow parser, columns requested as strings are never type-inferred
+        :param path: "../../some_file.csv"
+        :return: dataframe
+        """
+        dtype = dtype or {}
+        string_columns = {column for column, column_type in dtype.items() if column_type in STRING_DTYPES}
+
+        table = pyarrow.csv.read_csv(
+            fileobject,
+            parse_options=pyarrow.csv.ParseOptions(delimiter=sep),
+            convert_options=pyarrow.csv.ConvertOptions(
+                include_columns=columns,
+                column_types={column: pyarrow.string() for column in string_columns},
+                strings_can_be_null=True,
+            )
+        )
+        df = PandasDataset._to_pandas(table)
+
+        return PandasDataset._select(df=df, dtype={k: v for k, v in dtype.items() if k not in string_columns})
+
+    @staticmethod
+    def _read_excel(
+        fileobject: BinaryIO,
+        extension: str,
+        columns: Optional[List[str]] = None,
+        nrows: Optional[int] = None,
+        dtype: Optional[Dict[str, Any]] = None
+        ) -> pd.DataFrame:
+        """
+        Reads a xls or xlsx file given its path, with calamine engine when it is installed
         :param path: "../../some_file.xlsx"
         :return: dataframe
         """
         engine = 'openpyxl'
         if extension == '.xls':
             engine = None
+        if python_calamine is not None:
+            engine = 'calamine'
+
+        return pd.read_excel(io=fileobject, engine=engine, usecols=columns, nrows=nrows, dtype=dtype)
+
+    @staticmethod
+    def _read_parquet(
+        fileobject: BinaryIO,
+        extension: str,
+        columns: Optional[List[str]] = None,
+        nrows: Optional[int] = None,
+        dtype: Optional[Dict[str, Any]] = None
+        ) -> pd.DataFrame:
+        """
+        Reads a parquet file given its path
+        :param path: "../../some_file.parquet"
+        :return: dataframe
+        """
+        PandasDataset._require_pyarrow(extension=extension)
+
+        if nrows is None:
+            table = pyarrow.parquet.read_table(fileobject, columns=columns)
+        else:
+            parquet_file = pyarrow.parquet.ParquetFile(fileobject)
+            table = next(parquet_file.iter_batches(batch_size=nrows, columns=columns), None)
+            if table is None:
+                table = parquet_file.schema_arrow.empty_table()
+                table = table.select(columns) if columns is not None else table
+
+        return PandasDataset._select(df=PandasDataset._to_pandas(table), dtype=dtype)
+
+    @staticmethod
+    def _read_feather(
+        fileobject: BinaryIO,
+        extension: str,
+        columns: Optional[List[str]] = None,
+        nrows: Optional[int] = None,
+        dtype: Optional[Dict[str, Any]] = None
+        ) -> pd.DataFrame:
+        """
+        Reads a feather or arrow IPC file given its path
+        :param path: "../../some_file.feather"
+        :return: dataframe
+        """
+        PandasDataset._require_pyarrow(extension=extension)
+
+        table = pyarrow.feather.read_table(fileobject, columns=columns)
+        if nrows is not None:
+            table = table.slice(0, nrows)
+
+        return PandasDataset._select(df=PandasDataset._to_pandas(table), dtype=dtype)
+
+    @staticmethod
+    def _read_jsonl(
+        fileobject: BinaryIO,
+        extension: str,
+        columns: Optional[List[str]] = None,
+        nrows: Optional[int] = None,
+        dtype: Optional[Dict[str, Any]] = None
+        ) -> pd.DataFrame:
+        """
+        Reads a JSON Lines file given its path, with multithreaded pyarrow parser when it is installed
+        :param path: "../../some_file.jsonl"
+        :return: dataframe
+        """
+        # pyarrow parser can't stop after nrows and fails on columns of mixed types
+        if pyarrow is not None and nrows is None:
+            try:
+                df = PandasDataset._to_pandas(pyarrow.json.read_json(fileobject))
+                return PandasDataset._select(df=df, columns=columns, dtype=dtype)
+            except pyarrow.ArrowInvalid:
+                fileobject.seek(0)
+
+        df = pd.read_json(fileobject, lines=True, encoding="utf-8", nrows=nrows)
+        return PandasDataset._select(df=df, columns=columns, dtype=dtype)
+
+    @staticmethod
+    def _select(
+        df: pd.DataFrame,
+        columns: Optional[List[str]] = None,
+        dtype: Optional[Dict[str, Any]] = None
+        ) -> pd.DataFrame:
+        """
+        Keeps only the requested columns and casts them, for readers that can't do it while parsing
+        :param df: dataframe
+        :return: dataframe
+        """
+        if columns is not None:
+            df = df[columns]
+        if dtype:
+            # arrow-backed strings are already strings, casting them to "string" would copy them to python objects
+            dtype = {
+                column: column_type for column, column_type in dtype.items()
+                if not (column_type in STRING_DTYPES and isinstance(df[column].dtype, pd.StringDtype))
+            }
+            df = df.astype(dtype)
+        return df
+
+    @staticmethod
+    def _require_pyarrow(extension: str) -> None:
+        if pyarrow is None:
+            raise ValueError(f"Reading {extension} files requires pyarrow, please install it or convert "
+                             f"your dataset to csv.")
+
+    @staticmethod
+    def _to_pandas(table: "pyarrow.Table") -> pd.DataFrame:
+        """
+        Converts an arrow table or record batch, strings go straight to arrow-backed string columns
+        instead of python objects that would have to be converted once more
+        :param table: arrow table or record batch
+        :return: dataframe
+        """
+        return table.to_pandas(types_mapper=ARROW_STRING_TYPES.get)
+
+    @staticmethod
+    def _to_arrow_strings(df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Stores text columns as arrow-backed strings instead of python objects
+        :param df: dataframe
+        :return: dataframe
+        """
+        text_columns = df.select_dtypes(include="object").columns
+        if len(text_columns):
+            df = df.astype({column: "string[pyarrow]" for column in text_columns})
+        return df
+
+
+class ChunkedPandasDataset(PandasDataset):
+    """
+    Dataset class that reads multiple formats in chunks of rows, so files of any size can be processed
+    with constant memory. `data` is an iterator of dataframes
+    """
+
+    def __init__(
+        self,
+        df_object: BinaryIO,
+        chunksize: int,
+        columns: Optional[List[str]] = None,
+        nrows: Optional[int] = None,
+        dtype: Optional[Dict[str, Any]] = None
+        ):
+
+        self.chunksize = chunksize
+        super().__init__(df_object=df_object, columns=columns, nrows=nrows, dtype=dtype)
+
+    def _read_csv(
+        self,
+        fileobject: BinaryIO,
+        extension: str,
+        columns: Optional[List[str]] = None,
+        nrows: Optional[int] = None,
+        dtype: Optional[Dict[str, Any]] = None
+        ) -> Iterator[pd.DataFrame]:
+        """
+        Reads a csv file chunk by chunk
+        :param path: "../../some_file.csv"
+        :return: iterator of dataframes
+        """
+        sep = ','
+        if extension == '.tsv':
+            sep = '\t'
+
+        with pd.read_csv(
+            filepath_or_buffer=fileobject, sep=sep, encoding="utf-8", chunksize=self.chunksize,
+            usecols=columns, nrows=nrows, dtype=dtype
+        ) as reader:
+            yield from reader
+
+    def _read_excel(
+        self,
+        fileobject: BinaryIO,
+        extension: str,
+        columns: Optional[List[str]] = None,
+        nrows: Optional[int] = None,
+        dtype: Optional[Dict[str, Any]] = None
+        ) -> Iterator[pd.DataFrame]:
+        """
+        Reads a xlsx file row by row in read-only mode, xls files can't be streamed and are read at once
+        :param path: "../../some_file.xlsx"
+        :return: iterator of dataframes
+        """
+        if extension == '.xls':
+            df = super()._read_excel(fileobject=fileobject, extension=extension, columns=columns, nrows=nrows, dtype=dtype)
+            for start in range(0, len(df), self.chunksize):
+                yield df.iloc[start:start + self.chunksize]
+            return
+
+        workbook = openpyxl.load_workbook(fileobject, read_only=True, data_only=True)
+        try:
+            rows = workbook.worksheets[0].iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                return
+            if nrows is not None:
+                rows = itertools.islice(rows, nrows)
+
+            batch = []
+            for row in rows:
+                batch.append(row)
+                if len(batch) == self.chunksize:
+                    yield self._select(df=pd.DataFrame(batch, columns=header), columns=columns, dtype=dtype)
+                    batch = []
+            if batch:
+                yield self._select(df=pd.DataFrame(batch, columns=header), columns=columns, dtype=dtype)
+        finally:
+            workbook.close()
+
+    def _read_parquet(
+        self,
+        fileobject: BinaryIO,
+        extension: str,
+        columns: Optional[List[str]] = None,
+        nrows: Optional[int] = None,
+        dtype: Optional[Dict[str, Any]] = None
+        ) -> Iterator[pd.DataFrame]:
+        """
+        Reads a parquet file batch by batch
+        :param path: "../../some_file.parquet"
+        :return: iterator of dataframes
+        """
+        self._require_pyarrow(extension=extension)
+        batches = pyarrow.parquet.ParquetFile(fileobject).iter_batches(batch_size=self.chunksize, columns=columns)
+        for df in self._limit_rows((self._to_pandas(batch) for batch in batches), nrows=nrows):
+            yield self._select(df=df, dtype=dtype)
 
-        return pd.read_excel(io=fileobject, engine=engine)
+    def _read_feather(
+        self,
+        fileobject: BinaryIO,
+        extension: str,
+        columns: Optional[List[str]] = None,
+        nrows: Optional[int] = None,
+        dtype: Optional[Dict[str, Any]] = None
+        ) -> Iterator[pd.DataFrame]:
+        """
+        Reads a feather or arrow IPC file record batch by record batch
+        :param path: "../../some_file.feather"
+        :return: iterator of dataframes
+        """
+        self._require_pyarrow(extension=extension)
+        reader = pyarrow.ipc.open_file(fileobject)
+
+        def batches() -> Iterator[pd.DataFrame]:
+            for i in range(reader.num_record_batches):
+                batch = reader.get_batch(i)
+                if columns is not None:
+                    batch = batch.select(columns)
+                for start in range(0, batch.num_rows, self.chunksize):
+                    yield self._to_pandas(batch.slice(start, self.chunksize))
+
+        for df in self._limit_rows(batches(), nrows=nrows):
+            yield self._select(df=df, dtype=dtype)
+
+    def _read_jsonl(
+        self,
+        fileobject: BinaryIO,
+        extension: str,
+        columns: Optional[List[str]] = None,
+        nrows: Optional[int] = None,
+        dtype: Optional[Dict[str, Any]] = None
+        ) -> Iterator[pd.DataFrame]:
+        """
+        Reads a JSON Lines file chunk by chunk
+        :param path: "../../some_file.jsonl"
+        :return: iterator of dataframes
+        """
+        with pd.read_json(fileobject, lines=True, encoding="utf-8", chunksize=self.chunksize) as reader:
+            for df in self._limit_rows(reader, nrows=nrows):
+                yield self._select(df=df, columns=columns, dtype=dtype)
+
+    @staticmethod
+    def _limit_rows(chunks: Iterator[pd.DataFrame], nrows: Optional[int]) -> Iterator[pd.DataFrame]:
+        """
+        Stops iteration after nrows rows
+        :param chunks: iterator of dataframes
+        :return: iterator of dataframes
+        """
+        remaining = nrows
+        for chunk in chunks:
+            if remaining is not None:
+                if remaining <= 0:
+                    return
+                chunk = chunk.iloc[:remaining]
+                remaining -= len(chunk)
+            yield chunk
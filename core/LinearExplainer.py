@@ -0,0 +1,160 @@
+from typing import Any, Iterable, Tuple
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from sklearn.pipeline import Pipeline
+
+from core.ModelArtifact import ModelArtifact
+
+
+class LinearExplainer:
+    """
+    Explains predictions of a linear model on top of a vectoriser for whole batches at once.
+
+    The contribution of a term to a prediction is its tf-idf value times the coefficient of the predicted class.
+    All contributions of a batch are one element-wise product over the non-zero entries of the sparse matrix,
+    the top terms of every row come from a single sort, so explaining costs about as much as predicting
+    """
+
+    def __init__(self, model: Any):
+        """
+        :param model: fitted sklearn pipeline whose last step has `coef_` and whose previous steps
+                      give feature names, or ModelArtifact, see `supports`
+        """
+        if isinstance(model, ModelArtifact):
+            self.transform = model.transform
+            self.feature_names = model.get_feature_names_out()
+            coef, intercept = model.coef, model.intercept
+        else:
+            self.transform = model[:-1].transform
+            self.feature_names = np.asarray(model[:-1].get_feature_names_out(), dtype=object)
+            coef, intercept = model[-1].coef_, model[-1].intercept_
+
+        self.classes = np.asarray(model.classes_)
+        self.coef = sp.csr_matrix(coef) if sp.issparse(coef) else np.asarray(coef)
+        self.intercept = np.asarray(intercept)
+
+    @staticmethod
+    def supports(model: Any) -> bool:
+        """
+        checks that the model is linear and its features have names
+
+        :param model: fitted model
+
+        :return True if the model can be explained
+        """
+        if isinstance(model, ModelArtifact):
+            return True
+        if not isinstance(model, Pipeline) or not hasattr(model[-1], "coef_"):
+            return False
+        try:
+            model[:-1].get_feature_names_out()
+        except (AttributeError, ValueError):
+            return False
+        return True
+
+    def class_coef(self, class_index: np.ndarray, columns: np.ndarray) -> np.ndarray:
+        """
+        picks coefficients of given classes for given features, binary models support the negative class
+        with negated coefficients
+
+        :param class_index: indices of the classes in `self.classes`
+        :param columns: feature indices, one per class index
+
+        :return array of coefficients
+        """
+        binary = self.coef.shape[0] == 1
+        rows = np.zeros_like(class_index) if binary else class_index
+
+        if sp.issparse(self.coef):
+            weights = np.asarray(self.coef[rows, columns]).ravel()
+        else:
+            weights = self.coef[rows, columns]
+
+        return np.where(class_index == 0, -weights, weights) if binary else weights
+
+    def explain_matrix(self, X: sp.csr_matrix, top_k: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        predicts labels and finds terms that pushed every row towards its label the most
+
+        :param X: tf-idf matrix
+        :param top_k: number of terms per row
+
+        :return labels, object array of terms of shape (n_rows, top_k) with None where a row has fewer terms
+            and array of their contributions with nan there
+        """
+        X = sp.csr_matrix(X)
+        scores = X @ self.coef.T
+        scores = (scores.toarray() if sp.issparse(scores) else np.asarray(scores)) + self.intercept
+        class_index = (scores[:, 0] > 0).astype(int) if scores.shape[1] == 1 else scores.argmax(axis=1)
+
+        rows = np.repeat(np.arange(X.shape[0]), np.diff(X.indptr))
+        contributions = X.data * self.class_coef(class_index[rows], X.indices)
+
+        order = np.lexsort((-contributions, rows))
+        rank = np.arange(len(order)) - X.indptr[rows[order]]
+        selected = (rank < top_k) & (contributions[order] > 0)
+        keep, keep_rank = order[selected], rank[selected]
+
+        terms = np.full((X.shape[0], top_k), None, dtype=object)
+        weights = np.full((X.shape[0], top_k), np.nan)
+        terms[rows[keep], keep_rank] = self.feature_names[X.indices[keep]]
+        weights[rows[keep], keep_rank] = contributions[keep]
+
+        return self.classes[class_index], terms, weights
+
+    def explain(self, texts: Iterable[str], top_k: int, prefix: str = "") -> pd.DataFrame:
+        """
+        explains predictions for a batch of texts
+
+        :param texts: iterable of texts
+        :param top_k: number of terms per row
+        :param prefix: prefix of the column names
+
+        :return dataframe with columns `{prefix}term_1`, `{prefix}weight_1`, ..., `{prefix}term_{top_k}`,
+            `{prefix}weight_{top_k}`, rows are aligned with texts
+        """
+        _, terms, weights = self.explain_matrix(self.transform(texts), top_k)
+        return self.to_frame(terms, weights, prefix)
+
+    @staticmethod
+    def to_frame(terms: np.ndarray, weights: np.ndarray, prefix: str = "") -> pd.DataFrame:
+        """
+        :param terms: terms returned by `explain_matrix`
+        :param weights: contributions returned by `explain_matrix`
+        :param prefix: prefix of the column names
+
+        :return dataframe with interleaved term and weight columns
+        """
+        columns = {}
+        for i in range(terms.shape[1]):
+            columns[f"{prefix}term_{i + 1}"] = pd.array(terms[:, i], dtype="string")
+            columns[f"{prefix}weight_{i + 1}"] = weights[:, i].astype(float)
+        return pd.DataFrame(columns)
+
+    def top_weights(self, top_k: int) -> pd.DataFrame:
+        """
+        global explanation: terms with the largest positive and negative coefficients of every class
+
+        :param top_k: number of positive and of negative terms per class
+
+        :return dataframe with target, feature and weight columns
+        """
+        coef = self.coef.toarray() if sp.issparse(self.coef) else np.asarray(self.coef)
+        if coef.shape[0] == 1:
+            coef = np.vstack([-coef, coef])
+
+        frames = []
+        for label, weights in zip(self.classes, coef):
+            order = np.argsort(-weights, kind="stable")
+            positive = order[:top_k][weights[order[:top_k]] > 0]
+            negative = order[::-1][:top_k][weights[order[::-1][:top_k]] < 0][::-1]
+            chosen = np.concatenate([positive, negative])
+            frames.append(pd.DataFrame({
+                "target": label,
+                "feature": self.feature_names[chosen],
+                "weight": weights[chosen]
+            }))
+
+        return pd.concat(frames, ignore_index=True)
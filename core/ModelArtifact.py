@@ -0,0 +1,326 @@
+import json
+import os
+from typing import BinaryIO, Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.pipeline import Pipeline
+
+FORMAT_VERSION = 1
+MAX_TERM_WIDTH = 64
+ANALYZER_PARAMS = (
+    'input', 'encoding', 'decode_error', 'strip_accents', 'lowercase', 'analyzer',
+    'stop_words', 'token_pattern', 'ngram_range'
+)
+
+
+class ModelArtifact:
+    """
+    Tf-idf + logistic regression model stored as plain arrays that load instantly.
+
+    The idf vector, coefficients and intercepts are uncompressed .npy files opened with mmap,
+    so every process serving the model shares the same memory pages. The vocabulary is a sorted
+    fixed-width byte array searched with np.searchsorted instead of a pickled dict,
+    rare terms longer than MAX_TERM_WIDTH bytes are kept in a small json lookup.
+    A compact variant prunes small coefficients and stores float32 weights sparsely, see `save`
+    """
+
+    def __init__(self, path: str, mmap_mode: str = 'r'):
+
+        with open(os.path.join(path, 'params.json'), encoding='utf-8') as f:
+            params = json.load(f)
+
+        if params['format_version'] != FORMAT_VERSION:
+            raise ValueError(f"Unsupported model format version {params['format_version']}")
+
+        with open(os.path.join(path, 'long_terms.json'), encoding='utf-8') as f:
+            self.long_terms = json.load(f)
+
+        self.params = params
+        self.classes_ = np.array(params['classes'])
+        self.terms = np.load(os.path.join(path, 'terms.npy'), mmap_mode=mmap_mode)
+        self.term_index = np.load(os.path.join(path, 'term_index.npy'), mmap_mode=mmap_mode)
+        self.idf = np.load(os.path.join(path, 'idf.npy'), mmap_mode=mmap_mode) if params['use_idf'] else None
+        self.intercept = np.load(os.path.join(path, 'intercept.npy'), mmap_mode=mmap_mode)
+        if params.get('sparse_coef'):
+            self.coef = sp.csr_matrix(
+                tuple(np.load(os.path.join(path, f'coef_{name}.npy'), mmap_mode=mmap_mode)
+                      for name in ('data', 'indices', 'indptr')),
+                shape=(len(self.intercept), params['n_features'])
+            )
+        else:
+            self.coef = np.load(os.path.join(path, 'coef.npy'), mmap_mode=mmap_mode)
+
+        analyzer_params = {name: params['vectoriser'][name] for name in ANALYZER_PARAMS}
+        analyzer_params['ngram_range'] = tuple(analyzer_params['ngram_range'])
+        self.analyze = TfidfVectorizer(**analyzer_params).build_analyzer()
+
+    @staticmethod
+    def supports(model: Pipeline) -> bool:
+        """
+        checks whether the pipeline can be stored as plain arrays
+
+        :param model: fitted sklearn pipeline
+
+        :return True if the pipeline is a default-analyzer tfidf vectoriser without custom callables
+            followed by a linear model, callables can't be stored as arrays
+        """
+        if len(model.steps) != 2:
+            return False
+
+        vectoriser, classifier = model[0], model[-1]
+        if not isinstance(vectoriser, TfidfVectorizer) or not hasattr(classifier, 'coef_'):
+            return False
+
+        params = vectoriser.get_params()
+        if params['preprocessor'] is not None or params['tokenizer'] is not None:
+            return False
+        if params['strip_accents'] not in (None, 'ascii', 'unicode'):
+            return False
+
+        return params['analyzer'] == 'word' and params['input'] == 'content'
+
+    @staticmethod
+    def save(model: Pipeline, path: str, prune: Optional[float] = None) -> None:
+        """
+        writes pipeline as arrays and json into a folder
+
+        :param model: fitted sklearn pipeline, see `supports`
+        :param path: folder to write to
+        :param prune: fraction of the smallest by magnitude coefficients to drop. When set, the model is stored
+                      compactly: float32 weights, sparse coefficients and only terms with a non-zero coefficient
+                      in the vocabulary. Dropped terms no longer take part in the row normalisation,
+                      so predictions can change slightly
+        """
+        os.makedirs(path, exist_ok=True)
+        ModelArtifact.write(model, lambda name: open(os.path.join(path, name), 'wb'), prune=prune)
+
+    @staticmethod
+    def write(model: Pipeline, open_file: Callable[[str], BinaryIO], prune: Optional[float] = None) -> None:
+        """
+        writes pipeline as arrays and json into binary files opened by a function,
+        e.g. straight into members of a zip archive
+
+        :param model: fitted sklearn pipeline, see `supports`
+        :param open_file: function that opens a file by its name for binary writing
+        :param prune: see `save`
+        """
+        vectoriser, classifier = model[0], model[-1]
+
+        def save_array(name: str, array: np.ndarray) -> None:
+            with open_file(name) as f:
+                np.save(f, array)
+
+        def save_json(name: str, value: Dict, **kwargs) -> None:
+            with open_file(name) as f:
+                f.write(json.dumps(value, ensure_ascii=False, **kwargs).encode('utf-8'))
+
+        feature_names = vectoriser.get_feature_names_out()
+        coef = np.asarray(classifier.coef_, dtype=np.float64)
+        idf = np.asarray(vectoriser.idf_, dtype=np.float64) if vectoriser.use_idf else None
+        compact = prune is not None
+
+        if compact:
+            coef = ModelArtifact._prune(coef, prune)
+            kept = np.flatnonzero((coef != 0).any(axis=0))
+            feature_names, coef = feature_names[kept], coef[:, kept]
+            idf = idf[kept] if idf is not None else None
+
+        dtype = np.float32 if compact else np.float64
+        index_dtype = np.int32 if compact else np.int64
+        encoded = [term.encode('utf-8') for term in feature_names]
+
+        short = [i for i, term in enumerate(encoded) if len(term) <= MAX_TERM_WIDTH]
+        width = max((len(encoded[i]) for i in short), default=1)
+        terms = np.array([encoded[i] for i in short], dtype=f'S{width}')
+        order = np.argsort(terms, kind='stable')
+
+        save_array('terms.npy', terms[order])
+        save_array('term_index.npy', np.array(short, dtype=index_dtype)[order])
+        if idf is not None:
+            save_array('idf.npy', idf.astype(dtype))
+        if compact:
+            sparse_coef = sp.csr_matrix(coef.astype(dtype))
+            save_array('coef_data.npy', sparse_coef.data)
+            save_array('coef_indices.npy', sparse_coef.indices.astype(np.int32))
+            save_array('coef_indptr.npy', sparse_coef.indptr.astype(np.int32))
+        else:
+            save_array('coef.npy', np.ascontiguousarray(coef))
+        save_array('intercept.npy', np.asarray(classifier.intercept_, dtype=dtype))
+
+        long_terms = {str(feature_names[i]): i for i, term in enumerate(encoded) if len(term) > MAX_TERM_WIDTH}
+        save_json('long_terms.json', long_terms)
+
+        vectoriser_params = vectoriser.get_params()
+        vectoriser_params = {name: vectoriser_params[name] for name in ANALYZER_PARAMS}
+        if isinstance(vectoriser_params['stop_words'], frozenset):
+            vectoriser_params['stop_words'] = sorted(vectoriser_params['stop_words'])
+
+        multi_class = getattr(classifier, 'multi_class', 'auto')
+        ovr = multi_class == 'ovr' or (multi_class == 'auto' and getattr(classifier, 'solver', None) == 'liblinear')
+
+        params = {
+            'format_version': FORMAT_VERSION,
+            'vectoriser': vectoriser_params,
+            'binary': vectoriser.binary,
+            'norm': vectoriser.norm,
+            'use_idf': vectoriser.use_idf,
+            'sublinear_tf': vectoriser.sublinear_tf,
+            'n_features': len(feature_names),
+            'sparse_coef': compact,
+            'prune': prune,
+            'classes': classifier.classes_.tolist(),
+            'proba': 'sigmoid' if len(classifier.classes_) <= 2 else 'ovr' if ovr else 'softmax',
+        }
+        save_json('params.json', params, indent=4)
+
+    @staticmethod
+    def _prune(coef: np.ndarray, prune: float) -> np.ndarray:
+
+        if not 0 <= prune < 1:
+            raise ValueError("prune must be in [0, 1)")
+
+        magnitude = np.abs(coef)
+        nonzero = magnitude[magnitude > 0]
+        if prune == 0 or len(nonzero) == 0:
+            return coef
+
+        threshold = np.quantile(nonzero, prune)
+        return np.where(magnitude > threshold, coef, 0)
+
+    def lookup(self, tokens: List[str]) -> np.ndarray:
+        """
+        maps tokens to feature indices
+
+        :param tokens: list of tokens
+
+        :return array of feature indices, -1 for tokens outside of the vocabulary
+        """
+        result = np.full(len(tokens), -1, dtype=np.int64)
+        if not tokens or len(self.terms) == 0:
+            return result
+
+        encoded = [token.encode('utf-8') for token in tokens]
+        lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded))
+        width = self.terms.dtype.itemsize
+
+        candidates = np.array(encoded, dtype=self.terms.dtype)
+        positions = np.minimum(np.searchsorted(self.terms, candidates), len(self.terms) - 1)
+        found = (self.terms[positions] == candidates) & (lengths <= width)
+        result[found] = self.term_index[positions[found]]
+
+        if self.long_terms:
+            for i in np.flatnonzero(lengths > width):
+                result[i] = self.long_terms.get(tokens[i], -1)
+
+        return result
+
+    def get_feature_names_out(self) -> np.ndarray:
+        """
+        restores feature names in the order of the coefficients, as the fitted vectoriser returns them
+
+        :return object array of terms
+        """
+        names = np.empty(self.params['n_features'], dtype=object)
+        names[self.term_index] = np.char.decode(np.asarray(self.terms), 'utf-8')
+        for term, i in self.long_terms.items():
+            names[i] = term
+        return names
+
+    def transform(self, texts: Iterable[str]) -> sp.csr_matrix:
+        """
+        builds tf-idf matrix exactly as the fitted vectoriser does
+
+        :param texts: iterable of texts
+
+        :return sparse tf-idf matrix
+        """
+        token_ids: Dict[str, int] = {}
+        ids = []
+        indptr = [0]
+        for text in texts:
+            ids.extend(token_ids.setdefault(token, len(token_ids)) for token in self.analyze(text))
+            indptr.append(len(ids))
+
+        columns = self.lookup(list(token_ids))[np.array(ids, dtype=np.int64)]
+        rows = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+        known = columns >= 0
+
+        X = sp.csr_matrix(
+            (np.ones(known.sum()), (rows[known], columns[known])),
+            shape=(len(indptr) - 1, self.params['n_features'])
+        )
+        X.sum_duplicates()
+
+        if self.params['binary']:
+            X.data.fill(1)
+        if self.params['sublinear_tf']:
+            np.log(X.data, X.data)
+            X.data += 1
+        if self.idf is not None:
+            X.data *= self.idf[X.indices]
+        if self.params['norm'] is not None:
+            X = self._normalize(X, norm=self.params['norm'])
+
+        return X
+
+    def decision_function(self, texts: Iterable[str]) -> np.ndarray:
+        """
+        computes linear scores of the classifier
+
+        :param texts: iterable of texts
+
+        :return array of shape (n_texts,) for binary problems and (n_texts, n_classes) otherwise
+        """
+        scores = self.transform(texts) @ self.coef.T
+        if sp.issparse(scores):
+            scores = scores.toarray()
+        scores = np.asarray(scores) + self.intercept
+        return scores.ravel() if scores.shape[1] == 1 else scores
+
+    def predict(self, texts: Iterable[str]) -> np.ndarray:
+        """
+        predicts labels
+
+        :param texts: iterable of texts
+
+        :return array of labels
+        """
+        scores = self.decision_function(texts)
+        if scores.ndim == 1:
+            return self.classes_[(scores > 0).astype(int)]
+        return self.classes_[scores.argmax(axis=1)]
+
+    def predict_proba(self, texts: Iterable[str]) -> np.ndarray:
+        """
+        predicts class probabilities the same way the logistic regression does
+
+        :param texts: iterable of texts
+
+        :return array of shape (n_texts, n_classes)
+        """
+        scores = self.decision_function(texts)
+
+        if scores.ndim == 1:
+            positive = 1 / (1 + np.exp(-scores))
+            return np.column_stack([1 - positive, positive])
+
+        if self.params['proba'] == 'ovr':
+            proba = 1 / (1 + np.exp(-scores))
+            return proba / proba.sum(axis=1, keepdims=True)
+
+        scores = np.exp(scores - scores.max(axis=1, keepdims=True))
+        return scores / scores.sum(axis=1, keepdims=True)
+
+    @staticmethod
+    def _normalize(X: sp.csr_matrix, norm: str) -> sp.csr_matrix:
+
+        if norm == 'l2':
+            norms = np.sqrt(np.asarray(X.multiply(X).sum(axis=1)).ravel())
+        else:
+            norms = np.asarray(abs(X).sum(axis=1)).ravel()
+        norms[norms == 0] = 1
+
+        X.data /= np.repeat(norms, np.diff(X.indptr))
+        return X
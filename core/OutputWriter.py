@@ -0,0 +1,153 @@
+import shutil
+import tempfile
+from typing import BinaryIO, Union
+
+import openpyxl
+import pandas as pd
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+OUTPUT_FORMATS = {
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+EXCEL_MAX_ROWS = 1048576
+EXCEL_SHEET_NAME = "ModelPredictions"
+PARQUET_SPOOL_MB = 64
+
+
+class OutputWriter:
+    """
+    Appends dataframes to a csv, parquet or xlsx file without keeping them in memory
+
+    Excel rows go through openpyxl write-only workbook, which streams them to disk,
+    a new sheet is started whenever one reaches Excel's row limit
+
+    Parquet schema is taken from the first chunk. When a later chunk does not fit it, e.g. a column that was empty
+    (float) in the first chunk holds text, or integers turn into fractions, the column is promoted to a common type,
+    see `common_type`, and the rows written so far are rewritten with the new schema, so a file object passed
+    for parquet output must also be readable and seekable
+    """
+
+    def __init__(self, output: Union[str, BinaryIO], output_format: str):
+        """
+        :param output: path or file opened for binary writing (and reading for parquet)
+        :param output_format: one of OUTPUT_FORMATS
+        """
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"Unsupported output format {output_format}, use one of {list(OUTPUT_FORMATS)}")
+        if output_format == "parquet" and pyarrow is None:
+            raise ImportError("Writing parquet files requires pyarrow, install it with `pip install pyarrow`")
+
+        self.output_format = output_format
+        self._owned = isinstance(output, str)
+        self._file = open(output, "w+b") if self._owned else output
+        self._header = True
+        self._parquet_writer = None
+        self._parquet_start = 0
+        self._workbook = None
+        self._sheet = None
+        self._sheet_rows = 0
+
+    def write(self, df: pd.DataFrame) -> None:
+
+        if self.output_format == "csv":
+            df.to_csv(self._file, index=False, header=self._header, mode="wb", encoding="utf-8")
+        elif self.output_format == "parquet":
+            self._write_parquet(df)
+        else:
+            self._write_excel(df)
+        self._header = False
+
+    def _write_parquet(self, df: pd.DataFrame) -> None:
+
+        table = pyarrow.Table.from_pandas(df, preserve_index=False)
+        if self._parquet_writer is None:
+            self._parquet_start = self._file.tell()
+            self._parquet_writer = pyarrow.parquet.ParquetWriter(self._file, table.schema)
+
+        try:
+            table = table.cast(self._parquet_writer.schema)
+        except (pyarrow.ArrowException, ValueError):
+            schema = pyarrow.schema([
+                pyarrow.field(field.name, common_type(field.type, table.schema.field(field.name).type))
+                for field in self._parquet_writer.schema
+            ])
+            self._rewrite_parquet(schema)
+            table = table.cast(schema)
+        self._parquet_writer.write_table(table)
+
+    def _rewrite_parquet(self, schema: "pyarrow.Schema") -> None:
+        """
+        closes the current parquet file and writes its rows again with a promoted schema
+
+        :param schema: schema every written column can be cast to
+        """
+        self._parquet_writer.close()
+        with tempfile.SpooledTemporaryFile(max_size=PARQUET_SPOOL_MB * 2 ** 20) as written:
+            self._file.seek(self._parquet_start)
+            shutil.copyfileobj(self._file, written)
+            self._file.seek(self._parquet_start)
+            self._file.truncate()
+
+            written.seek(0)
+            self._parquet_writer = pyarrow.parquet.ParquetWriter(self._file, schema)
+            for batch in pyarrow.parquet.ParquetFile(written).iter_batches():
+                self._parquet_writer.write_table(pyarrow.Table.from_batches([batch]).cast(schema))
+
+    def _write_excel(self, df: pd.DataFrame) -> None:
+
+        if self._workbook is None:
+            self._workbook = openpyxl.Workbook(write_only=True)
+
+        values = df.astype(object).where(df.notna(), None)
+        for row in values.itertuples(index=False, name=None):
+            if self._sheet is None or self._sheet_rows == EXCEL_MAX_ROWS:
+                number = len(self._workbook.worksheets) + 1
+                self._sheet = self._workbook.create_sheet(EXCEL_SHEET_NAME if number == 1 else f"{EXCEL_SHEET_NAME}_{number}")
+                self._sheet.append([str(column) for column in df.columns])
+                self._sheet_rows = 1
+            self._sheet.append(row)
+            self._sheet_rows += 1
+
+    def close(self) -> None:
+
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+        if self._workbook is not None:
+            self._workbook.save(self._file)
+        if self._owned:
+            self._file.close()
+
+
+def common_type(left: "pyarrow.DataType", right: "pyarrow.DataType") -> "pyarrow.DataType":
+    """
+    finds a type values of both types can be cast to: null columns take the other type,
+    integers and floats become float64, any other mismatch becomes string
+
+    :param left: type of the written column
+    :param right: type of the same column in a new chunk
+
+    :return common type
+
+    Example:
+
+    >>> common_type(pyarrow.int64(), pyarrow.float64())
+    DataType(double)
+    >>> common_type(pyarrow.float64(), pyarrow.string())
+    DataType(string)
+    """
+    if left == right or pyarrow.types.is_null(right):
+        return left
+    if pyarrow.types.is_null(left):
+        return right
+
+    numeric = (pyarrow.types.is_integer, pyarrow.types.is_floating)
+    if any(check(left) for check in numeric) and any(check(right) for check in numeric):
+        return pyarrow.float64()
+    return pyarrow.string()
@@ -0,0 +1,105 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable
+
+import numpy as np
+import pandas as pd
+
+
+class PredictionCache:
+    """
+    Bounded LRU cache of model outputs keyed by a 64-bit hash of the text.
+
+    `lookup` collapses identical texts of a batch, serves the texts seen before from the cache
+    and runs the model once on the rest, so repeated texts (templates, auto-replies) are vectorised
+    and scored once per process. Thread safe, hit and miss counters are kept for monitoring
+    """
+
+    def __init__(self, max_size: int):
+        """
+        :param max_size: maximal number of cached outputs, 0 disables caching
+        """
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.duplicates = 0
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+
+        return len(self._entries)
+
+    def lookup(self, kind: str, texts: pd.Series, compute: Callable[[pd.Series], np.ndarray]) -> np.ndarray:
+        """
+        returns model outputs for every text, computing only unique texts missing from the cache
+
+        :param kind: kind of output, e.g. 'label' or 'proba', outputs of different kinds are cached separately
+        :param texts: assembled texts
+        :param compute: function running the model on a series of texts, returns one output row per text
+
+        :return array of outputs aligned with texts
+        """
+        if len(texts) == 0:
+            return compute(texts)
+
+        codes, uniques = pd.factorize(texts.to_numpy(dtype=object), use_na_sentinel=False)
+        uniques = pd.Series(uniques, dtype=object)
+        keys = pd.util.hash_array(uniques.to_numpy(), categorize=False)
+
+        with self._lock:
+            cached = [self._get((kind, key)) for key in keys.tolist()]
+        missing = [i for i, value in enumerate(cached) if value is None]
+
+        if missing:
+            computed = compute(uniques.iloc[missing].reset_index(drop=True))
+            for i, value in zip(missing, computed):
+                cached[i] = value
+            with self._lock:
+                for i in missing:
+                    self._put((kind, int(keys[i])), cached[i])
+
+        with self._lock:
+            self.hits += len(uniques) - len(missing)
+            self.misses += len(missing)
+            self.duplicates += len(texts) - len(uniques)
+
+        return np.asarray(cached)[codes]
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        :return dictionary with cache size, hits and misses among unique texts, duplicates collapsed within batches
+            and share of texts that were not sent to the model
+        """
+        with self._lock:
+            served = self.hits + self.misses + self.duplicates
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "duplicates": self.duplicates,
+                "hit_rate": (self.hits + self.duplicates) / served if served else 0.0,
+            }
+
+    def clear(self) -> None:
+
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.duplicates = 0
+
+    def _get(self, key: Hashable) -> Any:
+
+        value = self._entries.get(key)
+        if value is not None:
+            self._entries.move_to_end(key)
+        return value
+
+    def _put(self, key: Hashable, value: Any) -> None:
+
+        if self.max_size <= 0:
+            return
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
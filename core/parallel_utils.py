@@ -0,0 +1,69 @@
+import os
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+try:
+    from threadpoolctl import threadpool_limits
+except ImportError:
+    threadpool_limits = None
+
+CORES_VARIABLE = "TRAINING_PIPELINES_CORES"
+
+
+def available_cores() -> int:
+    """
+    number of cores the process may use: cores it is allowed to run on,
+    limited by TRAINING_PIPELINES_CORES environment variable when it is set
+
+    :return number of cores
+    """
+    if hasattr(os, "sched_getaffinity"):
+        cores = len(os.sched_getaffinity(0))
+    else:
+        cores = os.cpu_count() or 1
+
+    limit = os.environ.get(CORES_VARIABLE)
+    if limit:
+        cores = min(cores, int(limit))
+
+    return max(cores, 1)
+
+
+class ParallelPlan:
+    """
+    Split of the cores between parallel workers and BLAS threads inside every worker.
+
+    Independent tasks (cross validation folds, file chunks, jobs) get one worker each up to the number of cores,
+    the cores left over go to BLAS threads of every worker, so workers times threads never exceeds the cores.
+    With fewer tasks than cores, e.g. one fit of a multinomial model, all cores go to BLAS
+    """
+
+    def __init__(self, n_tasks: int, cores: Optional[int] = None):
+
+        self.cores = cores or available_cores()
+        self.n_workers = max(1, min(n_tasks, self.cores))
+        self.n_threads = max(1, self.cores // self.n_workers)
+
+    def __repr__(self) -> str:
+
+        return f"ParallelPlan(cores={self.cores}, n_workers={self.n_workers}, n_threads={self.n_threads})"
+
+    @contextmanager
+    def limit_threads(self) -> Iterator[None]:
+        """
+        limits BLAS and OpenMP threads of the current process to the threads of one worker
+        """
+        if threadpool_limits is None:
+            yield
+            return
+
+        with threadpool_limits(limits=self.n_threads):
+            yield
+
+    def set_thread_limit(self) -> None:
+        """
+        limits BLAS and OpenMP threads of the current process to the threads of one worker
+        for the rest of its life, e.g. in a process pool initializer
+        """
+        if threadpool_limits is not None:
+            threadpool_limits(limits=self.n_threads)
@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+from typing import List
+
+
+def text_values(column: pd.Series) -> np.ndarray:
+    """
+    converts column to an object array of strings, cells that are not strings become empty strings
+
+    Only columns mixing strings with other values are checked cell by cell,
+    string and numeric columns are converted at once
+
+    :param column: dataframe column
+
+    :return numpy array of python strings
+    """
+    if isinstance(column.dtype, pd.StringDtype):
+        return column.fillna('').to_numpy(dtype=object)
+
+    if column.dtype.kind in 'biufcmM':
+        return np.full(len(column), '', dtype=object)
+
+    values = column.to_numpy(dtype=object, copy=True)
+    if pd.api.types.infer_dtype(values, skipna=False) == 'string':
+        return values
+
+    missing = pd.isna(values)
+    if missing.any() and pd.api.types.infer_dtype(values[~missing], skipna=False) in ('string', 'empty'):
+        values[missing] = ''
+        return values
+
+    return np.array([x if isinstance(x, str) else '' for x in values], dtype=object)
+
+
+def assemble_text(df: pd.DataFrame, text_columns: List[str]) -> pd.Series:
+    """
+    joins text from text columns into one pd.Series with a space between columns.
+
+    The result is identical to replacing non-string cells with '' and joining rows with ' '.join,
+    but strings are concatenated column by column. Works on any chunk of a dataframe
+
+    :param df: dataframe or its chunk
+    :param text_columns: list of column names where relevant text data is stored
+
+    :return pd.Series with all textual information in rows
+
+    Example
+
+    >>> df
+            title     body    target
+        0   hi        there   1
+        1   NaN       hello   0
+    >>> assemble_text(df=df, text_columns=['title', 'body'])
+    0    hi there
+    1     hello
+    """
+    text_columns_amount = len(text_columns)
+
+    if text_columns_amount == 0:
+        raise ValueError("There is no text colums specified")
+
+    if text_columns_amount == 1:
+        return pd.Series(df[text_columns[0]].to_list())
+
+    text_all = text_values(df[text_columns[0]])
+    for column in text_columns[1:]:
+        text_all = text_all + ' ' + text_values(df[column])
+
+    return pd.Series(text_all, index=df.index, dtype=object)
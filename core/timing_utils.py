@@ -0,0 +1,132 @@
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+MAX_ROOT_SPANS = 256
+
+_state = threading.local()
+
+
+class Span:
+    """
+    One measured stage: wall time, CPU time of the process and growth of its peak resident memory.
+
+    Spans opened inside another span become its children, so nested stages show where the time went
+    """
+
+    def __init__(self, name: str):
+
+        self.name = name
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.peak_rss_delta: Optional[float] = None
+        self.children: List["Span"] = []
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        converts span and its children to a json serialisable dictionary
+        """
+        return {
+            "name": self.name,
+            "wall_s": round(self.wall, 4),
+            "cpu_s": round(self.cpu, 4),
+            "peak_rss_delta_mb": None if self.peak_rss_delta is None else round(self.peak_rss_delta, 2),
+            "children": [child.to_dict() for child in self.children]
+        }
+
+
+def peak_rss() -> Optional[float]:
+    """
+    peak resident memory of the process in MB, None where the platform does not report it
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2 ** 20 if sys.platform == "darwin" else peak / 2 ** 10
+
+
+def _stack() -> List[Span]:
+
+    if not hasattr(_state, "stack"):
+        _state.stack = []
+        _state.roots = deque(maxlen=MAX_ROOT_SPANS)
+    return _state.stack
+
+
+@contextmanager
+def span(name: str) -> Iterator[Span]:
+    """
+    measures the enclosed code, can be used as a context manager or as a function decorator
+
+    :param name: stage name
+
+    Example
+
+    >>> with span("training"):
+    ...     with span("cross validation"):
+    ...         ...
+    >>> [s.to_dict() for s in collected_spans()]
+    [{'name': 'training', 'wall_s': 1.2, 'cpu_s': 3.4, 'peak_rss_delta_mb': 12.5, 'children': [...]}]
+    """
+    stack = _stack()
+    current = Span(name)
+    if stack:
+        stack[-1].children.append(current)
+    else:
+        _state.roots.append(current)
+    stack.append(current)
+
+    rss = peak_rss()
+    cpu = time.process_time()
+    wall = time.perf_counter()
+    try:
+        yield current
+    finally:
+        current.wall = time.perf_counter() - wall
+        current.cpu = time.process_time() - cpu
+        if rss is not None:
+            current.peak_rss_delta = peak_rss() - rss
+        stack.pop()
+
+
+def reset_spans() -> None:
+    """
+    forgets spans finished in the current thread, e.g. at the start of a streamlit rerun
+    """
+    _stack()
+    _state.roots.clear()
+
+
+def collected_spans() -> List[Span]:
+    """
+    returns top level spans finished in the current thread since the last reset,
+    only the last MAX_ROOT_SPANS are kept in threads that are never reset
+    """
+    _stack()
+    return list(_state.roots)
+
+
+def flatten_spans(spans: List[Dict[str, Any]], depth: int = 0) -> List[Dict[str, Any]]:
+    """
+    turns nested span dictionaries into rows for a table, nesting is shown with dots before the name
+
+    :param spans: list of dictionaries made by Span.to_dict
+    :param depth: nesting level of the spans
+
+    :return list of rows without children
+    """
+    rows = []
+    for item in spans:
+        row = {key: value for key, value in item.items() if key != "children"}
+        row["name"] = "· " * depth + row["name"]
+        rows.append(row)
+        rows.extend(flatten_spans(item["children"], depth + 1))
+    return rows
@@ -1,12 +1,13 @@
 import pandas as pd
 import streamlit as st
-from utils.constants import EDA_NAME, MINIMAL_NUMBER_OF_OBSERVATIONS, THRESHOLD, MIN_CLASS_NUMBER, ANNOTATION_THRESHOLD, BASE_CHECK_THRESHOLD
-from utils.data_utils import (analyse_data_annotation, clean_duplicates,
-                            clean_relevant_duplicates, return_text_and_targets)
-from core.Dataset import PandasDataset
-from utils.eda_utils import (check_value_counts,
-                           compute_percentage_of_suitable_data,
-                           render_pie_chart)
+from utils.constants import EDA_NAME, MINIMAL_NUMBER_OF_OBSERVATIONS, THRESHOLD, MIN_CLASS_NUMBER, ANNOTATION_THRESHOLD, BASE_CHECK_THRESHOLD, FAST_EDA_BUDGET, NEAR_DUPLICATE_STRATEGIES, NEAR_DUPLICATE_THRESHOLD
+from core.Dataset import PREVIEW_ROWS, SUPPORTED_EXTENSIONS
+from utils.data_utils import analyse_data_annotation
+from utils.cache_utils import clean_data, estimate_data, fingerprint, fingerprint_upload, job_runner, read_data
+from utils.eda_utils import render_estimates_chart, render_pie_chart
+from utils.session_utils import SessionDataset
+from utils.ui_utils import render_job, render_memory, render_timings
+from core.timing_utils import collected_spans, reset_spans, span
 
 
 st.set_page_config(
@@ -15,24 +16,54 @@ st.set_page_config(
 st.sidebar.header(EDA_NAME)
 
 st.header(EDA_NAME)
+reset_spans()
 
 score = v_c = na_check = 0
 
-df = st.file_uploader(label="Upload your file", type=["csv", "xls", "xlsx", "tsv"])
-if df is not None:
-    df = PandasDataset(df)
-    df = df.data
-    st.dataframe(data=df.head())
+uploaded_file = st.file_uploader(label="Upload your file", type=SUPPORTED_EXTENSIONS)
+if uploaded_file is not None:
+    with span("read preview"):
+        upload_key = fingerprint_upload(uploaded_file)
+        preview = read_data(upload_key, uploaded_file, nrows=PREVIEW_ROWS)
+    st.dataframe(data=preview.head())
 
     with st.form("Information about data"):
         text_columns = st.multiselect(
-            label="Select text columns", options=df.columns)
+            label="Select text columns", options=preview.columns)
 
         target_column = st.selectbox(
             label="Select target column. There can be only one target column per session",
-            options=df.columns
+            options=preview.columns
         )
 
+        only_selected = st.checkbox(
+            label="Load only selected columns",
+            value=True,
+            help="Much faster on wide files. Duplicated rows are then counted on the selected columns only"
+        )
+
+        near_duplicates = st.checkbox(
+            label="Remove near duplicates",
+            help="Finds rows whose relevant text is nearly the same, e.g. differs in casing, spacing or a few words, "
+                 "and keeps one row per cluster"
+        )
+        near_duplicate_threshold = st.slider(
+            "Similarity from which rows count as near duplicates", min_value=0.5, max_value=1.0,
+            value=NEAR_DUPLICATE_THRESHOLD, step=0.05
+        )
+        near_duplicate_strategy = st.radio(
+            "Keep from a cluster", options=NEAR_DUPLICATE_STRATEGIES, horizontal=True,
+            help="drop keeps the first row as is, collapse keeps the first row with the most frequent label of the cluster"
+        )
+        drop_conflicting = st.checkbox("Remove clusters with conflicting labels")
+
+        fast_mode = st.checkbox(
+            label="Fast EDA",
+            help="Reads the file once with constant memory, estimates duplicates with sketches "
+                 "and audits labels on a stratified sample. For very large files"
+        )
+        budget = st.number_input("Time budget for fast EDA, seconds", min_value=5, value=FAST_EDA_BUDGET, step=5)
+
         accepted = True
 
         if target_column in text_columns:
@@ -41,36 +72,94 @@ if df is not None:
 
         submitted = st.form_submit_button("Submit")
 
-    if submitted and accepted:
+    if submitted and accepted and fast_mode:
 
-        full_length, cnt_duplicates, df = clean_duplicates(df)
-        relevant_length, cnt_relevant_duplicates, df = clean_relevant_duplicates(
-            df=df,
-            text_columns=text_columns,
-            target_column=target_column
-        )
+        with span("fast EDA"):
+            statistics, report, verdict = estimate_data(
+                upload_key,
+                text_columns,
+                target_column,
+                budget,
+                text_columns + [target_column] if only_selected else None,
+                uploaded_file
+            )
+
+        st.session_state["fast_eda"] = {
+            "upload_key": upload_key,
+            "statistics": statistics,
+            "report": report,
+            "verdict": verdict,
+            "timings": [item.to_dict() for item in collected_spans()]
+        }
 
-        df, v_c = check_value_counts(
-            df=df, target_column=target_column, threshold=THRESHOLD)
+    elif submitted and accepted:
 
-        if df[target_column].nunique() < MIN_CLASS_NUMBER:
+        with span("read file"):
+            if only_selected:
+                columns = text_columns + [target_column]
+                df = read_data(upload_key, uploaded_file, columns=columns, dtype={column: "string" for column in text_columns})
+            else:
+                columns = None
+                df = read_data(upload_key, uploaded_file)
+
+        with span("clean data"):
+            statistics, clusters, df = clean_data(
+                fingerprint(upload_key, columns), text_columns, target_column, THRESHOLD, df,
+                near_duplicate_threshold if near_duplicates else None, near_duplicate_strategy, drop_conflicting
+            )
+
+        st.session_state["eda"] = {
+            "upload_key": upload_key,
+            "text_columns": text_columns,
+            "target_column": target_column,
+            "statistics": statistics,
+            "clusters": clusters,
+            "dataset": SessionDataset.from_frame(df=df, text_columns=text_columns, target_column=target_column),
+            "timings": [item.to_dict() for item in collected_spans()]
+        }
+        st.session_state.pop("fast_eda", None)
+
+    fast_eda = st.session_state.get("fast_eda")
+    eda = st.session_state.get("eda")
+    if fast_eda is not None and fast_eda["upload_key"] == upload_key:
+        statistics, report, verdict = fast_eda["statistics"], fast_eda["report"], fast_eda["verdict"]
+
+        if verdict == "go":
+            st.success("Data looks good enough for modeling")
+        elif verdict == "no-go":
+            st.error("Data does not pass the checks even with the margin of error")
+        else:
+            st.warning("Data is close to the thresholds, run the full EDA to be sure")
+
+        st.write("Approximate statistics, ± is the 95% margin of error")
+        st.dataframe(statistics[["estimate", "± 95%"]].style.format(precision=2))
+        st.pyplot(render_estimates_chart(statistics=statistics, report=report))
+        st.write("Label audit on the sample, percentage is the share of the class in the whole file")
+        st.dataframe(report.style.format(precision=2))
+
+        st.session_state.setdefault("timings", {})[EDA_NAME] = fast_eda["timings"]
+
+    elif eda is not None and eda["upload_key"] == upload_key:
+        statistics, clusters, dataset = eda["statistics"], eda["clusters"], eda["dataset"]
+        job_timings = []
+        text_columns, target_column = eda["text_columns"], eda["target_column"]
+        v_c, na_check = statistics["v_c"], statistics["na_check"]
+
+        if len(dataset.classes) < MIN_CLASS_NUMBER:
             st.warning(
                 f"Your data has less than {MIN_CLASS_NUMBER} classes eligible for modeling. We cannot proceed with this data :(")
-            st.session_state["features"] = None
-            st.session_state["targets"] = None
-            st.session_state["data"] = None
+            st.session_state["dataset"] = None
         else:
-            na_check = compute_percentage_of_suitable_data(
-                df=df, target_column=target_column, full_length=full_length)
             res = pd.DataFrame(
                 {
                     "text_columns": ", ".join(text_columns),
                     "target_column": target_column,
-                    "percentage of duplicated data": f"{(cnt_duplicates/full_length) * 100:.2f}%",
-                    "percentage of duplicated data in relevant columns": f"{(cnt_relevant_duplicates/relevant_length) * 100:.2f}%",
+                    "percentage of duplicated data": f"{(statistics['cnt_duplicates'] / statistics['full_length']) * 100:.2f}%",
+                    "percentage of duplicated data in relevant columns": f"{(statistics['cnt_relevant_duplicates'] / statistics['relevant_length']) * 100:.2f}%",
+                    "percentage of near duplicates in relevant columns": f"{(statistics['cnt_near_duplicates'] / statistics['relevant_length']) * 100:.2f}%",
                     f"percentage of target classes, that have more observations than {THRESHOLD}": f"{v_c}%",
                     "percentage of suitable labels": f"{na_check}%",
-                    "number of relevant observations": len(df),
+                    "number of relevant observations": len(dataset),
                 },
                 index=[0]
             ).T
@@ -79,41 +168,56 @@ if df is not None:
             st.session_state["base_data_statistics"] = res
             st.dataframe(res.style.format(precision=2))
 
-            if len(df) < MINIMAL_NUMBER_OF_OBSERVATIONS:
-                st.warning(f"WARNING! Number of observations in you data ({len(df)}) is less "
+            if clusters is not None and len(clusters):
+                n_conflicting = int(clusters["conflicting labels"].sum())
+                with st.expander(f"Near duplicate clusters: {len(clusters)}, with conflicting labels: {n_conflicting}"):
+                    st.dataframe(clusters)
+
+            if len(dataset) < MINIMAL_NUMBER_OF_OBSERVATIONS:
+                st.warning(f"WARNING! Number of observations in you data ({len(dataset)}) is less "
                            f"than minimal number of observations ({MINIMAL_NUMBER_OF_OBSERVATIONS})")
 
-            X, y = return_text_and_targets(
-                df=df, text_columns=text_columns, target_column=target_column)
+            data_key = dataset.key
 
-            score, report = analyse_data_annotation(
-                X=X, y=y, threshold=THRESHOLD)
+            with span("pie chart"):
+                pie_chart = render_pie_chart(df=dataset.labels.to_frame(), column_name=target_column)
+                st.pyplot(pie_chart)
 
-            pie_chart = render_pie_chart(df=df, column_name=target_column)
-            st.pyplot(pie_chart)
+            result = render_job(
+                job_runner(),
+                fingerprint("audit", data_key),
+                "Label audit",
+                analyse_data_annotation,
+                X=dataset.X,
+                y=dataset.y
+            )
 
-            st.session_state["data_quality_result"] = report
-            st.session_state["data_quality_score"] = score
+            if result is not None:
+                (score, report), job_timings = result
 
-            potential_corrupt_score = 1 - score
-            num_corrupt = round(len(y) * potential_corrupt_score)
+                st.session_state["data_quality_result"] = report
+                st.session_state["data_quality_score"] = score
 
-            st.write(
-                f"Data Quality: {score * 100 :.2f}. There may be potential issues with {potential_corrupt_score * 100:.2f}% "
-                f"or {num_corrupt} out of {len(y)} examples"
-            )
-            st.dataframe(report.style.format(precision=2))
+                potential_corrupt_score = 1 - score
+                num_corrupt = round(len(dataset) * potential_corrupt_score)
 
-            if score > ANNOTATION_THRESHOLD and na_check > BASE_CHECK_THRESHOLD \
-                and v_c > BASE_CHECK_THRESHOLD and len(df) > MINIMAL_NUMBER_OF_OBSERVATIONS:
+                st.write(
+                    f"Data Quality: {score * 100 :.2f}. There may be potential issues with {potential_corrupt_score * 100:.2f}% "
+                    f"or {num_corrupt} out of {len(dataset)} examples"
+                )
+                st.dataframe(report.style.format(precision=2))
 
-                st.text("Data is good")
-                st.session_state["features"] = X
-                st.session_state["targets"] = y
-                st.session_state["data"] = df
-            else:
-                st.text("Hi there, bitch. Your data is shit")
-                st.session_state["features"] = X
-                st.session_state["targets"] = y
-                st.session_state["data"] = df
-                st.session_state["trash_data"] = True
+                if score > ANNOTATION_THRESHOLD and na_check > BASE_CHECK_THRESHOLD \
+                    and v_c > BASE_CHECK_THRESHOLD and len(dataset) > MINIMAL_NUMBER_OF_OBSERVATIONS:
+
+                    st.text("Data is good")
+                    st.session_state["dataset"] = dataset
+                else:
+                    st.text("Hi there, bitch. Your data is shit")
+                    st.session_state["dataset"] = dataset
+                    st.session_state["trash_data"] = True
+
+        st.session_state.setdefault("timings", {})[EDA_NAME] = eda["timings"] + job_timings
+
+render_timings(st.session_state.get("timings", {}))
+render_memory(st.session_state)
@@ -0,0 +1,105 @@
+import streamlit as st
+from utils.constants import INCREMENTAL_CHUNKSIZE, INCREMENTAL_NAME
+from core.Dataset import PREVIEW_ROWS, SUPPORTED_EXTENSIONS
+from core.timing_utils import collected_spans, reset_spans, span
+from pipelines.build_incremental_model import build_incremental_model
+from utils.cache_utils import fingerprint_upload, read_data
+from utils.home_utils import create_app
+from utils.ui_utils import render_timings
+from pathlib import Path
+
+st.set_page_config(
+    page_title=INCREMENTAL_NAME
+)
+st.sidebar.header(INCREMENTAL_NAME)
+
+st.header(INCREMENTAL_NAME)
+reset_spans()
+
+st.write(
+    "Trains the baseline on files that don't fit in memory: the file is streamed in chunks, texts are hashed "
+    "instead of building a vocabulary and the model is updated chunk by chunk. "
+    "A fixed share of rows, chosen by a hash of their content, is kept aside for evaluation"
+)
+
+uploaded_file = st.file_uploader(label="Upload your file", type=SUPPORTED_EXTENSIONS)
+if uploaded_file is not None:
+    upload_key = fingerprint_upload(uploaded_file)
+    with span("read preview"):
+        preview = read_data(upload_key, uploaded_file, nrows=PREVIEW_ROWS)
+    st.dataframe(data=preview.head())
+
+    with st.form("Information about data"):
+        text_columns = st.multiselect(
+            label="Select text columns", options=preview.columns)
+
+        target_column = st.selectbox(
+            label="Select target column",
+            options=preview.columns
+        )
+
+        chunksize = st.number_input("Rows per chunk", min_value=1000, value=INCREMENTAL_CHUNKSIZE, step=10000)
+        n_epochs = st.number_input("Passes over the data", min_value=1, max_value=10, value=1)
+
+        accepted = True
+
+        if target_column in text_columns:
+            accepted = False
+            st.error("Target column can't be in text columns")
+
+        submitted = st.form_submit_button("Train")
+
+    if submitted and accepted and text_columns:
+        progress_bar = st.progress(0.0, text="Training...")
+
+        report, model, stats = build_incremental_model(
+            fileobject=uploaded_file,
+            text_columns=text_columns,
+            target_column=target_column,
+            chunksize=int(chunksize),
+            n_epochs=int(n_epochs),
+            progress=lambda seen, total: progress_bar.progress(min(seen / max(total, 1), 1.0), text=f"{seen} rows")
+        )
+        progress_bar.empty()
+
+        st.session_state["incremental_model"] = (upload_key, report, model, stats)
+
+    if st.session_state.get("incremental_model", (None,))[0] == upload_key:
+        _, report, model, stats = st.session_state["incremental_model"]
+
+        st.write("Training statistics")
+        st.json(stats)
+
+        st.write("Metrics on holdout")
+        st.dataframe(report.style.format(precision=2))
+
+        if st.checkbox("Save model"):
+            log = {
+                "model": {
+                    "training": stats,
+                    "metrics": report.to_dict("index"),
+                    "timings": [item.to_dict() for item in collected_spans()]
+                }
+            }
+
+            path_to_template = Path(__file__).parent.parent / "streamlit_templates" / "text_classification"
+            path_to_core = Path(__file__).parent.parent / "core"
+
+            archive = create_app(
+                model=model,
+                log=log,
+                path_to_template=path_to_template.as_posix(),
+                path_to_core=path_to_core.as_posix()
+                )
+
+            with archive:
+                btn = st.download_button(
+                    label="Download ZIP",
+                    data=archive.read(),
+                    file_name="application.zip",
+                    mime="application/zip"
+                )
+
+    st.session_state.setdefault("timings", {})[INCREMENTAL_NAME] = [item.to_dict() for item in collected_spans()]
+
+render_timings(st.session_state.get("timings", {}))
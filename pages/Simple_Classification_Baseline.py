@@ -1,9 +1,12 @@
 import streamlit as st
-from utils.constants import TFIDF_NAME
+from utils.constants import EXPLAIN_TOP_K, EXPORT_PRUNE_LEVELS, TFIDF_NAME, TUNING_BUDGET
+from core.ModelArtifact import ModelArtifact
 from utils.home_utils import create_app
 from pipelines.build_tfidf_logreg import build_tfidf_logreg
+from utils.cache_utils import compare_exports, explain_baseline, fingerprint, job_runner, tune_baseline
+from utils.ui_utils import render_job, render_memory, render_timings
+from core.timing_utils import collected_spans, reset_spans, span
 from pathlib import Path
-import eli5
 import numpy as np
 
 st.set_page_config(
@@ -12,76 +15,129 @@ st.set_page_config(
 st.sidebar.header(TFIDF_NAME)
 
 st.header(TFIDF_NAME)
+reset_spans()
 
 proceed = False
+job_timings = []
 
-if "features" not in st.session_state.keys() and "targets" not in st.session_state.keys() and "data" not in st.session_state.keys():
-    st.session_state["features"] = None
-    st.session_state["targets"] = None
-    st.session_state["data"] = None
+if "dataset" not in st.session_state.keys():
+    st.session_state["dataset"] = None
     st.warning("There is no data yet")
 
 else:
-    X = st.session_state["features"]
-    y = st.session_state["targets"]
-    df = st.session_state["data"]
+    dataset = st.session_state["dataset"]
 
-    if X is None and y is  None and df is None:
+    if dataset is None:
         st.warning("There is no data yet")
     
     else:
+        X, y = dataset.X, dataset.y
         st.write("Your data")
-        st.dataframe(df.head())
+        st.dataframe(dataset.preview)
 
         if "trash_data" in st.session_state.keys():
             proceed = st.checkbox("I accept that my data is trash and I take the consequences of it")
 
         if proceed or "trash_data" not in st.session_state.keys():
-            train_scores, overall_scores, df_classification_report, model = build_tfidf_logreg(X=X, y=y)
-
-            st.write(f"Train scores: {np.mean(train_scores)}")
-            st.write(f"Overall scores: {np.mean(overall_scores)}")
-
-            st.write("Metrics")
-            st.dataframe(df_classification_report.style.format(precision=2))
-
-            log = {
-                "data": {
-                    "base_data_statistics": st.session_state["base_data_statistics"].to_dict("index"),
-                    "data_quality_result": st.session_state["data_quality_result"].to_dict("index"),
-                    "data_quality_score": st.session_state["data_quality_score"]
-                },
-                "model": {
-                    "train cross_val_score": list(train_scores),
-                    "full data cross_val_score": list(overall_scores),
-                    "metrics": df_classification_report.to_dict("index")
+            params = None
+            if st.checkbox("Tune hyperparameters", help="Searches n-grams, min_df, sublinear tf and C with successive halving"):
+                budget = st.number_input("Time budget, seconds", min_value=10, value=TUNING_BUDGET, step=10)
+                with span("hyperparameter search"):
+                    params, history = tune_baseline(dataset.key, budget, X, y)
+                if params:
+                    st.write("Best parameters")
+                    st.json({name: repr(value) for name, value in params.items()})
+                else:
+                    st.warning("The time budget ran out before any candidate finished, default parameters are used. Increase the budget to tune them")
+                    params = None
+                with st.expander("Search history"):
+                    st.dataframe(history.style.format(precision=3))
+
+            result = render_job(
+                job_runner(),
+                fingerprint("train", dataset.key, params),
+                "Training model",
+                build_tfidf_logreg,
+                X=X,
+                y=y,
+                params=params
+            )
+
+            if result is not None:
+                (train_scores, overall_scores, df_classification_report, model), job_timings = result
+
+                st.write(f"Train scores: {np.mean(train_scores)}")
+                st.write(f"Overall scores: {np.mean(overall_scores)}")
+
+                st.write("Metrics")
+                st.dataframe(df_classification_report.style.format(precision=2))
+
+                log = {
+                    "data": {
+                        "base_data_statistics": st.session_state["base_data_statistics"].to_dict("index"),
+                        "data_quality_result": st.session_state["data_quality_result"].to_dict("index"),
+                        "data_quality_score": st.session_state["data_quality_score"]
+                    },
+                    "model": {
+                        "train cross_val_score": list(train_scores),
+                        "full data cross_val_score": list(overall_scores),
+                        "metrics": df_classification_report.to_dict("index"),
+                        "params": {name: repr(value) for name, value in (params or {}).items()}
+                    }
                 }
-            }
 
-            if st.checkbox("Explain model"):
-                r = eli5.explain_weights_df(
-                        model['logreg'], 
-                        top=10, 
-                        feature_names=model['vectoriser'].get_feature_names_out()
+                if st.checkbox("Explain model"):
+                    top_k = st.number_input("Terms per class and per text", min_value=1, max_value=50, value=EXPLAIN_TOP_K)
+                    with span("explain model"):
+                        weights, explanations = explain_baseline(
+                            fingerprint(dataset.key, params), top_k, model, X
                         )
-                st.dataframe(r)
+                    st.write("Largest weights of every class")
+                    st.dataframe(weights)
+                    st.write("Terms behind every prediction")
+                    st.dataframe(explanations)
+
+                if st.checkbox("Save model"):
 
-            if st.checkbox("Save model"):
+                    prune = None
+                    if ModelArtifact.supports(model) and st.checkbox("Compact export"):
+                        st.write("Size and quality of the exported model on the test data")
+                        with span("compare exports"):
+                            tradeoff = compare_exports(
+                                fingerprint(dataset.key, params), EXPORT_PRUNE_LEVELS, model, X, y
+                            )
+                        st.dataframe(tradeoff.style.format(precision=3))
+                        prune = st.selectbox(
+                            "Share of the smallest weights to drop",
+                            options=EXPORT_PRUNE_LEVELS,
+                            format_func=lambda level: f"{level:.0%}"
+                        )
 
-                path_to_template = Path(__file__).parent.parent / "streamlit_templates" / "text_classification"
-                path_to_core = Path(__file__).parent.parent / "core"
+                    log["timings"] = {
+                        **st.session_state.get("timings", {}),
+                        TFIDF_NAME: [item.to_dict() for item in collected_spans()] + job_timings
+                    }
+
+                    path_to_template = Path(__file__).parent.parent / "streamlit_templates" / "text_classification"
+                    path_to_core = Path(__file__).parent.parent / "core"
                 
-                create_app(
-                    model=model, 
-                    log=log, 
-                    path_to_template=path_to_template.as_posix(),
-                    path_to_core=path_to_core.as_posix()
-                    )
-
-                with open("application.zip", "rb") as fp:
-                    btn = st.download_button(
-                        label="Download ZIP",
-                        data=fp,
-                        file_name="application.zip",
-                        mime="application/zip"
-                    )
\ No newline at end of file
+                    archive = create_app(
+                        model=model, 
+                        log=log, 
+                        path_to_template=path_to_template.as_posix(),
+                        path_to_core=path_to_core.as_posix(),
+                        prune=prune
+                        )
+
+                    with archive:
+                        btn = st.download_button(
+                            label="Download ZIP",
+                            data=archive.read(),
+                            file_name="application.zip",
+                            mime="application/zip"
+                        )
+
+    st.session_state.setdefault("timings", {})[TFIDF_NAME] = [item.to_dict() for item in collected_spans()] + job_timings
+
+render_timings(st.session_state.get("timings", {}))
+render_memory(st.session_state)
@@ -0,0 +1,190 @@
+import time
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from nptyping import NDArray
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.linear_model import SGDClassifier
+from sklearn.pipeline import Pipeline
+from core.Dataset import ChunkedPandasDataset
+from core.text_utils import assemble_text
+from core.timing_utils import span
+from pipelines.build_tfidf_logreg import get_classification_report
+from utils.constants import HASHING_FEATURES, INCREMENTAL_CHUNKSIZE, RANDOM_STATE, TEST_SIZE, THRESHOLD
+
+
+def build_incremental_pipeline(class_weight: Dict[Any, float]) -> Pipeline:
+    """
+    builds pipeline that can be trained chunk by chunk: stateless hashing vectoriser
+    and logistic regression trained with stochastic gradient descent
+
+    :param class_weight: weights of the classes, partial_fit does not support 'balanced'
+
+    :return sklearn pipeline
+    """
+    steps = [
+        ('vectoriser', HashingVectorizer(n_features=HASHING_FEATURES, alternate_sign=False)),
+        ('logreg', SGDClassifier(loss='log_loss', class_weight=class_weight, random_state=RANDOM_STATE))
+    ]
+
+    return Pipeline(steps)
+
+
+def balanced_class_weight(class_counts: pd.Series) -> Dict[Any, float]:
+    """
+    computes the same weights as class_weight='balanced' from class counts
+
+    :param class_counts: number of rows of every class
+
+    :return class -> weight
+    """
+    return (class_counts.sum() / (len(class_counts) * class_counts)).to_dict()
+
+
+def is_holdout(X: pd.Series, y: pd.Series) -> NDArray:
+    """
+    assigns rows to the holdout by a hash of their content, so every pass over the file
+    puts the same rows into it and duplicated rows never end up on both sides
+
+    :param X: texts
+    :param y: targets
+
+    :return boolean mask of holdout rows
+    """
+    hashes = pd.util.hash_pandas_object(pd.DataFrame({'text': X.to_numpy(), 'target': y.to_numpy()}), index=False)
+    return (hashes.to_numpy() % 1000) < TEST_SIZE * 1000
+
+
+def count_classes(fileobject: BinaryIO, target_column: str, chunksize: int) -> pd.Series:
+    """
+    counts targets reading only the target column
+
+    :param fileobject: file with data
+    :param target_column: target name
+    :param chunksize: number of rows read at once
+
+    :return number of rows of every class
+    """
+    counts = pd.Series(dtype=int)
+    for chunk in ChunkedPandasDataset(fileobject, chunksize=chunksize, columns=[target_column]).data:
+        counts = counts.add(chunk[target_column].value_counts(), fill_value=0)
+
+    return counts.astype(int)
+
+
+def iterate_batches(
+    fileobject: BinaryIO,
+    text_columns: List[str],
+    target_column: str,
+    chunksize: int,
+    classes: NDArray
+    ) -> Iterator[Tuple[pd.Series, pd.Series, NDArray]]:
+    """
+    streams texts and targets of the given classes from the file
+
+    :param fileobject: file with data
+    :param text_columns: list of column names where relevant text data is stored
+    :param target_column: target name
+    :param chunksize: number of rows read at once
+    :param classes: classes to keep, rows of other classes and without target are skipped
+
+    :return iterator of texts, targets and holdout masks
+    """
+    dataset = ChunkedPandasDataset(
+        fileobject,
+        chunksize=chunksize,
+        columns=text_columns + [target_column],
+        dtype={column: "string" for column in text_columns}
+    )
+
+    for chunk in dataset.data:
+        chunk = chunk[chunk[target_column].isin(classes)]
+        if len(chunk) == 0:
+            continue
+
+        X = assemble_text(df=chunk, text_columns=text_columns).fillna('')
+        y = chunk[target_column].reset_index(drop=True)
+        X = X.reset_index(drop=True)
+
+        yield X, y, is_holdout(X, y)
+
+
+@span("build_incremental_model")
+def build_incremental_model(
+    fileobject: BinaryIO,
+    text_columns: List[str],
+    target_column: str,
+    chunksize: int = INCREMENTAL_CHUNKSIZE,
+    n_epochs: int = 1,
+    threshold: int = THRESHOLD,
+    progress: Optional[Callable[[int, int], None]] = None
+    ) -> Tuple[pd.DataFrame, Pipeline, Dict[str, Any]]:
+    """
+    trains the baseline without loading the file into memory
+
+    The first pass reads only the target column to find classes with more than `threshold` rows and their weights.
+    Then the file is streamed `n_epochs` times, every chunk is hashed and fed to partial_fit except the holdout rows,
+    which are picked by a hash of their content. The last pass predicts the holdout rows. Memory depends on the
+    chunk size and the number of hashed features, not on the size of the file
+
+    :param fileobject: file with data, it is read several times
+    :param text_columns: list of column names where relevant text data is stored
+    :param target_column: target name
+    :param chunksize: number of rows read at once
+    :param n_epochs: number of passes over the training rows
+    :param threshold: minimal number of observations of a class
+    :param progress: function called with the number of rows read in the current pass and the total number of rows
+
+    :return classification report on holdout, fitted model and training statistics
+    """
+    start = time.perf_counter()
+
+    with span("count classes"):
+        class_counts = count_classes(fileobject, target_column=target_column, chunksize=chunksize)
+        class_counts = class_counts[class_counts > threshold]
+    if len(class_counts) < 2:
+        raise ValueError(f"Less than 2 classes have more than {threshold} observations")
+
+    classes = np.sort(class_counts.index.to_numpy())
+    total = int(class_counts.sum())
+    model = build_incremental_pipeline(class_weight=balanced_class_weight(class_counts))
+    vectoriser, logreg = model['vectoriser'], model['logreg']
+    rng = np.random.default_rng(RANDOM_STATE)
+
+    n_train = 0
+    for epoch in range(n_epochs):
+        with span(f"epoch {epoch + 1}"):
+            seen = 0
+            for X, y, holdout in iterate_batches(fileobject, text_columns, target_column, chunksize, classes):
+                train = rng.permutation(np.flatnonzero(~holdout))
+                if len(train):
+                    logreg.partial_fit(vectoriser.transform(X.iloc[train]), y.iloc[train].to_numpy(), classes=classes)
+                seen += len(y)
+                n_train += len(train) if epoch == 0 else 0
+                if progress is not None:
+                    progress(seen, total)
+
+    y_test, y_pred = [], []
+    with span("holdout evaluation"):
+        seen = 0
+        for X, y, holdout in iterate_batches(fileobject, text_columns, target_column, chunksize, classes):
+            if holdout.any():
+                y_test.append(y[holdout].to_numpy())
+                y_pred.append(model.predict(X[holdout]))
+            seen += len(y)
+            if progress is not None:
+                progress(seen, total)
+
+    y_test = np.concatenate(y_test) if y_test else np.array([])
+    y_pred = np.concatenate(y_pred) if y_pred else np.array([])
+
+    stats = {
+        "classes": len(classes),
+        "train rows": n_train,
+        "holdout rows": len(y_test),
+        "epochs": n_epochs,
+        "seconds": round(time.perf_counter() - start, 2)
+    }
+
+    return get_classification_report(y_test=y_test, y_pred=y_pred), model, stats
@@ -3,12 +3,14 @@ import pandas as pd
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.linear_model import LogisticRegression
 from sklearn.metrics import classification_report
-from sklearn.model_selection import (StratifiedKFold, cross_val_score,
-                                     train_test_split)
+from sklearn.model_selection import StratifiedKFold, StratifiedShuffleSplit
 from sklearn.pipeline import Pipeline
-from typing import Union, Any, List, Tuple
+from typing import Union, Any, Callable, Dict, List, Optional, Tuple
 from nptyping import NDArray
-from utils.constants import RANDOM_STATE
+from utils.constants import CV_FOLDS, RANDOM_STATE, TEST_SIZE
+from pipelines.oof_cache import CachedCorpus
+from pipelines.tfidf_engine import Fold, fit_logreg, to_vectoriser
+from core.timing_utils import span
 
 
 def build_pipeline() -> Pipeline:
@@ -20,7 +22,7 @@ def build_pipeline() -> Pipeline:
 
     steps = [
         ('vectoriser', TfidfVectorizer()),
-        ('logreg', LogisticRegression(class_weight='balanced', n_jobs=-1))
+        ('logreg', LogisticRegression(class_weight='balanced'))
     ]
 
     pipe = Pipeline(steps)
@@ -28,6 +30,24 @@ def build_pipeline() -> Pipeline:
     return pipe
 
 
+def build_cv() -> StratifiedKFold:
+    """
+    builds the cross validation splitter shared by the baseline and the label audit
+
+    :return 5 stratified folds
+    """
+    return StratifiedKFold(n_splits=CV_FOLDS, shuffle=True, random_state=RANDOM_STATE)
+
+
+def build_holdout() -> StratifiedShuffleSplit:
+    """
+    builds the train/test splitter of the baseline, it splits exactly as train_test_split with stratification
+
+    :return one stratified shuffle split
+    """
+    return StratifiedShuffleSplit(n_splits=1, test_size=TEST_SIZE, random_state=RANDOM_STATE)
+
+
 def fit_model(X: Union[pd.Series, List[str]], y: List[Any]) -> Tuple[Pipeline, NDArray]:
     """
     Computes f1-weighted cross validation on 5 stratified folds and fits model
@@ -37,15 +57,33 @@ def fit_model(X: Union[pd.Series, List[str]], y: List[Any]) -> Tuple[Pipeline, N
 
     :return scores on cross validation and model fitted on the whole data
     """
-    stf = StratifiedKFold(n_splits=5, shuffle=True, random_state=RANDOM_STATE)
     pipe = build_pipeline()
+    data = CachedCorpus(X=X, y=y, pipe=pipe)
 
-    train_scores = cross_val_score(
-        pipe, X=X, y=y, cv=stf, scoring='f1_weighted')
+    oof = data.cross_validate(cv=build_cv())
+    fold = fit_logreg(corpus=data.corpus, y=data.y, rows=np.arange(len(data.y)), logreg=pipe['logreg'])
 
-    pipe.fit(X=X, y=y)
+    return assemble_pipeline(vectoriser=pipe['vectoriser'], feature_names=data.corpus.feature_names, fold=fold), oof.scores
 
-    return pipe, train_scores
+
+def assemble_pipeline(vectoriser: TfidfVectorizer, feature_names: NDArray, fold: Fold) -> Pipeline:
+    """
+    wraps vocabulary learned on a tokenized corpus and fitted model into a pipeline that works on raw texts
+
+    :param vectoriser: unfitted vectoriser the corpus was tokenized with
+    :param feature_names: full vocabulary of the tokenized corpus
+    :param fold: vocabulary and logistic regression fitted on the corpus
+
+    :return fitted sklearn pipeline
+    """
+    vocabulary, logreg = fold
+
+    steps = [
+        ('vectoriser', to_vectoriser(vectoriser=vectoriser, feature_names=feature_names, vocabulary=vocabulary)),
+        ('logreg', logreg)
+    ]
+
+    return Pipeline(steps)
 
 
 def get_classification_report(y_test: Union[List[Any], NDArray], y_pred: Union[List[Any], NDArray]) -> pd.DataFrame:
@@ -69,25 +107,65 @@ def get_classification_report(y_test: Union[List[Any], NDArray], y_pred: Union[L
     return df_classification_report
 
 
+def shift_progress(
+    progress: Optional[Callable[[int, int], None]],
+    offset: int,
+    total: int
+    ) -> Optional[Callable[[int, int], None]]:
+    """
+    turns progress of one step into progress of a job made of several steps
+
+    :param progress: function called with the number of finished and total steps of the job
+    :param offset: number of job steps finished before this step
+    :param total: number of steps in the job
+
+    :return function called with the number of finished and total steps of this step
+    """
+    if progress is None:
+        return None
+    return lambda done, _: progress(offset + done, total)
+
+
+@span("build_tfidf_logreg")
 def build_tfidf_logreg(
     X: Union[pd.Series, List[str]], 
-    y: List[Any]
+    y: List[Any],
+    params: Optional[Dict[str, Any]] = None,
+    progress: Optional[Callable[[int, int], None]] = None
     ) -> Tuple[NDArray, NDArray, pd.DataFrame, Pipeline]:
     """
     splits data into train and test, fits model and returns all metrics
 
+    The corpus is tokenized once and every fit works on slices of the same count matrix, every model is fitted
+    from scratch, so metrics are the same as of a plain Pipeline.fit. The model for the full data is never fitted
+    since only its cross validation scores are reported.
+    Cross validation results are shared through the out-of-fold cache, so the folds already
+    computed by the label audit are not fitted again
+
     :param X: list or series of textual features
     :param y: list of targets
+    :param params: pipeline parameters overriding the defaults, e.g. found by tune_tfidf_logreg
+    :param progress: function called with the number of fitted folds and the number of folds to fit
 
     :return train metrics, full data metrics, classification report on test data, fitted model
     """
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=RANDOM_STATE, stratify=y)
+    pipe = build_pipeline().set_params(**(params or {}))
+    data = CachedCorpus(X=X, y=y, pipe=pipe)
+
+    train_rows, _ = next(build_holdout().split(data.y, data.y))
 
-    model, train_scores = fit_model(X=X_train, y=y_train)
-    _, overall_scores = fit_model(X=X, y=y)
+    total = 2 * CV_FOLDS + 1
 
-    y_pred = model.predict(X_test)
+    with span("train cross validation"):
+        train = data.cross_validate(cv=build_cv(), rows=train_rows, progress=shift_progress(progress, 0, total))
+    with span("full data cross validation"):
+        overall = data.cross_validate(cv=build_cv(), progress=shift_progress(progress, CV_FOLDS, total))
+    with span("holdout fit"):
+        holdout = data.cross_validate(cv=build_holdout(), progress=shift_progress(progress, 2 * CV_FOLDS, total))
 
-    df_classification_report = get_classification_report(y_test=y_test, y_pred=y_pred)
+    df_classification_report = get_classification_report(
+        y_test=data.y[holdout.tested], y_pred=holdout.predictions[holdout.tested]
+    )
+    model = assemble_pipeline(vectoriser=pipe['vectoriser'], feature_names=holdout.feature_names, fold=holdout.folds[0])
 
-    return train_scores, overall_scores, df_classification_report, model
+    return train.scores, overall.scores, df_classification_report, model
@@ -0,0 +1,171 @@
+import glob
+import hashlib
+import os
+import tempfile
+from typing import Any, Callable, List, Optional, Union
+
+import joblib
+import numpy as np
+import pandas as pd
+from nptyping import NDArray
+from sklearn.model_selection import BaseCrossValidator
+from sklearn.pipeline import Pipeline
+from core.timing_utils import span
+from utils.constants import OOF_CACHE_FOLDER, OOF_CACHE_SIZE
+from pipelines.tfidf_engine import OutOfFold, TokenizedCorpus, cross_validate
+
+OOF_CACHE_VARIABLE = "TRAINING_PIPELINES_OOF_CACHE"
+
+
+def cache_dir() -> str:
+    """
+    folder shared by all processes of the app where out-of-fold results are stored,
+    can be moved with the TRAINING_PIPELINES_OOF_CACHE environment variable
+
+    :return path to the existing folder
+    """
+    path = os.environ.get(OOF_CACHE_VARIABLE) or os.path.join(tempfile.gettempdir(), OOF_CACHE_FOLDER)
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    return path
+
+
+def load(key: str) -> Optional[OutOfFold]:
+    """
+    :param key: fingerprint of the cross validation
+
+    :return stored out-of-fold results or None, marks them as recently used
+    """
+    path = os.path.join(cache_dir(), f"{key}.joblib")
+    try:
+        file = open(path, "rb")
+    except FileNotFoundError:
+        return None
+
+    with file, span("load cached out-of-fold results"):
+        result = joblib.load(file)
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        pass
+    return result
+
+
+def store(key: str, result: OutOfFold) -> None:
+    """
+    writes out-of-fold results and removes the least recently used ones beyond OOF_CACHE_SIZE,
+    the file is renamed into place once written, so other processes never read a partial file
+
+    :param key: fingerprint of the cross validation
+    :param result: out-of-fold results
+    """
+    folder = cache_dir()
+    partial = os.path.join(folder, f"{key}.{os.getpid()}.partial")
+    joblib.dump(result, partial)
+    os.replace(partial, os.path.join(folder, f"{key}.joblib"))
+
+    paths = []
+    for path in glob.glob(os.path.join(folder, "*.joblib")):
+        try:
+            paths.append((os.path.getmtime(path), path))
+        except FileNotFoundError:
+            continue
+    for _, path in sorted(paths, reverse=True)[OOF_CACHE_SIZE:]:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            continue
+
+
+class CachedCorpus:
+    """
+    Texts and targets whose cross validation results are shared across the app.
+
+    Out-of-fold results are stored on disk in an LRU cache keyed by a fingerprint of
+    (texts, targets, pipeline params, folds). The cache is shared by all processes, so the label audit
+    on the EDA page and the baseline trainer never cross validate the same data twice, even when their jobs
+    run in different worker processes. The corpus is only tokenized on a cache miss.
+    """
+
+    def __init__(self, X: Union[pd.Series, List[str]], y: List[Any], pipe: Pipeline):
+
+        self.X = X
+        self.y = np.asarray(y)
+        self.pipe = pipe
+        self.hashes = pd.util.hash_pandas_object(
+            pd.DataFrame({'text': list(X), 'target': self.y}), index=False
+        ).to_numpy()
+        self.params = sorted(
+            (name, repr(value)) for name, value in pipe.get_params().items() if '__' in name
+        )
+        self._corpus = None
+
+    @property
+    def corpus(self) -> TokenizedCorpus:
+        if self._corpus is None:
+            self._corpus = TokenizedCorpus(X=self.X, vectoriser=self.pipe['vectoriser'])
+        return self._corpus
+
+    def fingerprint(self, rows: NDArray, cv: BaseCrossValidator) -> str:
+        """
+        cheap content hash of everything that determines the result of cross validation
+
+        :param rows: indices of the documents taking part in cross validation
+        :param cv: cross validation splitter
+
+        :return hex digest
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(self.hashes[rows].tobytes())
+        digest.update(repr((self.params, repr(cv))).encode())
+        return digest.hexdigest()
+
+    def cross_validate(
+        self,
+        cv: BaseCrossValidator,
+        rows: Optional[NDArray] = None,
+        progress: Optional[Callable[[int, int], None]] = None
+        ) -> OutOfFold:
+        """
+        returns cached out-of-fold results or computes and caches them
+
+        :param cv: cross validation splitter
+        :param rows: indices of the documents taking part in cross validation, all by default
+        :param progress: function called with the number of finished folds and the number of folds,
+            once with all folds finished on a cache hit
+
+        :return out-of-fold predictions, scores and solutions
+        """
+        if rows is None:
+            rows = np.arange(len(self.y))
+
+        key = self.fingerprint(rows=rows, cv=cv)
+
+        cached = load(key)
+        if cached is not None:
+            if progress is not None:
+                progress(len(cached.folds), len(cached.folds))
+            return cached
+
+        result = cross_validate(
+            corpus=self.corpus,
+            y=self.y,
+            rows=rows,
+            cv=cv,
+            logreg=self.pipe['logreg'],
+            progress=progress
+        )
+
+        store(key, result)
+
+        return result
+
+
+def clear_cache() -> None:
+    """
+    drops all cached out-of-fold results, e.g. to measure cold training time
+    """
+    for path in glob.glob(os.path.join(cache_dir(), "*.joblib")):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            continue
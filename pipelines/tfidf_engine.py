@@ -0,0 +1,311 @@
+import copy
+from numbers import Integral
+from typing import Callable, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed, parallel_config
+from nptyping import NDArray
+from sklearn.base import clone
+from sklearn.feature_extraction.text import (CountVectorizer, TfidfTransformer,
+                                             TfidfVectorizer)
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import f1_score
+from sklearn.model_selection import BaseCrossValidator
+from core.parallel_utils import ParallelPlan
+
+WEIGHTING_PARAMS = ('norm', 'use_idf', 'smooth_idf', 'sublinear_tf')
+PRUNING_PARAMS = ('min_df', 'max_df', 'max_features')
+
+Vocabulary = Tuple[NDArray, TfidfTransformer]
+Fold = Tuple[Vocabulary, LogisticRegression]
+
+
+class TokenizedCorpus:
+    """
+    Corpus tokenized once with the settings of a TfidfVectorizer.
+
+    Produces exactly the tf-idf matrices the vectoriser would have produced if it was
+    fitted on any subset of rows, without running the analyzer over the texts again.
+    """
+
+    def __init__(self, X: Union[pd.Series, List[str]], vectoriser: TfidfVectorizer):
+
+        self.vectoriser = vectoriser
+
+        params = vectoriser.get_params()
+        for name in WEIGHTING_PARAMS + PRUNING_PARAMS:
+            params.pop(name)
+
+        counter = CountVectorizer(**params)
+        self.counts = counter.fit_transform(X)
+        self.feature_names = counter.get_feature_names_out()
+        self.tokenization = tokenization_params(vectoriser)
+
+    def with_vectoriser(self, vectoriser: TfidfVectorizer) -> "TokenizedCorpus":
+        """
+        shares the token counts with a vectoriser that differs only in weighting or pruning settings
+
+        :param vectoriser: unfitted vectoriser with the same tokenization settings
+
+        :return corpus that fits vocabularies the new vectoriser would learn
+        """
+        if tokenization_params(vectoriser) != self.tokenization:
+            raise ValueError("Vectoriser tokenizes texts differently from the corpus")
+
+        corpus = copy.copy(self)
+        corpus.vectoriser = vectoriser
+        return corpus
+
+    def fit(self, rows: NDArray) -> Vocabulary:
+        """
+        learns vocabulary and idf the vectoriser would learn on the given rows
+
+        :param rows: indices of the documents to fit on
+
+        :return indices of the kept terms in the full vocabulary and fitted tf-idf transformer
+        """
+        counts = self.counts[rows]
+
+        if self.vectoriser.vocabulary is not None:
+            kept = np.arange(counts.shape[1])
+        else:
+            kept = self._limit_features(counts=counts)
+
+        weighting = {name: getattr(self.vectoriser, name) for name in WEIGHTING_PARAMS}
+        transformer = TfidfTransformer(**weighting).fit(counts[:, kept])
+
+        return kept, transformer
+
+    def transform(self, rows: NDArray, vocabulary: Vocabulary):
+        """
+        builds tf-idf matrix for the given rows
+
+        :param rows: indices of the documents to transform
+        :param vocabulary: result of `fit`
+
+        :return sparse tf-idf matrix
+        """
+        kept, transformer = vocabulary
+        return transformer.transform(self.counts[rows][:, kept], copy=False)
+
+    def to_vectoriser(self, vocabulary: Vocabulary) -> TfidfVectorizer:
+        """
+        turns vocabulary into a fitted vectoriser that can be used on raw texts
+
+        :param vocabulary: result of `fit`
+
+        :return fitted TfidfVectorizer
+        """
+        return to_vectoriser(vectoriser=self.vectoriser, feature_names=self.feature_names, vocabulary=vocabulary)
+
+    def _limit_features(self, counts) -> NDArray:
+        """
+        mirrors document frequency pruning of CountVectorizer restricted to the terms present in counts
+        """
+        n_doc = counts.shape[0]
+        max_df = self.vectoriser.max_df
+        min_df = self.vectoriser.min_df
+        max_features = self.vectoriser.max_features
+
+        max_doc_count = max_df if isinstance(max_df, Integral) else max_df * n_doc
+        min_doc_count = min_df if isinstance(min_df, Integral) else min_df * n_doc
+        if max_doc_count < min_doc_count:
+            raise ValueError("max_df corresponds to < documents than min_df")
+
+        dfs = np.bincount(counts.indices, minlength=counts.shape[1])
+        mask = (dfs > 0) & (dfs <= max_doc_count) & (dfs >= min_doc_count)
+
+        if max_features is not None and mask.sum() > max_features:
+            tfs = np.asarray(counts.sum(axis=0)).ravel()
+            mask_inds = (-tfs[mask]).argsort()[:max_features]
+            new_mask = np.zeros(len(dfs), dtype=bool)
+            new_mask[np.where(mask)[0][mask_inds]] = True
+            mask = new_mask
+
+        kept = np.where(mask)[0]
+        if len(kept) == 0:
+            raise ValueError("After pruning, no terms remain. Try a lower min_df or a higher max_df.")
+
+        return kept
+
+
+def tokenization_params(vectoriser: TfidfVectorizer) -> str:
+    """
+    describes the settings that change token counts, vectorisers with equal descriptions can share a corpus
+
+    :param vectoriser: tf-idf vectoriser
+
+    :return repr of the sorted tokenization parameters
+    """
+    params = vectoriser.get_params()
+    return repr(sorted(
+        (name, value) for name, value in params.items() if name not in WEIGHTING_PARAMS + PRUNING_PARAMS
+    ))
+
+
+class OutOfFold:
+    """
+    Results of cross validation over rows of a tokenized corpus.
+
+    Keeps predictions and probabilities for every held out row, f1-weighted score of every fold
+    and the fold solutions, so they can be reused for label auditing, reporting and building the final model.
+    """
+
+    def __init__(
+        self,
+        classes: NDArray,
+        predictions: NDArray,
+        pred_probs: NDArray,
+        tested: NDArray,
+        scores: NDArray,
+        folds: List[Fold],
+        feature_names: NDArray
+        ):
+
+        self.classes = classes
+        self.predictions = predictions
+        self.pred_probs = pred_probs
+        self.tested = tested
+        self.scores = scores
+        self.folds = folds
+        self.feature_names = feature_names
+
+
+def to_vectoriser(vectoriser: TfidfVectorizer, feature_names: NDArray, vocabulary: Vocabulary) -> TfidfVectorizer:
+    """
+    turns vocabulary learned on a tokenized corpus into a fitted vectoriser that can be used on raw texts
+
+    :param vectoriser: unfitted vectoriser the corpus was tokenized with
+    :param feature_names: full vocabulary of the tokenized corpus
+    :param vocabulary: result of `TokenizedCorpus.fit`
+
+    :return fitted TfidfVectorizer
+    """
+    kept, transformer = vocabulary
+
+    fitted = clone(vectoriser)
+    fitted.vocabulary_ = {term: i for i, term in enumerate(feature_names[kept])}
+    fitted.fixed_vocabulary_ = vectoriser.vocabulary is not None
+    fitted._tfidf = transformer
+
+    return fitted
+
+
+def fit_logreg(
+    corpus: TokenizedCorpus,
+    y: NDArray,
+    rows: NDArray,
+    logreg: LogisticRegression
+    ) -> Tuple[Vocabulary, LogisticRegression]:
+    """
+    fits vectoriser and a fresh copy of logistic regression on the given rows
+
+    :param corpus: tokenized corpus
+    :param y: array of targets for the whole corpus
+    :param rows: indices of the documents to fit on
+    :param logreg: unfitted logistic regression used as a template
+
+    :return fitted vocabulary and fitted logistic regression
+    """
+    vocabulary = corpus.fit(rows)
+    X = corpus.transform(rows, vocabulary)
+
+    logreg = clone(logreg)
+    logreg.fit(X, y[rows])
+
+    return vocabulary, logreg
+
+
+def fit_fold(
+    index: int,
+    corpus: TokenizedCorpus,
+    y: NDArray,
+    rows: NDArray,
+    train: NDArray,
+    test: NDArray,
+    logreg: LogisticRegression
+    ) -> Tuple[int, Fold, NDArray, NDArray]:
+    """
+    fits one cross validation fold and predicts its test rows, runs in a worker process
+
+    :param index: number of the fold
+    :param corpus: tokenized corpus
+    :param y: array of targets for the whole corpus
+    :param rows: indices of the documents taking part in cross validation
+    :param train: positions of the train documents in rows
+    :param test: positions of the test documents in rows
+    :param logreg: unfitted logistic regression used as a template
+
+    :return number of the fold, fold solution, predictions and class probabilities of the test rows
+    """
+    vocabulary, fold_logreg = fit_logreg(corpus=corpus, y=y, rows=rows[train], logreg=logreg)
+    X_test = corpus.transform(rows[test], vocabulary)
+
+    return index, (vocabulary, fold_logreg), fold_logreg.predict(X_test), fold_logreg.predict_proba(X_test)
+
+
+def cross_validate(
+    corpus: TokenizedCorpus,
+    y: NDArray,
+    rows: NDArray,
+    cv: BaseCrossValidator,
+    logreg: LogisticRegression,
+    progress: Optional[Callable[[int, int], None]] = None,
+    cores: Optional[int] = None
+    ) -> OutOfFold:
+    """
+    computes f1-weighted cross validation on the given rows of the tokenized corpus
+
+    Folds are fitted in parallel worker processes as planned by ParallelPlan, every worker gets an equal share
+    of the remaining cores for BLAS threads. Results do not depend on the number of workers
+
+    :param corpus: tokenized corpus
+    :param y: array of targets for the whole corpus
+    :param rows: indices of the documents taking part in cross validation
+    :param cv: cross validation splitter
+    :param logreg: unfitted logistic regression used as a template
+    :param progress: function called with the number of finished folds and the number of folds
+    :param cores: number of cores to use, all available cores by default, 1 when called from another parallel worker
+
+    :return out-of-fold predictions, scores and solutions
+    """
+    y_rows = y[rows]
+    classes = np.unique(y_rows)
+    splits = list(cv.split(rows, y_rows))
+    plan = ParallelPlan(n_tasks=len(splits), cores=cores)
+
+    predictions = y_rows.copy()
+    pred_probs = np.full((len(rows), len(classes)), np.nan)
+    tested = np.zeros(len(rows), dtype=bool)
+    scores = [0.0] * len(splits)
+    folds = [None] * len(splits)
+
+    with plan.limit_threads(), parallel_config(backend="loky", inner_max_num_threads=plan.n_threads):
+        results = Parallel(n_jobs=plan.n_workers, return_as="generator_unordered")(
+            delayed(fit_fold)(index, corpus, y, rows, train, test, logreg)
+            for index, (train, test) in enumerate(splits)
+        )
+
+        for finished, (index, fold, fold_predictions, fold_probs) in enumerate(results, 1):
+            _, test = splits[index]
+
+            predictions[test] = fold_predictions
+            pred_probs[np.ix_(test, np.searchsorted(classes, fold[1].classes_))] = fold_probs
+            tested[test] = True
+
+            scores[index] = f1_score(y_rows[test], predictions[test], average='weighted')
+            folds[index] = fold
+
+            if progress is not None:
+                progress(finished, len(splits))
+
+    return OutOfFold(
+        classes=classes,
+        predictions=predictions,
+        pred_probs=pred_probs,
+        tested=tested,
+        scores=np.array(scores),
+        folds=folds,
+        feature_names=corpus.feature_names
+    )
@@ -0,0 +1,183 @@
+import math
+import time
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed, parallel_config
+from nptyping import NDArray
+from sklearn.model_selection import ParameterGrid, StratifiedKFold, StratifiedShuffleSplit
+from sklearn.pipeline import Pipeline
+from core.parallel_utils import ParallelPlan
+from core.timing_utils import span
+from pipelines.build_tfidf_logreg import build_holdout, build_pipeline
+from pipelines.tfidf_engine import TokenizedCorpus, cross_validate, tokenization_params
+from utils.constants import (RANDOM_STATE, TUNING_BUDGET, TUNING_CV_FOLDS, TUNING_FACTOR, TUNING_GRID,
+                             TUNING_MIN_ROWS_PER_CLASS)
+
+
+def evaluate_candidate(
+    corpus: TokenizedCorpus,
+    y: NDArray,
+    rows: NDArray,
+    pipe: Pipeline
+    ) -> Tuple[float, float]:
+    """
+    cross validates one candidate on the given rows
+
+    :param corpus: corpus tokenized with the same tokenization settings as the candidate
+    :param y: array of targets for the whole corpus
+    :param rows: indices of the documents to cross validate on
+    :param pipe: candidate pipeline with vectoriser and logreg steps
+
+    :return mean f1-weighted score and time spent in seconds
+    """
+    start = time.perf_counter()
+    oof = cross_validate(
+        corpus=corpus.with_vectoriser(pipe['vectoriser']),
+        y=y,
+        rows=rows,
+        cv=StratifiedKFold(n_splits=TUNING_CV_FOLDS, shuffle=True, random_state=RANDOM_STATE),
+        logreg=pipe['logreg'],
+        cores=1
+    )
+    return float(np.mean(oof.scores)), time.perf_counter() - start
+
+
+def _evaluate_indexed(index: int, *args: Any) -> Tuple[int, Tuple[float, float]]:
+
+    return index, evaluate_candidate(*args)
+
+
+def stratified_subsample(y: NDArray, rows: NDArray, size: int) -> NDArray:
+    """
+    takes stratified random subset of rows
+
+    :param y: array of targets for the whole corpus
+    :param rows: indices to sample from
+    :param size: number of rows to take
+
+    :return sorted indices
+    """
+    if size >= len(rows):
+        return rows
+
+    splitter = StratifiedShuffleSplit(n_splits=1, train_size=size, random_state=RANDOM_STATE)
+    sample, _ = next(splitter.split(rows, y[rows]))
+    return np.sort(rows[sample])
+
+
+def halving_schedule(n_candidates: int, n_rows: int, min_rows: int, factor: int) -> List[int]:
+    """
+    number of rows used in every round of successive halving, the last round uses all rows
+
+    :param n_candidates: number of candidates in the first round
+    :param n_rows: number of rows available
+    :param min_rows: smallest number of rows worth cross validating on
+    :param factor: share of candidates kept and growth of rows between rounds
+
+    :return list of row counts
+    """
+    n_rounds = max(math.ceil(math.log(max(n_candidates, 1), factor)), 0) + 1
+    n_rounds = min(n_rounds, max(int(math.log(max(n_rows / min_rows, 1), factor)) + 1, 1))
+    return [max(n_rows // factor ** (n_rounds - 1 - i), min(min_rows, n_rows)) for i in range(n_rounds)]
+
+
+@span("tune_tfidf_logreg")
+def tune_tfidf_logreg(
+    X: Union[pd.Series, List[str]],
+    y: List[Any],
+    budget: float = TUNING_BUDGET,
+    grid: Optional[Dict[str, List[Any]]] = None,
+    factor: int = TUNING_FACTOR,
+    cores: Optional[int] = None
+    ) -> Tuple[Dict[str, Any], pd.DataFrame]:
+    """
+    searches vectoriser and logistic regression settings with successive halving under a wall-clock budget
+
+    All candidates are cross validated on a small stratified sample of the training split, the best 1/factor
+    of them go to the next round with factor times more rows, until the last round on the whole training split.
+    The test split of the baseline is never seen, so its classification report stays honest.
+    Texts are tokenized once per distinct tokenization setting (e.g. ngram_range), candidates differing only
+    in min_df, sublinear_tf or C reuse the same count matrix. Candidates of a round run in parallel.
+    When the budget runs out, unfinished candidates are dropped and the best one of the latest round wins,
+    if no candidate finished at all, no parameters are returned and the pipeline keeps its defaults
+
+    :param X: list or series of textual features
+    :param y: list of targets
+    :param budget: wall-clock budget in seconds
+    :param grid: pipeline parameters to search, TUNING_GRID by default
+    :param factor: share of candidates kept and growth of rows between rounds
+    :param cores: number of cores to use, all available cores by default. Candidates are the parallel tasks,
+        their folds run one after another
+
+    :return best parameters for `Pipeline.set_params`, empty when the budget ran out before any candidate finished,
+        and history with one row per evaluated candidate
+
+    Example
+
+    >>> params, history = tune_tfidf_logreg(X=X, y=y, budget=60)
+    >>> params
+    {'logreg__C': 10.0, 'vectoriser__min_df': 1, 'vectoriser__ngram_range': (1, 2), 'vectoriser__sublinear_tf': True}
+    """
+    deadline = time.perf_counter() + budget
+    y = np.asarray(y)
+    train_rows, _ = next(build_holdout().split(y, y))
+
+    searched = grid or TUNING_GRID
+    candidates = [build_pipeline().set_params(**params) for params in ParameterGrid(searched)]
+    min_rows = TUNING_MIN_ROWS_PER_CLASS * len(np.unique(y))
+
+    corpora = {}
+    with span("tokenization"):
+        for pipe in candidates:
+            key = tokenization_params(pipe['vectoriser'])
+            if key not in corpora:
+                corpora[key] = TokenizedCorpus(X=X, vectoriser=pipe['vectoriser'])
+
+    history = []
+    alive = list(range(len(candidates)))
+    best = None
+
+    plan = ParallelPlan(n_tasks=len(candidates), cores=cores)
+
+    with parallel_config(backend="loky", inner_max_num_threads=plan.n_threads), \
+            Parallel(n_jobs=plan.n_workers, return_as="generator_unordered") as parallel:
+        for round_number, n_rows in enumerate(halving_schedule(len(candidates), len(train_rows), min_rows, factor)):
+            if time.perf_counter() >= deadline:
+                break
+
+            rows = stratified_subsample(y=y, rows=train_rows, size=n_rows)
+            tasks = (
+                delayed(_evaluate_indexed)(
+                    i, corpora[tokenization_params(candidates[i]['vectoriser'])], y, rows, candidates[i]
+                )
+                for i in alive
+            )
+
+            scores = {}
+            with span(f"round {round_number + 1}: {len(alive)} candidates on {len(rows)} rows"):
+                for i, (score, seconds) in parallel(tasks):
+                    scores[i] = score
+                    history.append({
+                        "round": round_number + 1,
+                        "rows": len(rows),
+                        **{name: repr(value) for name, value in candidates[i].get_params().items()
+                           if name in searched},
+                        "f1 weighted": score,
+                        "seconds": seconds
+                    })
+                    if time.perf_counter() >= deadline:
+                        break
+
+            if not scores:
+                break
+
+            ranked = sorted(scores, key=lambda i: (-scores[i], i))
+            best = ranked[0]
+            alive = ranked[:max(math.ceil(len(ranked) / factor), 1)]
+
+    if best is None:
+        return {}, pd.DataFrame(history)
+    params = {name: value for name, value in candidates[best].get_params().items() if name in searched}
+    return params, pd.DataFrame(history)
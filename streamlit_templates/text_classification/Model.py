@@ -1,27 +1,120 @@
+import hashlib
+import os
 import joblib
+import numpy as np
 import pandas as pd
-from typing import List
+from typing import List, Optional, Tuple
 from core.BaseCLFModel import BaseCLFModel
+from core.LinearExplainer import LinearExplainer
+from core.ModelArtifact import ModelArtifact
+from core.PredictionCache import PredictionCache
+from core.timing_utils import span
 
 
 class Model(BaseCLFModel):
 
-    def __init__(self):
-        self.model = joblib.load('model.joblib')
+    cache_size = 100000
+
+    def __init__(self, path: Optional[str] = None, cache_size: Optional[int] = None):
+        """
+        :param path: folder with memory-mapped model arrays or joblib file,
+                     by default `model` folder is used if it exists and `model.joblib` otherwise
+        :param cache_size: number of predictions of unique texts kept between calls, 0 disables the cache,
+                           hit rate is available from `self.cache.stats()`
+        """
+        if path is None:
+            path = 'model' if os.path.isdir('model') else 'model.joblib'
+
+        self.model = ModelArtifact(path) if os.path.isdir(path) else joblib.load(path)
+        self.version = self.model_version(path)
+        self.explainer = LinearExplainer(self.model) if LinearExplainer.supports(self.model) else None
+        self.cache = PredictionCache(self.cache_size if cache_size is None else cache_size)
+        self.timings = None
+
+    @staticmethod
+    def model_version(path: str) -> str:
+        """
+        fingerprints model files by their names, sizes and modification times without reading them
+
+        :param path: folder with model arrays or joblib file
+
+        :return hex digest that changes whenever the model is replaced
+        """
+        paths = sorted(os.path.join(path, name) for name in os.listdir(path)) if os.path.isdir(path) else [path]
+        digest = hashlib.blake2b(digest_size=16)
+        for file in paths:
+            stat = os.stat(file)
+            digest.update(f"{os.path.basename(file)}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+        return digest.hexdigest()
     
-    def predict(self, df: pd.DataFrame, text_columns: List[str], target_column: str) -> pd.DataFrame:
+    def predict(self, df: pd.DataFrame, text_columns: List[str], target_column: str, explain: int = 0) -> pd.DataFrame:
         """
         joins all specified text fields and runs inference
 
         :param df: dataframe on what to run inference
         :param text_columns: list of column names where relevant text data is stored
         :param target_column: target name
+        :param explain: number of terms that contributed the most to every prediction, they are added
+                        as `{target_column}_term_1`, `{target_column}_weight_1`, ... columns, see LinearExplainer
+
+        :return dataframe with predictions, timings of the call are kept in `self.timings`
+        """
+        with span("Model.predict") as timing:
+            with span("assemble text"):
+                data = self.return_text(df=df, text_columns=text_columns)
+
+            if explain:
+                with span("inference with explanations"):
+                    labels, explanation = self.explain_texts(data, top_k=explain, prefix=f"{target_column}_")
+                df[target_column] = labels
+                for column in explanation.columns:
+                    df[column] = explanation[column].to_numpy()
+            else:
+                with span("inference"):
+                    df[target_column] = self.predict_texts(data)
+
+        self.timings = timing.to_dict()
 
-        :return dataframe with predictions
+        return df
+
+    def predict_texts(self, texts: pd.Series) -> np.ndarray:
+        """
+        predicts labels, identical texts are scored once and predictions of texts seen before come from the cache
+
+        :param texts: assembled texts
+
+        :return array of labels
         """
+        return self.cache.lookup("label", texts, self.model.predict)
+
+    def predict_proba(self, texts: pd.Series) -> np.ndarray:
+        """
+        predicts class probabilities in the order of `self.model.classes_`, cached the same way as labels
+
+        :param texts: assembled texts
 
-        data = self.return_text(df=df, text_columns=text_columns)
+        :return array of shape (number of texts, number of classes)
+        """
+        return self.cache.lookup("proba", texts, self.model.predict_proba)
+
+    def explain_texts(self, texts: pd.Series, top_k: int, prefix: str = "") -> Tuple[np.ndarray, pd.DataFrame]:
+        """
+        predicts labels together with the terms that contributed to them the most, cached the same way as labels
+
+        :param texts: assembled texts
+        :param top_k: number of terms per text
+        :param prefix: prefix of explanation column names
+
+        :return array of labels and dataframe with term and weight columns
+        """
+        if self.explainer is None:
+            raise ValueError("Only linear models on top of a vectoriser with known terms can be explained")
 
-        df[target_column] = self.model.predict(data)
+        def compute(unique_texts: pd.Series) -> np.ndarray:
+            labels, terms, weights = self.explainer.explain_matrix(self.explainer.transform(unique_texts), top_k)
+            return np.column_stack([labels.astype(object), terms, weights.astype(object)])
 
-        return df
\ No newline at end of file
+        outputs = self.cache.lookup(f"explain {top_k}", texts, compute)
+        labels = outputs[:, 0].astype(self.explainer.classes.dtype)
+        explanation = LinearExplainer.to_frame(outputs[:, 1:top_k + 1], outputs[:, top_k + 1:], prefix=prefix)
+        return labels, explanation
\ No newline at end of file
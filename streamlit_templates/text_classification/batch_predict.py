@@ -0,0 +1,153 @@
+import argparse
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+from Model import Model
+from core.Dataset import SUPPORTED_EXTENSIONS, ChunkedPandasDataset
+from core.OutputWriter import OUTPUT_FORMATS, OutputWriter
+from core.parallel_utils import ParallelPlan, available_cores
+
+_model = None
+
+
+def _init_worker(model_path: Optional[str], plan: ParallelPlan) -> None:
+    """
+    loads model once per worker process and limits its BLAS threads to its share of the cores
+    """
+    global _model
+    plan.set_thread_limit()
+    _model = Model(path=model_path)
+
+
+def _predict_chunk(chunk: pd.DataFrame, text_columns: List[str]) -> np.ndarray:
+    """
+    runs inference on text columns of one chunk inside a worker process
+    """
+    data = _model.return_text(df=chunk, text_columns=text_columns)
+    return _model.predict_texts(data)
+
+
+def expand_inputs(patterns: List[str]) -> List[str]:
+    """
+    expands globs into a sorted list of unique files
+
+    :param patterns: file paths or glob patterns
+
+    :return list of paths
+    """
+    paths = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern)) or [pattern]
+        paths.extend(path for path in matches if path not in paths)
+    return paths
+
+
+def predict_file(
+    executor: ProcessPoolExecutor,
+    path: str,
+    output_path: str,
+    output_format: str,
+    text_columns: List[str],
+    target_column: str,
+    batch_size: int,
+    max_in_flight: int
+    ) -> int:
+    """
+    splits file into chunks, scores them in worker processes and writes results in the original order
+
+    :param executor: process pool with loaded models
+    :param path: input file
+    :param output_path: where to write predictions
+    :param output_format: csv, parquet or xlsx
+    :param text_columns: list of column names where relevant text data is stored
+    :param target_column: target name
+    :param batch_size: number of rows sent to a worker at once
+    :param max_in_flight: number of chunks kept in memory at once
+
+    :return number of processed rows
+    """
+    writer = OutputWriter(output=output_path, output_format=output_format)
+    pending = []
+    n_rows = 0
+
+    def flush(limit: int) -> int:
+        written = 0
+        while len(pending) > limit:
+            chunk, future = pending.pop(0)
+            chunk[target_column] = future.result()
+            writer.write(chunk)
+            written += len(chunk)
+        return written
+
+    try:
+        with open(path, 'rb') as fileobject:
+            for chunk in ChunkedPandasDataset(fileobject, chunksize=batch_size).data:
+                pending.append((chunk, executor.submit(_predict_chunk, chunk[text_columns], text_columns)))
+                n_rows += flush(max_in_flight)
+            n_rows += flush(0)
+    finally:
+        writer.close()
+
+    return n_rows
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+
+    parser = argparse.ArgumentParser(description="Runs the exported model on files from the command line")
+    parser.add_argument("inputs", nargs="+", help=f"input files or glob patterns ({', '.join(SUPPORTED_EXTENSIONS)})")
+    parser.add_argument("--text-columns", nargs="+", required=True, help="columns with text relevant for inference")
+    parser.add_argument("--target-column", default="target", help="name of the column with predictions")
+    parser.add_argument("--output-dir", default=".", help="folder where results are written")
+    parser.add_argument("--format", dest="output_format", choices=list(OUTPUT_FORMATS), default="csv")
+    parser.add_argument("--workers", type=int, default=available_cores(),
+                        help="number of worker processes, cores left over go to BLAS threads of every worker")
+    parser.add_argument("--batch-size", type=int, default=Model.batch_size, help="rows per chunk")
+    parser.add_argument("--model", help="path to the model folder or joblib file")
+    args = parser.parse_args(argv)
+
+    paths = expand_inputs(args.inputs)
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    output_paths = set()
+    total_rows = 0
+    start = time.perf_counter()
+
+    plan = ParallelPlan(n_tasks=args.workers)
+
+    with ProcessPoolExecutor(max_workers=plan.n_workers, initializer=_init_worker, initargs=(args.model, plan)) as executor:
+        for path in paths:
+            file_start = time.perf_counter()
+            name, extension = os.path.splitext(os.path.basename(path))
+            output_path = os.path.join(args.output_dir, f"{name}_done.{args.output_format}")
+            if output_path in output_paths:
+                output_path = os.path.join(args.output_dir, f"{name}_{extension.lstrip('.')}_done.{args.output_format}")
+            output_paths.add(output_path)
+
+            n_rows = predict_file(
+                executor=executor,
+                path=path,
+                output_path=output_path,
+                output_format=args.output_format,
+                text_columns=args.text_columns,
+                target_column=args.target_column,
+                batch_size=args.batch_size,
+                max_in_flight=2 * plan.n_workers
+            )
+            total_rows += n_rows
+
+            elapsed = time.perf_counter() - file_start
+            print(f"{path} -> {output_path}: {n_rows} rows, {n_rows / max(elapsed, 1e-9):.0f} rows/s", file=sys.stderr)
+
+    elapsed = time.perf_counter() - start
+    print(f"Total: {total_rows} rows in {elapsed:.1f}s, {total_rows / max(elapsed, 1e-9):.0f} rows/s", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
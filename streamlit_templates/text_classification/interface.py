@@ -1,59 +1,123 @@
+import hashlib
 import os
-from io import BytesIO
+import tempfile
+from typing import Any, List
 
-import pandas as pd
 import streamlit as st
 
 from Model import Model
-from core.Dataset import PandasDataset
+from core.Dataset import SUPPORTED_EXTENSIONS, ChunkedPandasDataset, PandasDataset
+from core.OutputWriter import OUTPUT_FORMATS, OutputWriter
 
+RESULT_CACHE_ENTRIES = 4
+SPOOL_MB = 64
+MAX_EXPLAIN_TERMS = 20
 
-@st.cache(hash_funcs={Model: id})
-def load():
+
+@st.cache_resource
+def load() -> Model:
     """
-    load model
+    load model once per server process
     """
     model = Model()
     return model
 
 
-@st.cache
-def to_excel(df: pd.DataFrame) -> bytes:
+def upload_fingerprint(uploaded_file: Any) -> str:
     """
-    converts dataframe to an excel bytefile
+    hashes content of the uploaded file, so results are cached by content rather than by the parsed frame
+
+    :param uploaded_file: file from st.file_uploader
+
+    :return hex digest
     """
-    outputs = BytesIO()
-    writer = pd.ExcelWriter(outputs, engine="openpyxl")
-    df.to_excel(writer, index=False, sheet_name="ModelPredictions")
-    writer.save()
-    processed_data = outputs.getvalue()
-    return processed_data
+    return hashlib.blake2b(uploaded_file.getbuffer(), digest_size=16).hexdigest()
+
+
+@st.cache_data(max_entries=RESULT_CACHE_ENTRIES, show_spinner="Running model")
+def predict_upload(
+    upload_key: str,
+    model_version: str,
+    text_columns: List[str],
+    target_column: str,
+    output_format: str,
+    explain: int,
+    _uploaded_file: Any,
+    _model: Model
+    ) -> bytes:
+    """
+    streams the uploaded file through the model chunk by chunk and serialises predictions
+
+    Cached by the upload fingerprint, model version and options only, underscored arguments are not hashed,
+    so reruns return the stored bytes without hashing or re-serialising the predictions
+
+    :param upload_key: fingerprint of the uploaded file
+    :param model_version: Model.version
+    :param text_columns: list of column names where relevant text data is stored
+    :param target_column: name of the column with predictions
+    :param output_format: one of OUTPUT_FORMATS
+    :param explain: number of top contributing terms added to every prediction, 0 for none
+    :param _uploaded_file: uploaded file
+    :param _model: loaded model
+
+    :return file with predictions
+    """
+    _uploaded_file.seek(0)
+    chunks = ChunkedPandasDataset(
+        _uploaded_file,
+        chunksize=_model.batch_size,
+        dtype={column: "string" for column in text_columns}
+    ).data
+
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MB * 2 ** 20) as output:
+        writer = OutputWriter(output=output, output_format=output_format)
+        try:
+            for chunk in _model.predict_chunks(
+                chunks=chunks, text_columns=text_columns, target_column=target_column, explain=explain
+            ):
+                writer.write(chunk)
+        finally:
+            writer.close()
+
+        output.seek(0)
+        return output.read()
 
 
 if __name__ == '__main__':
     model = load()
 
-    uploaded_file = st.file_uploader("Choose file for inference", type=["csv", "xls", "xlsx", "tsv"])
+    uploaded_file = st.file_uploader("Choose file for inference", type=SUPPORTED_EXTENSIONS)
 
     if uploaded_file is not None:
-        df = PandasDataset(uploaded_file)
-        df = df.data
+        preview = PandasDataset.preview(uploaded_file)
         text_columns = st.multiselect(
-            label="Select text columns", options=df.columns)
+            label="Select text columns", options=preview.data.columns)
         target_column = st.text_input(
             label="Choose name for target columns", value='target')
+        output_format = st.selectbox(
+            label="Output format", options=list(OUTPUT_FORMATS),
+            help="csv and parquet are the fastest for large files, xlsx starts a new sheet every 1,048,576 rows")
+        explain = 0
+        if model.explainer is not None:
+            explain = st.number_input(
+                label="Terms explaining every prediction", min_value=0, max_value=MAX_EXPLAIN_TERMS, value=0,
+                help="adds columns with the terms that pushed the model towards its prediction the most")
 
         if st.checkbox("All set"):
-            file_name = os.path.splitext(uploaded_file.name)[0] + "_done.xlsx"
-            df = model.predict(
-                df=df, 
-                text_columns=text_columns,
-                target_column=target_column
-                )
-            result = to_excel(df)
+            file_name = os.path.splitext(uploaded_file.name)[0] + f"_done.{output_format}"
+            result = predict_upload(
+                upload_fingerprint(uploaded_file),
+                model.version,
+                text_columns,
+                target_column,
+                output_format,
+                explain,
+                uploaded_file,
+                model
+            )
             st.download_button(
                 label="Download model resuls",
                 data=result,
                 file_name=file_name,
-                mime="text/xlsx"
+                mime=OUTPUT_FORMATS[output_format]
             )
@@ -0,0 +1,73 @@
+import argparse
+import json
+import random
+import statistics
+import threading
+import time
+import urllib.request
+from typing import List
+
+import pandas as pd
+
+from core.Dataset import PandasDataset
+
+
+def send(url: str, texts: List[str]) -> None:
+    """
+    sends one prediction request
+    """
+    body = {"text": texts[0]} if len(texts) == 1 else {"texts": texts}
+    request = urllib.request.Request(
+        url, data=json.dumps(body).encode("utf-8"), headers={"Content-Type": "application/json"}
+    )
+    with urllib.request.urlopen(request) as response:
+        response.read()
+
+
+def main() -> None:
+
+    parser = argparse.ArgumentParser(description="Measures latency and throughput of the local prediction server")
+    parser.add_argument("--url", default="http://127.0.0.1:8000/predict")
+    parser.add_argument("--data", help="file with texts (csv, tsv, xls, xlsx), random words are used if omitted")
+    parser.add_argument("--text-column", default="text")
+    parser.add_argument("--concurrency", type=int, default=16, help="number of clients sending requests at once")
+    parser.add_argument("--requests", type=int, default=2000, help="total number of requests")
+    parser.add_argument("--batch", type=int, default=1, help="texts per request")
+    args = parser.parse_args()
+
+    if args.data:
+        with open(args.data, "rb") as fileobject:
+            texts = PandasDataset(fileobject).data[args.text_column].astype(str).to_list()
+    else:
+        words = [f"word{i}" for i in range(1000)]
+        texts = [" ".join(random.choices(words, k=20)) for _ in range(1000)]
+
+    latencies = []
+    lock = threading.Lock()
+    counter = iter(range(args.requests))
+
+    def client() -> None:
+        for _ in counter:
+            start = time.perf_counter()
+            send(args.url, random.sample(texts, args.batch))
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+
+    threads = [threading.Thread(target=client) for _ in range(args.concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    total = time.perf_counter() - start
+
+    latencies = pd.Series(latencies) * 1000
+    print(f"requests: {len(latencies)}, concurrency: {args.concurrency}, texts per request: {args.batch}")
+    print(f"throughput: {len(latencies) / total:.0f} requests/s, {len(latencies) * args.batch / total:.0f} texts/s")
+    print(f"latency ms: mean {statistics.mean(latencies):.1f}, p50 {latencies.quantile(0.5):.1f}, "
+          f"p95 {latencies.quantile(0.95):.1f}, p99 {latencies.quantile(0.99):.1f}")
+
+
+if __name__ == '__main__':
+    main()
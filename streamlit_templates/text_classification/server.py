@@ -0,0 +1,187 @@
+import argparse
+import json
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Tuple
+
+import pandas as pd
+
+from Model import Model
+
+
+class MicroBatcher:
+    """
+    Merges texts from concurrent requests into one batch before running the pipeline.
+
+    A batch is sent to the model when it reaches max_batch_size texts or when the first request
+    in it has waited max_wait_ms, whichever comes first
+    """
+
+    def __init__(self, model: Model, max_batch_size: int, max_wait_ms: float):
+
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.queue = queue.Queue()
+        self.classes = [label.item() if hasattr(label, 'item') else label for label in model.model.classes_]
+
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, texts: List[str]) -> Future:
+        """
+        puts texts into the queue
+
+        :param texts: list of texts from one request
+
+        :return future with list of labels and list of class probabilities
+        """
+        future = Future()
+        self.queue.put((texts, future))
+        return future
+
+    def _collect(self) -> List[Tuple[List[str], Future]]:
+
+        batch = [self.queue.get()]
+        size = len(batch[0][0])
+        deadline = time.perf_counter() + self.max_wait
+
+        while size < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                item = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            batch.append(item)
+            size += len(item[0])
+
+        return batch
+
+    def _run(self) -> None:
+
+        while True:
+            batch = self._collect()
+            texts = [text for request_texts, _ in batch for text in request_texts]
+
+            try:
+                probabilities = self.model.predict_proba(pd.Series(texts, dtype=object))
+                labels = [self.classes[i] for i in probabilities.argmax(axis=1)]
+                probabilities = probabilities.tolist()
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            start = 0
+            for request_texts, future in batch:
+                end = start + len(request_texts)
+                future.set_result((labels[start:end], probabilities[start:end]))
+                start = end
+
+
+class PredictionServer(ThreadingHTTPServer):
+    """
+    Threaded HTTP server with a listen backlog large enough for bursts of concurrent clients
+    """
+
+    daemon_threads = True
+    request_queue_size = 128
+
+
+def make_handler(batcher: MicroBatcher) -> type:
+    """
+    builds request handler bound to the batcher
+
+    :param batcher: running micro batcher
+
+    :return handler class for http server
+    """
+
+    class PredictionHandler(BaseHTTPRequestHandler):
+
+        def _send(self, status: int, body: Dict[str, Any]) -> None:
+            payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self) -> None:
+            if self.path == "/health":
+                self._send(200, {"status": "ok", "classes": batcher.classes})
+            elif self.path == "/stats":
+                self._send(200, {"cache": batcher.model.cache.stats()})
+            else:
+                self._send(404, {"error": "not found"})
+
+        def do_POST(self) -> None:
+            if self.path != "/predict":
+                self._send(404, {"error": "not found"})
+                return
+
+            try:
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                single = "text" in request
+                texts = [request["text"]] if single else list(request["texts"])
+                if not all(isinstance(text, str) for text in texts):
+                    raise ValueError("texts must be strings")
+            except (ValueError, KeyError, TypeError) as e:
+                self._send(400, {"error": f"expected {{'text': str}} or {{'texts': [str, ...]}}: {e}"})
+                return
+
+            try:
+                labels, probabilities = batcher.submit(texts).result()
+            except Exception as e:
+                self._send(500, {"error": str(e)})
+                return
+
+            if single:
+                response = {"label": labels[0]}
+                if request.get("proba"):
+                    response["probabilities"] = probabilities[0]
+            else:
+                response = {"labels": labels}
+                if request.get("proba"):
+                    response["probabilities"] = probabilities
+
+            self._send(200, response)
+
+        def log_message(self, format: str, *args: Any) -> None:
+            return
+
+    return PredictionHandler
+
+
+def main() -> None:
+
+    parser = argparse.ArgumentParser(description="Serves the exported model over HTTP with micro batching")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--model", help="path to the model folder or joblib file")
+    parser.add_argument("--max-batch-size", type=int, default=256, help="maximum number of texts in one batch")
+    parser.add_argument("--max-wait-ms", type=float, default=5, help="maximum time a request waits for a batch")
+    parser.add_argument("--cache-size", type=int, default=Model.cache_size,
+                        help="number of predictions of unique texts kept in memory, 0 disables the cache")
+    args = parser.parse_args()
+
+    model = Model(path=args.model, cache_size=args.cache_size)
+    batcher = MicroBatcher(model=model, max_batch_size=args.max_batch_size, max_wait_ms=args.max_wait_ms)
+    server = PredictionServer((args.host, args.port), make_handler(batcher))
+
+    print(f"Serving on http://{args.host}:{args.port} (POST /predict, GET /health, GET /stats)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.model_selection import StratifiedKFold, cross_val_score, train_test_split
+
+from pipelines.build_tfidf_logreg import build_pipeline, build_tfidf_logreg, fit_model, get_classification_report
+from pipelines.oof_cache import OOF_CACHE_VARIABLE
+from utils.constants import RANDOM_STATE, TEST_SIZE
+
+VOCABULARY = [f"word{i}" for i in range(300)]
+
+
+def synthetic_corpus(n_classes, n_rows=600, seed=0):
+    """
+    texts whose words overlap between classes, so the classes are not separable and the solver stops within tol
+    """
+    rng = np.random.default_rng(seed)
+    y = rng.integers(0, n_classes, size=n_rows)
+    topics = [rng.choice(len(VOCABULARY), size=40, replace=False) for _ in range(n_classes)]
+    texts = []
+    for label in y:
+        own = rng.choice(topics[label], size=rng.integers(2, 6))
+        common = rng.choice(len(VOCABULARY), size=rng.integers(5, 15))
+        texts.append(" ".join(VOCABULARY[i] for i in np.concatenate([own, common])))
+    return pd.Series(texts), [f"class_{label}" for label in y]
+
+
+@pytest.fixture(autouse=True)
+def oof_cache(tmp_path, monkeypatch):
+
+    monkeypatch.setenv(OOF_CACHE_VARIABLE, str(tmp_path))
+
+
+@pytest.mark.parametrize("n_classes", [2, 4])
+def test_classification_report_matches_plain_pipeline(n_classes):
+
+    X, y = synthetic_corpus(n_classes)
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=TEST_SIZE, random_state=RANDOM_STATE, stratify=y
+    )
+    expected = get_classification_report(y_test=y_test, y_pred=build_pipeline().fit(X_train, y_train).predict(X_test))
+
+    _, _, report, _ = build_tfidf_logreg(X=X, y=y)
+
+    pd.testing.assert_frame_equal(report, expected)
+
+
+def test_fit_model_matches_plain_pipeline():
+
+    X, y = synthetic_corpus(3)
+    cv = StratifiedKFold(n_splits=5, shuffle=True, random_state=RANDOM_STATE)
+    expected_scores = cross_val_score(build_pipeline(), X=X, y=y, cv=cv, scoring="f1_weighted")
+    expected_proba = build_pipeline().fit(X, y).predict_proba(X)
+
+    model, scores = fit_model(X=X, y=y)
+
+    np.testing.assert_allclose(scores, expected_scores)
+    np.testing.assert_allclose(model.predict_proba(X), expected_proba, atol=1e-8)
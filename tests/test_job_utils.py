@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from pipelines.build_tfidf_logreg import build_tfidf_logreg
+from pipelines.oof_cache import OOF_CACHE_VARIABLE
+from utils.data_utils import analyse_data_annotation
+from utils.job_utils import JobRunner
+
+WORDS = {
+    "sport": ["match", "goal", "team", "coach", "league", "score"],
+    "finance": ["bank", "stock", "market", "price", "profit", "loan"],
+}
+
+
+def synthetic_corpus(n_rows=200, seed=0):
+
+    rng = np.random.default_rng(seed)
+    labels = rng.choice(list(WORDS), size=n_rows)
+    texts = [
+        " ".join(rng.choice(WORDS[label] + WORDS["sport" if label == "finance" else "finance"][:2], size=8))
+        for label in labels
+    ]
+    return pd.Series(texts), list(labels)
+
+
+def span_names(spans):
+
+    for item in spans:
+        yield item["name"]
+        yield from span_names(item["children"])
+
+
+@pytest.fixture
+def runner(tmp_path, monkeypatch):
+
+    monkeypatch.setenv(OOF_CACHE_VARIABLE, str(tmp_path))
+    runner = JobRunner(max_workers=2)
+    yield runner
+    runner.shutdown()
+
+
+def run(runner, key, function, **kwargs):
+
+    runner.submit(key, function, **kwargs)
+    runner._jobs[key].result(timeout=300)
+    assert runner.status(key)["status"] == "done"
+    return runner.result(key)
+
+
+def test_training_job_reuses_folds_of_audit_job(runner):
+
+    X, y = synthetic_corpus()
+
+    _, audit_spans = run(runner, "audit", analyse_data_annotation, X=X, y=y)
+    _, training_spans = run(runner, "train", build_tfidf_logreg, X=X, y=y)
+
+    assert "load cached out-of-fold results" not in set(span_names(audit_spans))
+    assert "load cached out-of-fold results" in set(span_names(training_spans))
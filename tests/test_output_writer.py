@@ -0,0 +1,46 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet
+
+from core.OutputWriter import OutputWriter
+
+
+def write_chunks(chunks, output):
+
+    writer = OutputWriter(output=output, output_format="parquet")
+    try:
+        for chunk in chunks:
+            writer.write(chunk)
+    finally:
+        writer.close()
+
+
+def test_parquet_promotes_types_that_change_between_chunks():
+
+    chunks = [
+        pd.DataFrame({"comment": [np.nan, np.nan], "score": [1, 2], "prediction": ["a", "b"]}),
+        pd.DataFrame({"comment": ["late text", np.nan], "score": [0.5, 3.25], "prediction": ["b", "a"]}),
+        pd.DataFrame({"comment": [np.nan, "more"], "score": [4, 5], "prediction": ["a", "a"]}),
+    ]
+    output = io.BytesIO()
+    write_chunks(chunks, output)
+
+    output.seek(0)
+    table = pyarrow.parquet.read_table(output)
+    assert table.schema.field("comment").type == pyarrow.string()
+    assert table.schema.field("score").type == pyarrow.float64()
+
+    result = table.to_pandas()
+    assert result["comment"].tolist() == [None, None, "late text", None, None, "more"]
+    assert result["score"].tolist() == [1.0, 2.0, 0.5, 3.25, 4.0, 5.0]
+    assert result["prediction"].tolist() == ["a", "b", "b", "a", "a", "a"]
+
+
+def test_parquet_path_output_is_rewritten_in_place(tmp_path):
+
+    path = str(tmp_path / "predictions.parquet")
+    write_chunks([pd.DataFrame({"score": [1]}), pd.DataFrame({"score": ["text"]})], path)
+
+    assert pyarrow.parquet.read_table(path).column("score").to_pylist() == ["1", "text"]
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.data_utils import clean_duplicates, clean_relevant_duplicates
+from utils.eda_utils import check_value_counts, compute_percentage_of_suitable_data
+from utils.profile_utils import profile_data
+
+THRESHOLD = 1
+
+
+def reference(df, text_columns, target_column, threshold):
+
+    full_length, cnt_duplicates, df = clean_duplicates(df)
+    relevant_length, cnt_relevant_duplicates, df = clean_relevant_duplicates(
+        df=df, text_columns=text_columns, target_column=target_column
+    )
+    df, v_c = check_value_counts(df=df, target_column=target_column, threshold=threshold)
+    na_check = compute_percentage_of_suitable_data(df=df, target_column=target_column, full_length=full_length)
+    statistics = {
+        "full_length": full_length,
+        "cnt_duplicates": cnt_duplicates,
+        "relevant_length": relevant_length,
+        "cnt_relevant_duplicates": cnt_relevant_duplicates,
+        "cnt_near_duplicates": 0,
+        "v_c": v_c,
+        "na_check": na_check,
+    }
+    return statistics, df
+
+
+FRAMES = {
+    "int and str targets": pd.DataFrame({
+        "text": ["a", "a", "b", "b", "c", "c", "d", "d"],
+        "target": [1, "1", 2, "2", 1, 1, "2", "2"],
+        "extra": [0, 0, 1, 1, 2, 2, 3, 4],
+    }),
+    "int and float targets": pd.DataFrame({
+        "text": ["a", "a", "b", "b", "c", "d", "d", "e"],
+        "target": pd.Series([1, 1.0, 2, 2.0, True, 1, 2.5, 1], dtype=object),
+        "extra": pd.Series([1, 1.0, "x", "x", None, np.nan, 0, 0], dtype=object),
+    }),
+    "nan and none": pd.DataFrame({
+        "text": pd.Series(["a", None, np.nan, None, "b", "b", "c", np.nan], dtype=object),
+        "target": pd.Series([None, np.nan, "x", "x", "y", "y", np.nan, "x"], dtype=object),
+        "extra": [np.nan, np.nan, 1.0, 1.0, 2.0, np.nan, np.nan, 3.0],
+    }),
+    "string dtype": pd.DataFrame({
+        "text": pd.Series(["a", "a", pd.NA, pd.NA, "b", "c", "c", "d"], dtype="string"),
+        "target": [0.0, 0.0, 1.0, 1.0, np.nan, 1.0, 1.0, 0.0],
+        "extra": ["k", "l", "m", "m", "n", "o", "o", "p"],
+    }),
+}
+
+
+@pytest.mark.parametrize("name", FRAMES)
+def test_profile_data_matches_reference(name):
+
+    df = FRAMES[name]
+    expected_statistics, expected = reference(df, ["text"], "target", THRESHOLD)
+    statistics, clusters, result = profile_data(df=df, text_columns=["text"], target_column="target", threshold=THRESHOLD)
+
+    assert clusters is None
+    assert statistics == pytest.approx(expected_statistics)
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_profile_data_compares_values_like_duplicated():
+
+    df = pd.DataFrame({"text": ["a", "a", "a"], "target": pd.Series([1, 1.0, "1"], dtype=object)})
+    statistics, _, _ = profile_data(df=df, text_columns=["text"], target_column="target", threshold=0)
+
+    assert statistics["cnt_duplicates"] == df.duplicated().sum() == 1
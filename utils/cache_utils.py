@@ -0,0 +1,220 @@
+import hashlib
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+from sklearn.pipeline import Pipeline
+from core.Dataset import PandasDataset
+from core.LinearExplainer import LinearExplainer
+from pipelines.build_tfidf_logreg import build_holdout
+from pipelines.tune_tfidf_logreg import tune_tfidf_logreg
+from utils.constants import CACHE_MAX_ENTRIES, JOB_MAX_WORKERS
+from utils.fast_eda_utils import fast_eda
+from utils.home_utils import export_tradeoff
+from utils.job_utils import JobRunner
+from utils.profile_utils import profile_data
+
+
+def fingerprint(*objects: Any) -> str:
+    """
+    computes cheap content hash of the session data that is used as a cache key
+
+    :param objects: dataframes, series, lists, bytes or anything with a stable repr
+
+    :return hex digest
+
+    Example
+
+    >>> fingerprint(df, ["text"], "target")
+    '5d41402abc4b2a76b9719d911017c592'
+    """
+    digest = hashlib.blake2b(digest_size=16)
+
+    for obj in objects:
+        if isinstance(obj, bytes):
+            digest.update(obj)
+            continue
+
+        if isinstance(obj, list):
+            obj = pd.Series(obj, dtype=object)
+
+        if isinstance(obj, (pd.DataFrame, pd.Series)):
+            digest.update(pd.util.hash_pandas_object(obj, index=True).to_numpy().tobytes())
+            if isinstance(obj, pd.DataFrame):
+                digest.update(repr(list(obj.columns)).encode())
+        else:
+            digest.update(repr(obj).encode())
+
+    return digest.hexdigest()
+
+
+def fingerprint_upload(fileobject: BinaryIO) -> str:
+    """
+    hashes uploaded file name and contents without parsing them
+
+    :param fileobject: file uploaded through streamlit
+
+    :return hex digest
+    """
+    return fingerprint(fileobject.name, fileobject.getvalue())
+
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def read_data(
+    key: str,
+    _fileobject: BinaryIO,
+    columns: Optional[List[str]] = None,
+    nrows: Optional[int] = None,
+    dtype: Optional[Dict[str, Any]] = None
+    ) -> pd.DataFrame:
+    """
+    parses the uploaded file once per upload and column selection
+
+    :param key: upload fingerprint
+    :param _fileobject: file uploaded through streamlit, not hashed
+    :param columns: columns to read, all by default
+    :param nrows: number of rows to read, all by default
+    :param dtype: explicit dtypes of the columns
+
+    :return dataframe
+    """
+    return PandasDataset(_fileobject, columns=columns, nrows=nrows, dtype=dtype).data
+
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def clean_data(
+    key: str,
+    text_columns: List[str],
+    target_column: str,
+    threshold: int,
+    _df: pd.DataFrame,
+    near_duplicate_threshold: Optional[float] = None,
+    near_duplicate_strategy: str = "drop",
+    drop_conflicting: bool = False
+    ) -> Tuple[Dict[str, Any], Optional[pd.DataFrame], pd.DataFrame]:
+    """
+    runs all EDA cleaning steps once per upload and column selection
+
+    :param key: upload fingerprint
+    :param text_columns: list of column names that contain text relevant to the task
+    :param target_column: str, column where markup is stored
+    :param threshold: minimal observation count
+    :param _df: uploaded dataframe, not hashed
+    :param near_duplicate_threshold: Jaccard similarity from which rows count as near duplicates,
+        near duplicates are kept when None
+    :param near_duplicate_strategy: 'drop' or 'collapse', see clean_near_duplicates
+    :param drop_conflicting: removes near duplicate clusters with conflicting labels
+
+    :return statistics, near duplicate clusters or None and cleaned dataframe, see profile_data
+    """
+    return profile_data(
+        df=_df,
+        text_columns=text_columns,
+        target_column=target_column,
+        threshold=threshold,
+        near_duplicate_threshold=near_duplicate_threshold,
+        near_duplicate_strategy=near_duplicate_strategy,
+        drop_conflicting=drop_conflicting
+    )
+
+
+@st.cache_resource(show_spinner=False)
+def job_runner() -> JobRunner:
+    """
+    starts the pool of worker processes for training and audit jobs once per server, it is shared by all sessions
+
+    :return job runner
+    """
+    return JobRunner(max_workers=JOB_MAX_WORKERS)
+
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, show_spinner="Searching hyperparameters...")
+def tune_baseline(key: str, budget: float, _X: pd.Series, _y: List[Any]) -> Tuple[Dict[str, Any], pd.DataFrame]:
+    """
+    runs hyperparameter search once per dataset and budget
+
+    :param key: fingerprint of texts and targets
+    :param budget: wall-clock budget in seconds
+    :param _X: texts, not hashed
+    :param _y: targets, not hashed
+
+    :return best parameters and search history
+    """
+    return tune_tfidf_logreg(X=_X, y=_y, budget=budget)
+
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, show_spinner="Comparing export options...")
+def compare_exports(
+    key: str,
+    prune_levels: List[float],
+    _model: Pipeline,
+    _X: pd.Series,
+    _y: List[Any]
+    ) -> pd.DataFrame:
+    """
+    measures size and quality of compact exports on the same held-out rows the model was evaluated on
+
+    :param key: fingerprint of texts and targets
+    :param prune_levels: fractions of the smallest coefficients to drop
+    :param _model: fitted baseline, not hashed
+    :param _X: texts, not hashed
+    :param _y: targets, not hashed
+
+    :return size/quality trade-off table
+    """
+    y = np.asarray(_y)
+    _, test_rows = next(build_holdout().split(y, y))
+    return export_tradeoff(model=_model, X=_X.iloc[test_rows], y=y[test_rows], prune_levels=prune_levels)
+
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, show_spinner="Explaining predictions...")
+def explain_baseline(key: str, top_k: int, _model: Pipeline, _X: pd.Series) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    explains the baseline globally and for every row once per model and number of terms
+
+    :param key: fingerprint of texts, targets and parameters of the model
+    :param top_k: number of terms per class and per row
+    :param _model: fitted baseline, not hashed
+    :param _X: texts, not hashed
+
+    :return table of the largest positive and negative weights of every class
+        and table of texts with predictions and their top contributing terms
+    """
+    explainer = LinearExplainer(_model)
+    labels, terms, weights = explainer.explain_matrix(explainer.transform(_X), top_k)
+    rows = pd.concat([
+        pd.DataFrame({"text": _X.to_numpy(), "prediction": labels}),
+        LinearExplainer.to_frame(terms, weights)
+    ], axis=1)
+    return explainer.top_weights(top_k), rows
+
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, show_spinner="Estimating statistics...")
+def estimate_data(
+    key: str,
+    text_columns: List[str],
+    target_column: str,
+    budget: float,
+    columns: Optional[List[str]],
+    _fileobject: BinaryIO
+    ) -> Tuple[pd.DataFrame, pd.DataFrame, str]:
+    """
+    runs fast approximate EDA once per upload, column selection and budget
+
+    :param key: upload fingerprint
+    :param text_columns: list of column names that contain text relevant to the task
+    :param target_column: column where markup is stored
+    :param budget: time budget in seconds
+    :param columns: columns to read, all by default
+    :param _fileobject: file uploaded through streamlit, not hashed
+
+    :return statistics with error margins, per class audit report and verdict
+    """
+    return fast_eda(
+        fileobject=_fileobject,
+        text_columns=text_columns,
+        target_column=target_column,
+        budget=budget,
+        columns=columns
+    )
@@ -6,3 +6,41 @@ TFIDF_NAME = "Simple Classification Baseline"
 RANDOM_STATE = 42
 ANNOTATION_THRESHOLD = 0.9
 BASE_CHECK_THRESHOLD = 90
+OOF_CACHE_SIZE = 8
+OOF_CACHE_FOLDER = "training_pipelines_oof_cache"
+CV_FOLDS = 5
+TEST_SIZE = 0.2
+CACHE_MAX_ENTRIES = 16
+EXPORT_PRUNE_LEVELS = [0.0, 0.5, 0.8, 0.9, 0.95]
+TUNING_GRID = {
+    "vectoriser__ngram_range": [(1, 1), (1, 2)],
+    "vectoriser__min_df": [1, 2, 5],
+    "vectoriser__sublinear_tf": [False, True],
+    "logreg__C": [0.1, 1.0, 10.0],
+}
+TUNING_BUDGET = 120
+TUNING_FACTOR = 3
+TUNING_CV_FOLDS = 3
+TUNING_MIN_ROWS_PER_CLASS = 20
+INCREMENTAL_NAME = "Out-of-Core Baseline"
+INCREMENTAL_CHUNKSIZE = 100000
+HASHING_FEATURES = 2 ** 20
+FAST_EDA_BUDGET = 30
+FAST_EDA_CHUNKSIZE = 100000
+FAST_EDA_RESERVOIR = 5000
+FAST_EDA_PILOT_ROWS = 1000
+FAST_EDA_MIN_PER_CLASS = 50
+HLL_PRECISION = 16
+NEAR_DUPLICATE_THRESHOLD = 0.8
+NEAR_DUPLICATE_STRATEGIES = ["drop", "collapse"]
+MINHASH_PERMUTATIONS = 128
+MINHASH_SHINGLE_SIZE = 5
+MINHASH_BLOCK_SHINGLES = 200000
+JOB_MAX_WORKERS = 2
+JOB_HISTORY = 16
+JOB_POLL_SECONDS = 1.0
+EXPORT_COMPRESSION_LEVEL = 6
+EXPORT_SPOOL_MB = 64
+EXPORT_TEMPLATE_CACHE = 4
+EXPORT_EXCLUDED_FOLDERS = [".ipynb_checkpoints", "__pycache__"]
+EXPLAIN_TOP_K = 5
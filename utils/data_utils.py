@@ -4,11 +4,17 @@ from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.linear_model import LogisticRegression
 from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import LabelEncoder
-from typing import Tuple, List, Any
-from pipelines.build_tfidf_logreg import build_pipeline
+from typing import Tuple, List, Any, Callable, Optional
+from pipelines.build_tfidf_logreg import build_cv, build_pipeline, shift_progress
+from pipelines.oof_cache import CachedCorpus
+from core.text_utils import assemble_text
+from core.timing_utils import span
+from utils.constants import CV_FOLDS, NEAR_DUPLICATE_STRATEGIES
+from utils.minhash_utils import describe_clusters, find_near_duplicates
 import numpy as np
 
 
+@span("clean_duplicates")
 def clean_duplicates(df: pd.DataFrame) -> Tuple[int, float, pd.DataFrame]:
     """
     cleans dataset from dupluicated rows
@@ -47,6 +53,7 @@ def clean_duplicates(df: pd.DataFrame) -> Tuple[int, float, pd.DataFrame]:
     return full_length, cnt_duplicates, df
 
 
+@span("clean_relevant_duplicates")
 def clean_relevant_duplicates(df: pd.DataFrame, text_columns: List[str], target_column: str) -> Tuple[int, float, pd.DataFrame]:
     """
     removes irrelevant columns and once again cleans the duplicates
@@ -92,6 +99,78 @@ def clean_relevant_duplicates(df: pd.DataFrame, text_columns: List[str], target_
     return relevant_length, cnt_relevant_duplicates, df
 
 
+@span("clean_near_duplicates")
+def clean_near_duplicates(
+    df: pd.DataFrame,
+    text_columns: List[str],
+    target_column: str,
+    threshold: float,
+    strategy: str = "drop",
+    drop_conflicting: bool = False
+    ) -> Tuple[int, pd.DataFrame, pd.DataFrame]:
+    """
+    finds rows whose relevant text is nearly the same and keeps one row per cluster
+
+    :param df: pd.DataFrame which is going to be used for modeling
+    :param text_columns: list of column names that contain text relevant to the task
+    :param target_column: str, column where markup is stored
+    :param threshold: Jaccard similarity of character shingles from which rows count as near duplicates
+    :param strategy: 'drop' keeps the first row of a cluster as is,
+        'collapse' keeps the first row and gives it the most frequent label of the cluster
+    :param drop_conflicting: removes whole clusters whose rows carry different labels
+
+    :return number of rows removed, clusters report and cleaned dataframe
+
+    Example
+
+    >>> df
+                                                                      text     target
+        0    The parcel was delivered two days late and the box was damaged   complaint
+        1  the parcel was delivered  two days late and the box was damaged!   complaint
+        2   The parcel was delivered two days late and the box was damaged.      praise
+        3                                          Great service, thank you      praise
+    >>> cnt_near_duplicates, clusters, df = clean_near_duplicates(df=df, text_columns=['text'], target_column='target', threshold=0.8)
+    >>> cnt_near_duplicates
+    2
+    >>> clusters
+                 size  labels                                                          example  conflicting labels
+        cluster
+        0           3       2   The parcel was delivered two days late and the box was damaged                True
+    >>> df
+                                                                    text     target
+        0  The parcel was delivered two days late and the box was damaged   complaint
+        1                                        Great service, thank you      praise
+    """
+    if strategy not in NEAR_DUPLICATE_STRATEGIES:
+        raise ValueError(f"Unknown strategy {strategy}, expected one of {NEAR_DUPLICATE_STRATEGIES}")
+
+    df = df.reset_index(drop=True)
+    texts = assemble_text(df=df, text_columns=text_columns)
+    clusters = find_near_duplicates(texts=texts.to_list(), threshold=threshold)
+    report = describe_clusters(texts=texts, y=df[target_column], clusters=clusters)
+
+    keep = ~pd.Series(clusters).duplicated().to_numpy()
+    if drop_conflicting:
+        keep &= ~np.isin(clusters, report.index[report["conflicting labels"]])
+
+    if strategy == "collapse":
+        grouped = pd.DataFrame({"cluster": clusters, "target": df[target_column].to_numpy()})
+        grouped = grouped[np.isin(clusters, report.index)]
+        majority = (
+            grouped.groupby(["cluster", "target"], sort=False).size()
+            .sort_values(ascending=False, kind="stable")
+            .reset_index()
+            .drop_duplicates("cluster")
+            .set_index("cluster")["target"]
+        )
+        collapsed = keep & np.isin(clusters, majority.index)
+        df = df.copy()
+        df.loc[collapsed, target_column] = majority.loc[clusters[collapsed]].to_numpy()
+
+    return int((~keep).sum()), report, df[keep].reset_index(drop=True)
+
+
+@span("return_text_and_targets")
 def return_text_and_targets(df: pd.DataFrame, text_columns: List[str], target_column: str) -> Tuple[pd.Series, List[Any]]:
     """
     separates texts and targets, if there are a few text columns, joins text in them 
@@ -126,34 +205,25 @@ def return_text_and_targets(df: pd.DataFrame, text_columns: List[str], target_co
     >>> y
     [1, 1, 1, 0, 1]
     """
-    text_all = []
-
-    text_columns_amount = len(text_columns)
-
-    if text_columns_amount == 0:
-        raise ValueError("There is no text colums specified")
+    return assemble_text(df=df, text_columns=text_columns), df[target_column].to_list()
 
-    elif text_columns_amount == 1:
-        text_all = df[text_columns[0]].to_list()
 
-    else:
-        
-        df_text = df[text_columns]
-        df_text = df_text.applymap(
-            lambda x: '' if not isinstance(x, str) else x
-        )
-        text_all = df_text.agg(' '.join, axis=1)
-
-    return pd.Series(text_all), df[target_column].to_list()
-
-
-def analyse_data_annotation(X: pd.Series, y: List[Any], threshold: int) -> Tuple[float, pd.DataFrame]:
+@span("analyse_data_annotation")
+def analyse_data_annotation(
+    X: pd.Series,
+    y: List[Any],
+    progress: Optional[Callable[[int, int], None]] = None
+    ) -> Tuple[float, pd.DataFrame]:
     """
     analyses data markup
 
+    Out-of-fold probabilities come from the shared cross validation cache, so the baseline trainer
+    reuses them later. CleanLearning refit on cleaned data is never run since its model is not used
+
     :param X: pd.Series which contains texts
     :param y: list of targets
-    :param threshold: minimal number of observations to consider
+    :param progress: function called with the number of finished steps and the number of steps:
+        every cross validation fold and the health summary
 
     :return data quality score and full report
 
@@ -171,9 +241,7 @@ def analyse_data_annotation(X: pd.Series, y: List[Any], threshold: int) -> Tuple
     ['ham', 'spam', 'spam', 'ham', ...., 'spam'] 
     >>> len(y)
     1500
-    >>> threshold
-    5
-    >>> data_quality_score, report = analyse_data_annotation(X=X, y=y, threshold=threshold)
+    >>> data_quality_score, report = analyse_data_annotation(X=X, y=y)
     >>> data_quality_score
     0.9986
     >>> report
@@ -184,18 +252,19 @@ def analyse_data_annotation(X: pd.Series, y: List[Any], threshold: int) -> Tuple
     le = LabelEncoder()
 
     labels = le.fit_transform(y=y)
-    pipe = build_pipeline()
 
-    cl = cleanlab.classification.CleanLearning(
-        pipe, find_label_issues_kwargs={
-            'min_examples_per_class': threshold,
-        }
-    )
+    with span("cross validation"):
+        data = CachedCorpus(X=X, y=y, pipe=build_pipeline())
+        oof = data.cross_validate(cv=build_cv(), progress=shift_progress(progress, 0, CV_FOLDS + 1))
+
+    with span("cleanlab health summary"):
+        confident_joint = cleanlab.count.compute_confident_joint(labels=labels, pred_probs=oof.pred_probs)
 
-    cl.fit(X=X, labels=labels)
+        hs = cleanlab.dataset.health_summary(
+            labels, confident_joint=confident_joint, class_names=le.classes_, verbose=False)
 
-    hs = cleanlab.dataset.health_summary(
-        labels, confident_joint=cl.confident_joint, class_names=le.classes_, verbose=False)
+    if progress is not None:
+        progress(CV_FOLDS + 1, CV_FOLDS + 1)
 
     data_quality_score = hs['overall_label_health_score']
     report = hs['classes_by_label_quality']
@@ -92,4 +92,40 @@ def render_pie_chart(df: pd.DataFrame, column_name: str) -> plt.Axes:
         )
     _ = plt.title("Label distribution")
 
-    return plt
\ No newline at end of file
+    return plt
+
+
+def render_estimates_chart(statistics: pd.DataFrame, report: pd.DataFrame) -> plt.Figure:
+    """
+    creates bar charts of the fast EDA estimates with their 95% margins of error as error bars
+
+    :param statistics: table of statistics returned by fast_eda, indexed by statistic name
+        with 'estimate' and '± 95%' columns
+    :param report: per class audit report returned by fast_eda with 'Class Name' and 'percentage' columns,
+        class shares are counted over the whole file, so they have no error bars
+    :return matplotlib figure for further rendering
+    """
+    rates = statistics.loc[
+        ["percentage of duplicated data", "percentage of duplicated data in relevant columns"],
+        ["estimate", "± 95%"]
+    ]
+    rates.loc["percentage of missing labels"] = (
+        100 - statistics.loc["percentage of suitable labels", "estimate"],
+        statistics.loc["percentage of suitable labels", "± 95%"]
+    )
+
+    panels = [("Duplicate and missing label rates", rates)]
+    if "percentage" in report.columns:
+        shares = report.set_index("Class Name")[["percentage"]].rename(columns={"percentage": "estimate"})
+        shares["± 95%"] = 0.0
+        panels.insert(0, ("Class shares", shares))
+
+    figure, axes = plt.subplots(len(panels), 1, figsize=(8, 3 * len(panels)), squeeze=False)
+    for ax, (title, table) in zip(axes[:, 0], panels):
+        ax.barh([str(name) for name in table.index], table["estimate"], xerr=table["± 95%"], capsize=4)
+        ax.invert_yaxis()
+        ax.set_xlabel("%")
+        ax.set_title(title)
+    figure.tight_layout()
+
+    return figure
@@ -0,0 +1,336 @@
+import time
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from nptyping import NDArray
+from core.Dataset import ChunkedPandasDataset
+from core.text_utils import assemble_text
+from core.timing_utils import span
+from utils.constants import (ANNOTATION_THRESHOLD, BASE_CHECK_THRESHOLD, FAST_EDA_CHUNKSIZE, FAST_EDA_MIN_PER_CLASS,
+                             FAST_EDA_PILOT_ROWS, FAST_EDA_RESERVOIR, HLL_PRECISION, MINIMAL_NUMBER_OF_OBSERVATIONS,
+                             RANDOM_STATE, THRESHOLD)
+from utils.data_utils import analyse_data_annotation
+
+Estimate = Tuple[float, float]
+
+
+class HyperLogLog:
+    """
+    Sketch that estimates the number of distinct 64-bit hashes in a stream with 2 ** precision bytes of memory,
+    relative standard error of the estimate is 1.04 / sqrt(2 ** precision)
+    """
+
+    def __init__(self, precision: int = HLL_PRECISION):
+
+        self.precision = precision
+        self.m = 2 ** precision
+        self.registers = np.zeros(self.m, dtype=np.uint8)
+
+    def add(self, hashes: NDArray) -> None:
+        """
+        adds uint64 hashes to the sketch
+
+        :param hashes: array of uint64 hashes, e.g. from pd.util.hash_pandas_object
+        """
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        index = (hashes >> np.uint64(64 - self.precision)).astype(np.int64)
+        rest = hashes << np.uint64(self.precision)
+
+        high = (rest >> np.uint64(32)).astype(np.float64)
+        low = (rest & np.uint64(0xFFFFFFFF)).astype(np.float64)
+        bit_length = np.where(high > 0, np.frexp(high)[1] + 32, np.frexp(low)[1])
+        rank = np.minimum(64 - bit_length + 1, 64 - self.precision + 1).astype(np.uint8)
+
+        np.maximum.at(self.registers, index, rank)
+
+    def estimate(self) -> Estimate:
+        """
+        estimates the number of distinct hashes added so far
+
+        :return estimate and its standard error
+        """
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        raw = alpha * self.m ** 2 / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+
+        zeros = np.count_nonzero(self.registers == 0)
+        if raw <= 2.5 * self.m and zeros > 0:
+            raw = self.m * np.log(self.m / zeros)
+
+        return float(raw), float(raw * 1.04 / np.sqrt(self.m))
+
+
+class StratifiedReservoir:
+    """
+    Uniform random sample of at most `size` rows of every class from a stream of chunks.
+
+    Every row gets a random key and the rows with the smallest keys are kept,
+    which is a reservoir sample that can be updated with whole chunks at once
+    """
+
+    def __init__(self, size: int = FAST_EDA_RESERVOIR, seed: int = RANDOM_STATE):
+
+        self.size = size
+        self.rng = np.random.default_rng(seed)
+        self.sample: Optional[pd.DataFrame] = None
+
+    def add(self, df: pd.DataFrame, target_column: str) -> None:
+        """
+        updates the sample with a chunk
+
+        :param df: chunk of rows, rows without target are skipped
+        :param target_column: target name
+        """
+        df = df[df[target_column].notna()]
+        df = df.assign(_key=self.rng.random(len(df)))
+        merged = df if self.sample is None else pd.concat([self.sample, df], ignore_index=True)
+        self.sample = merged.sort_values('_key', kind='stable').groupby(target_column, sort=False).head(self.size)
+
+    def draw(self, target_column: str, allocation: Dict[Any, int]) -> pd.DataFrame:
+        """
+        takes the given number of rows of every class from the sample
+
+        :param target_column: target name
+        :param allocation: class -> number of rows
+
+        :return dataframe without the service key column
+        """
+        parts = [
+            rows.nsmallest(allocation.get(label, 0), '_key')
+            for label, rows in self.sample.groupby(target_column, sort=False)
+        ]
+        return pd.concat(parts).drop(columns='_key').reset_index(drop=True)
+
+
+def allocate_sample(class_counts: pd.Series, sample_size: int, available: Dict[Any, int]) -> Dict[Any, int]:
+    """
+    splits sample size between classes proportionally to their size, every class gets at least
+    FAST_EDA_MIN_PER_CLASS rows, so rare classes can still be cross validated
+
+    :param class_counts: number of rows of every class in the file
+    :param sample_size: desired total number of rows
+    :param available: number of sampled rows of every class
+
+    :return class -> number of rows
+    """
+    shares = class_counts / class_counts.sum()
+    return {
+        label: int(min(available.get(label, 0), max(round(share * sample_size), FAST_EDA_MIN_PER_CLASS)))
+        for label, share in shares.items()
+    }
+
+
+def scan_upload(
+    fileobject: BinaryIO,
+    text_columns: List[str],
+    target_column: str,
+    columns: Optional[List[str]] = None,
+    chunksize: int = FAST_EDA_CHUNKSIZE
+    ) -> Dict[str, Any]:
+    """
+    reads the file once in chunks and keeps only sketches, counts and a stratified sample
+
+    :param fileobject: uploaded file
+    :param text_columns: list of column names that contain text relevant to the task
+    :param target_column: column where markup is stored
+    :param columns: columns to read, all by default; full row duplicates are counted on them
+    :param chunksize: number of rows read at once
+
+    :return dictionary with number of rows, distinct row sketches, class counts, number of missing targets
+        and the reservoir with relevant columns
+    """
+    rows = 0
+    missing_targets = 0
+    class_counts = pd.Series(dtype=np.int64)
+    distinct_rows = HyperLogLog()
+    distinct_relevant = HyperLogLog()
+    reservoir = StratifiedReservoir()
+    relevant = text_columns + [target_column]
+
+    for chunk in ChunkedPandasDataset(fileobject, chunksize=chunksize, columns=columns).data:
+        rows += len(chunk)
+        missing_targets += int(chunk[target_column].isna().sum())
+        class_counts = class_counts.add(chunk[target_column].value_counts(), fill_value=0)
+
+        distinct_rows.add(pd.util.hash_pandas_object(chunk, index=False).to_numpy())
+        distinct_relevant.add(pd.util.hash_pandas_object(chunk[relevant], index=False).to_numpy())
+        reservoir.add(chunk[relevant], target_column=target_column)
+
+    return {
+        "rows": rows,
+        "missing_targets": missing_targets,
+        "class_counts": class_counts.astype(np.int64).sort_values(ascending=False),
+        "distinct_rows": distinct_rows,
+        "distinct_relevant": distinct_relevant,
+        "reservoir": reservoir
+    }
+
+
+def duplicate_rate(distinct: HyperLogLog, rows: int) -> Estimate:
+    """
+    turns a distinct count sketch into a share of duplicated rows
+
+    :param distinct: sketch of row hashes
+    :param rows: number of rows added to the sketch
+
+    :return percentage of duplicated rows and its standard error
+    """
+    count, error = distinct.estimate()
+    count = min(count, rows)
+    return (1 - count / max(rows, 1)) * 100, error / max(rows, 1) * 100
+
+
+def audit_sample(
+    reservoir: StratifiedReservoir,
+    class_counts: pd.Series,
+    text_columns: List[str],
+    target_column: str,
+    budget: float,
+    threshold: int = THRESHOLD
+    ) -> Tuple[Estimate, int, pd.DataFrame]:
+    """
+    runs the label audit on a stratified sample as large as the time budget allows
+
+    A pilot audit on FAST_EDA_PILOT_ROWS rows measures the speed, then the sample is grown to the size that fits
+    into the rest of the budget. Label noise of every class is weighted by the class share in the whole file,
+    so oversampled rare classes don't bias the score
+
+    :param reservoir: stratified sample collected by scan_upload
+    :param class_counts: number of rows of every class in the file
+    :param text_columns: list of column names that contain text relevant to the task
+    :param target_column: column where markup is stored
+    :param budget: time budget in seconds
+    :param threshold: minimal number of observations of a class
+
+    :return data quality score with its standard error, sample size and per class report
+    """
+    deadline = time.perf_counter() + budget
+    class_counts = class_counts[class_counts > threshold]
+    available = reservoir.sample[target_column].value_counts().to_dict()
+
+    def run(sample_size: int) -> Tuple[Estimate, int, pd.DataFrame]:
+        sample = reservoir.draw(target_column, allocate_sample(class_counts, sample_size, available))
+        X = assemble_text(df=sample, text_columns=text_columns)
+        _, report = analyse_data_annotation(X=X, y=sample[target_column].to_list())
+
+        sampled = sample[target_column].value_counts()
+        report = report.set_index('Class Name')
+        shares = class_counts[report.index] / class_counts[report.index].sum()
+        noise = report['Label Noise']
+        score = 1 - float((shares * noise).sum())
+        error = float(np.sqrt((shares ** 2 * noise * (1 - noise) / sampled[report.index]).sum()))
+
+        return (score, error), len(sample), report.reset_index()
+
+    with span("pilot audit"):
+        start = time.perf_counter()
+        result = run(FAST_EDA_PILOT_ROWS)
+        pilot_seconds = time.perf_counter() - start
+
+    remaining = deadline - time.perf_counter()
+    sample_size = int(result[1] * remaining / max(pilot_seconds, 1e-3) * 0.8)
+    if sample_size > 2 * result[1] and sum(available.values()) > 2 * result[1]:
+        with span("audit"):
+            result = run(sample_size)
+
+    return result
+
+
+def verdict(
+    quality: Estimate,
+    suitable_labels: Estimate,
+    eligible_classes: float,
+    relevant_rows: float
+    ) -> str:
+    """
+    compares estimates with the thresholds of the full EDA
+
+    :param quality: data quality score and its standard error
+    :param suitable_labels: percentage of rows with a target and its standard error
+    :param eligible_classes: percentage of classes with more than THRESHOLD observations
+    :param relevant_rows: estimated number of distinct relevant rows
+
+    :return 'go' if all checks pass with 95% confidence, 'no-go' if any of them fails with 95% confidence
+        and 'borderline' otherwise
+    """
+    checks = [
+        (quality[0], 1.96 * quality[1], ANNOTATION_THRESHOLD),
+        (suitable_labels[0], 1.96 * suitable_labels[1], BASE_CHECK_THRESHOLD),
+        (eligible_classes, 0, BASE_CHECK_THRESHOLD),
+        (relevant_rows, 0, MINIMAL_NUMBER_OF_OBSERVATIONS),
+    ]
+
+    if all(value - margin > threshold for value, margin, threshold in checks):
+        return "go"
+    if any(value + margin <= threshold for value, margin, threshold in checks):
+        return "no-go"
+    return "borderline"
+
+
+@span("fast_eda")
+def fast_eda(
+    fileobject: BinaryIO,
+    text_columns: List[str],
+    target_column: str,
+    budget: float,
+    columns: Optional[List[str]] = None,
+    threshold: int = THRESHOLD
+    ) -> Tuple[pd.DataFrame, pd.DataFrame, str]:
+    """
+    approximate EDA that reads the file once with constant memory and audits labels on a sample
+
+    Duplicate rates come from HyperLogLog sketches, class counts and missing targets are counted exactly,
+    the label audit runs on a stratified sample sized to what is left of the time budget after the scan
+
+    :param fileobject: uploaded file
+    :param text_columns: list of column names that contain text relevant to the task
+    :param target_column: column where markup is stored
+    :param budget: time budget in seconds for the whole analysis
+    :param columns: columns to read, all by default
+    :param threshold: minimal number of observations of a class
+
+    :return table of statistics with 95% error margins, per class audit report and verdict
+    """
+    deadline = time.perf_counter() + budget
+
+    with span("scan"):
+        scan = scan_upload(fileobject, text_columns=text_columns, target_column=target_column, columns=columns)
+
+    rows = scan["rows"]
+    class_counts = scan["class_counts"]
+    duplicates = duplicate_rate(scan["distinct_rows"], rows)
+    relevant_duplicates = duplicate_rate(scan["distinct_relevant"], rows)
+    suitable_labels = ((1 - scan["missing_targets"] / max(rows, 1)) * 100, 0.0)
+    eligible_classes = float((class_counts > threshold).mean() * 100) if len(class_counts) else 0.0
+    relevant_rows = scan["distinct_relevant"].estimate()[0]
+
+    if (class_counts > threshold).sum() < 2:
+        quality, sample_size, report = (0.0, 0.0), 0, pd.DataFrame()
+    else:
+        quality, sample_size, report = audit_sample(
+            reservoir=scan["reservoir"],
+            class_counts=class_counts,
+            text_columns=text_columns,
+            target_column=target_column,
+            budget=max(deadline - time.perf_counter(), 0),
+            threshold=threshold
+        )
+
+    statistics = pd.DataFrame(
+        [
+            ("number of rows", rows, 0.0),
+            ("percentage of duplicated data", *duplicates),
+            ("percentage of duplicated data in relevant columns", *relevant_duplicates),
+            (f"percentage of target classes, that have more observations than {threshold}", eligible_classes, 0.0),
+            ("percentage of suitable labels", *suitable_labels),
+            ("data quality score", *quality),
+            ("label audit sample size", sample_size, 0.0),
+        ],
+        columns=["statistic", "estimate", "standard error"]
+    ).set_index("statistic")
+    statistics["± 95%"] = 1.96 * statistics["standard error"]
+
+    class_distribution = (class_counts / max(rows, 1) * 100).rename("percentage").to_frame()
+    report = report.merge(class_distribution, left_on="Class Name", right_index=True, how="left") if len(report) else report
+
+    return statistics, report, verdict(quality, suitable_labels, eligible_classes, relevant_rows)
@@ -1,11 +1,19 @@
 import streamlit as st
-import shutil
-import os
+import io
 import joblib
 import json
-from typing import List, Dict, Any
+import tempfile
+import zipfile
+from functools import lru_cache
+from typing import BinaryIO, List, Dict, Any, Optional, Tuple
+import numpy as np
+import pandas as pd
 import sklearn
+from sklearn.metrics import f1_score
 from pathlib import Path
+from core.ModelArtifact import ModelArtifact
+from core.timing_utils import span
+from utils.constants import EXPORT_COMPRESSION_LEVEL, EXPORT_EXCLUDED_FOLDERS, EXPORT_SPOOL_MB, EXPORT_TEMPLATE_CACHE
 
 
 def generate_requirements() -> List[str]:
@@ -38,41 +46,141 @@ def generate_requirements() -> List[str]:
     requirements.append(openpyxl_version)
     requirements.append(pandas_version)   
 
+    try:
+        import pyarrow
+        requirements.append("pyarrow==" + pyarrow.__version__)
+    except ImportError:
+        pass
+
     return requirements
 
 
-def delete_cache(path, folders=['.ipynb_checkpoints', "__pycache__"]):
+def template_files(path_to_template: str, path_to_core: str) -> Tuple[Tuple[str, str, int, int], ...]:
+    """
+    lists static files of the application, skipping caches such as __pycache__
+
+    :param path_to_template: path to the folder with streamlit template and utility files
+    :param path_to_core: path to the folder with core files, stored under core/ in the application
 
-    for folder in folders:
-        _ = [shutil.rmtree(d) for d in list(path.glob(f'**/{folder}'))]
+    :return tuple of (path to the file, name in the archive, modification time in ns, size in bytes),
+        so the tuple changes whenever a template file does
+    """
+    files = []
+    for folder, prefix in ((Path(path_to_template), ""), (Path(path_to_core), "core/")):
+        for path in sorted(folder.rglob("*")):
+            relative = path.relative_to(folder)
+            if not path.is_file() or any(part in EXPORT_EXCLUDED_FOLDERS for part in relative.parts):
+                continue
+            stat = path.stat()
+            files.append((path.as_posix(), prefix + relative.as_posix(), stat.st_mtime_ns, stat.st_size))
 
+    return tuple(files)
 
-def create_app(model: sklearn.pipeline.Pipeline, log: Dict[str, Any], path_to_template: str, path_to_core: str) -> None:
+
+@lru_cache(maxsize=EXPORT_TEMPLATE_CACHE)
+def template_archive(files: Tuple[Tuple[str, str, int, int], ...], compression_level: int) -> bytes:
+    """
+    zips static files of the application once, later exports start from a copy of these bytes
+
+    :param files: files listed by template_files
+    :param compression_level: deflate level from 0 to 9
+
+    :return zip archive with the static files
+    """
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=compression_level) as archive:
+        for path, name, _, _ in files:
+            archive.write(path, name)
+
+    return buffer.getvalue()
+
+
+def folder_size(path: str) -> int:
+    """
+    computes total size of files in a folder
+
+    :param path: path to the folder
+
+    :return size in bytes
+    """
+    return sum(f.stat().st_size for f in Path(path).rglob("*") if f.is_file())
+
+
+def export_tradeoff(model: sklearn.pipeline.Pipeline, X: pd.Series, y: List[Any], prune_levels: List[float]) -> pd.DataFrame:
+    """
+    saves the model with different pruning levels and measures artifact size and quality on held-out data
+
+    :param model: trained sklearn pipeline that passes ModelArtifact.supports
+    :param X: held-out texts
+    :param y: held-out targets
+    :param prune_levels: fractions of the smallest coefficients to drop
+
+    :return dataframe with one row per export variant: size, number of terms, weighted f1
+        and share of predictions that match the full model
+    """
+    reference = model.predict(X)
+    rows = []
+
+    for prune in [None] + list(prune_levels):
+        with tempfile.TemporaryDirectory() as path:
+            ModelArtifact.save(model, path, prune=prune)
+            artifact = ModelArtifact(path, mmap_mode=None)
+            predictions = artifact.predict(X)
+            rows.append({
+                "export": "full" if prune is None else f"compact, prune {prune:.0%}",
+                "size, MB": folder_size(path) / 2 ** 20,
+                "terms": artifact.params["n_features"],
+                "f1 weighted": f1_score(y, predictions, average="weighted"),
+                "agreement with full model": np.mean(predictions == reference)
+            })
+
+    return pd.DataFrame(rows)
+
+
+@span("create_app")
+def create_app(
+    model: sklearn.pipeline.Pipeline,
+    log: Dict[str, Any],
+    path_to_template: str,
+    path_to_core: str,
+    prune: Optional[float] = None,
+    compression_level: int = EXPORT_COMPRESSION_LEVEL
+    ) -> BinaryIO:
     """
     assembles zip archive with working streamlit application with your model
 
-    :param model: trained sklearn pipeline that can be saved with the help of joblib
+    The archive is built in memory, spilling to a private temporary file above EXPORT_SPOOL_MB,
+    so concurrent exports never share a path. Static template files are zipped once and reused
+    until one of them changes, only the model, requirements and log are compressed on every export
+
+    :param model: trained sklearn pipeline, tfidf + linear model pipelines are stored as memory-mapped arrays,
+                  anything else is saved with the help of joblib
     :param log: data analysis result as well as model metrics
     :param path_to_template: path to the folder where relevant streamlit template and utility files are stored
     :param path_to_core: path to the folder where core files are stored
-    """
+    :param prune: if set, the model is exported compactly with this fraction of the smallest coefficients dropped,
+                  see ModelArtifact.save
+    :param compression_level: deflate level from 0 (store) to 9 (smallest)
 
-    temporary_dir = Path("temp/")
-
-    if os.path.exists(temporary_dir):
-        shutil.rmtree(temporary_dir)
-        
-    shutil.copytree(src=path_to_template, dst=temporary_dir)
-    shutil.copytree(src=path_to_core, dst=temporary_dir / "core")
-    
-    joblib.dump(model, temporary_dir / "model.joblib")
-    requirements = generate_requirements()
-    with open(temporary_dir / "requirements.txt", "w") as f:
-        f.write("\n".join(requirements))
-    with open(temporary_dir / "log.json", "w") as f:
-        json.dump(log, f, indent=4, ensure_ascii=False)
-    
-    delete_cache(temporary_dir)
-
-    shutil.make_archive("application", "zip", temporary_dir)
-    shutil.rmtree(temporary_dir)
+    :return file object with the zip archive, positioned at its start
+    """
+    with span("zip template"):
+        static = template_archive(template_files(path_to_template, path_to_core), compression_level)
+        result = tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_MB * 2 ** 20)
+        result.write(static)
+        result.seek(0)
+
+    with zipfile.ZipFile(result, "a", compression=zipfile.ZIP_DEFLATED, compresslevel=compression_level) as archive:
+        with span("save model"):
+            if ModelArtifact.supports(model):
+                ModelArtifact.write(model, lambda name: archive.open(f"model/{name}", "w"), prune=prune)
+            else:
+                with archive.open("model.joblib", "w") as f:
+                    joblib.dump(model, f)
+
+        with span("write requirements and log"):
+            archive.writestr("requirements.txt", "\n".join(generate_requirements()))
+            archive.writestr("log.json", json.dumps(log, indent=4, ensure_ascii=False))
+
+    result.seek(0)
+    return result
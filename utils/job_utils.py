@@ -0,0 +1,163 @@
+import multiprocessing
+import os
+import threading
+import traceback
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Tuple
+
+from core.parallel_utils import CORES_VARIABLE, ParallelPlan
+from core.timing_utils import collected_spans, reset_spans
+from utils.constants import JOB_HISTORY, JOB_MAX_WORKERS
+
+
+class JobCancelled(Exception):
+    """
+    raised inside a job by its progress callback once the job is cancelled
+    """
+
+
+def run_job(
+    key: str,
+    function: Callable[..., Any],
+    kwargs: Dict[str, Any],
+    progress: Dict[str, Tuple[int, int]],
+    cancelled: Dict[str, bool],
+    cores: int
+    ) -> Tuple[Any, List[Dict[str, Any]]]:
+    """
+    runs a job in a worker process
+
+    The function gets a `progress` callback that publishes the number of finished steps
+    and raises JobCancelled when the job was cancelled, so long jobs stop after the current step
+
+    :param key: job key
+    :param function: function accepting `progress` keyword argument
+    :param kwargs: keyword arguments of the function
+    :param progress: shared job key -> (finished steps, total steps)
+    :param cancelled: shared job key -> cancellation flag
+    :param cores: share of the cores of one job, parallel code inside the job plans for it
+
+    :return result of the function and timing spans collected in the worker
+    """
+    def report(done: int, total: int) -> None:
+        if cancelled.get(key, False):
+            raise JobCancelled(key)
+        progress[key] = (done, total)
+
+    os.environ[CORES_VARIABLE] = str(cores)
+    reset_spans()
+    report(0, 1)
+    result = function(progress=report, **kwargs)
+
+    return result, [item.to_dict() for item in collected_spans()]
+
+
+class JobRunner:
+    """
+    Runs training and audit jobs in a pool of worker processes.
+
+    Jobs are keyed by a fingerprint of their inputs, so a job submitted twice, from a rerun or another session,
+    is run once and its result is shared. The runner outlives reruns and page switches, pages poll `status`
+    and pick up `result` when the job is done. At most `max_workers` jobs run at once, the rest wait in the queue.
+    Every job may use its share of the cores, so parallel folds of concurrent jobs do not fight for the same cores.
+    Finished jobs are kept for the last `history` keys.
+    """
+
+    def __init__(self, max_workers: int = JOB_MAX_WORKERS, history: int = JOB_HISTORY):
+
+        context = multiprocessing.get_context("spawn")
+        self.history = history
+        self.cores = ParallelPlan(n_tasks=max_workers).n_threads
+        self._executor = ProcessPoolExecutor(max_workers=max_workers, mp_context=context)
+        self._manager = context.Manager()
+        self._progress = self._manager.dict()
+        self._cancelled = self._manager.dict()
+        self._jobs: "OrderedDict[str, Future]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, key: str, function: Callable[..., Any], **kwargs: Any) -> str:
+        """
+        queues a job unless a job with the same key is queued, running or done
+
+        :param key: fingerprint of the job inputs
+        :param function: picklable function accepting `progress` keyword argument
+        :param kwargs: keyword arguments of the function
+
+        :return job key
+        """
+        with self._lock:
+            if key in self._jobs and self.status(key)["status"] not in ("failed", "cancelled"):
+                self._jobs.move_to_end(key)
+                return key
+
+            self._cancelled.pop(key, None)
+            self._progress.pop(key, None)
+            self._jobs[key] = self._executor.submit(
+                run_job, key, function, kwargs, self._progress, self._cancelled, self.cores
+            )
+
+            finished = [name for name, job in self._jobs.items() if job.done()]
+            for name in finished[:max(len(self._jobs) - self.history, 0)]:
+                del self._jobs[name]
+                self._progress.pop(name, None)
+                self._cancelled.pop(name, None)
+
+        return key
+
+    def status(self, key: str) -> Dict[str, Any]:
+        """
+        :param key: job key
+
+        :return dictionary with status ('unknown', 'queued', 'running', 'done', 'failed' or 'cancelled'),
+            progress from 0 to 1, number of finished and total steps and error text of a failed job
+        """
+        job = self._jobs.get(key)
+        done, total = self._progress.get(key, (0, 1))
+        status = {"status": "unknown", "progress": done / max(total, 1), "done": done, "total": total, "error": None}
+
+        if job is None:
+            return status
+
+        if job.cancelled():
+            status["status"] = "cancelled"
+        elif not job.done():
+            status["status"] = "running" if key in self._progress else "queued"
+        elif isinstance(job.exception(), JobCancelled):
+            status["status"] = "cancelled"
+        elif job.exception() is not None:
+            status["status"] = "failed"
+            status["error"] = "".join(traceback.format_exception_only(type(job.exception()), job.exception())).strip()
+        else:
+            status["status"] = "done"
+            status["progress"] = 1.0
+
+        return status
+
+    def result(self, key: str) -> Tuple[Any, List[Dict[str, Any]]]:
+        """
+        :param key: key of a finished job
+
+        :return result of the job and timing spans collected in the worker
+        """
+        return self._jobs[key].result()
+
+    def cancel(self, key: str) -> None:
+        """
+        drops a queued job or asks a running one to stop after its current step
+
+        :param key: job key
+        """
+        job = self._jobs.get(key)
+        if job is None or job.cancel():
+            return
+        self._cancelled[key] = True
+
+    def shutdown(self) -> None:
+        """
+        cancels queued jobs, waits for the running ones and stops the workers
+        """
+        for key in list(self._jobs):
+            self.cancel(key)
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        self._manager.shutdown()
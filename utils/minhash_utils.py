@@ -0,0 +1,230 @@
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from joblib import Parallel, delayed
+from nptyping import NDArray
+from core.parallel_utils import ParallelPlan
+from scipy.sparse.csgraph import connected_components
+from utils.constants import MINHASH_BLOCK_SHINGLES, MINHASH_PERMUTATIONS, MINHASH_SHINGLE_SIZE
+
+MIX = np.uint64(0x9E3779B97F4A7C15)
+BASE = np.uint64(0x100000001B3)
+VALUE_BITS = 25
+VALUE_MASK = (1 << VALUE_BITS) - 1
+
+
+def normalise(text: str) -> str:
+    """
+    lowercases text and collapses whitespace, so copies differing only in casing or spacing get the same shingles
+    """
+    return " ".join(text.lower().split())
+
+
+def shingle_hashes(texts: List[str], shingle_size: int) -> Tuple[NDArray, NDArray]:
+    """
+    hashes all character shingles of the texts at once
+
+    Texts are concatenated as arrays of code points and every window of `shingle_size` characters
+    is hashed with a polynomial hash, windows crossing the end of a text are padded with zeros,
+    so a text of n characters has n shingles
+
+    :param texts: normalised non-empty texts
+    :param shingle_size: number of characters in a shingle
+
+    :return uint64 hashes of all shingles and index of the first shingle of every text
+    """
+    padding = "\0" * (shingle_size - 1)
+    codes = np.frombuffer(padding.join(texts + [""]).encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    lengths = np.fromiter(map(len, texts), dtype=np.int64, count=len(texts))
+    starts = np.concatenate([[0], np.cumsum(lengths + shingle_size - 1)[:-1]])
+
+    n_windows = len(codes) - shingle_size + 1
+    hashes = np.zeros(n_windows, dtype=np.uint64)
+    for offset in range(shingle_size):
+        hashes = hashes * BASE + codes[offset:offset + n_windows]
+    hashes = (hashes ^ (hashes >> np.uint64(29))) * MIX
+
+    positions = np.repeat(starts, lengths) + (np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths))
+    offsets = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+
+    return hashes[positions], offsets
+
+
+def minhash_block(texts: List[str], n_permutations: int, shingle_size: int) -> NDArray:
+    """
+    computes MinHash signatures of a block of texts with one permutation hashing
+
+    Every shingle is hashed once, the hash picks one of `n_permutations` bins and the smallest value in
+    every bin becomes a signature value, so the cost does not grow with the signature length.
+    Empty bins of short texts borrow the value of the next non-empty bin together with the distance to it,
+    which keeps the share of equal values an unbiased estimate of Jaccard similarity
+
+    :param texts: normalised non-empty texts
+    :param n_permutations: signature length
+    :param shingle_size: number of characters in a shingle
+
+    :return uint32 array of shape (n_texts, n_permutations)
+    """
+    hashes, offsets = shingle_hashes(texts, shingle_size)
+    lengths = np.diff(np.append(offsets, len(hashes)))
+
+    slots = np.repeat(np.arange(len(texts), dtype=np.uint64), lengths) * np.uint64(n_permutations)
+    slots += (hashes >> np.uint64(32)) % np.uint64(n_permutations)
+    keys = np.sort((slots << np.uint64(VALUE_BITS)) | (hashes & np.uint64(VALUE_MASK)))
+
+    slots = keys >> np.uint64(VALUE_BITS)
+    first = np.concatenate([[True], slots[1:] != slots[:-1]])
+    signatures = np.zeros(len(texts) * n_permutations, dtype=np.uint32)
+    filled = np.zeros(len(texts) * n_permutations, dtype=bool)
+    signatures[slots[first].astype(np.int64)] = (keys[first] & np.uint64(VALUE_MASK)).astype(np.uint32)
+    filled[slots[first].astype(np.int64)] = True
+
+    signatures = np.tile(signatures.reshape(len(texts), n_permutations), 2)
+    filled = np.tile(filled.reshape(len(texts), n_permutations), 2)
+    columns = np.arange(2 * n_permutations)
+    source = np.minimum.accumulate(np.where(filled, columns, 2 * n_permutations)[:, ::-1], axis=1)[:, ::-1]
+    source = source[:, :n_permutations]
+    distance = (source - columns[:n_permutations]).astype(np.uint32)
+
+    return np.take_along_axis(signatures, source, axis=1) | (distance << np.uint32(VALUE_BITS))
+
+
+def minhash_signatures(
+    texts: List[str],
+    n_permutations: int = MINHASH_PERMUTATIONS,
+    shingle_size: int = MINHASH_SHINGLE_SIZE,
+    cores: Optional[int] = None
+    ) -> NDArray:
+    """
+    computes MinHash signatures of texts in parallel blocks
+
+    :param texts: normalised non-empty texts
+    :param n_permutations: signature length, at most 128
+    :param shingle_size: number of characters in a shingle
+    :param cores: number of cores to use, all available cores by default
+
+    :return uint32 array of shape (n_texts, n_permutations)
+    """
+    lengths = np.cumsum([len(text) for text in texts])
+    bounds = np.searchsorted(lengths, np.arange(0, lengths[-1] if len(lengths) else 0, MINHASH_BLOCK_SHINGLES))
+    bounds = np.unique(np.append(bounds, len(texts)))
+
+    plan = ParallelPlan(n_tasks=len(bounds) - 1, cores=cores)
+    blocks = Parallel(n_jobs=plan.n_workers)(
+        delayed(minhash_block)(texts[start:end], n_permutations, shingle_size)
+        for start, end in zip(bounds[:-1], bounds[1:])
+    )
+
+    return np.vstack(blocks) if blocks else np.empty((0, n_permutations), dtype=np.uint32)
+
+
+def lsh_params(threshold: float, n_permutations: int) -> Tuple[int, int]:
+    """
+    picks number of bands and rows per band whose collision curve is closest to the threshold
+
+    Two texts with Jaccard similarity s share at least one band with probability 1 - (1 - s ** rows) ** bands,
+    the pair that minimises the area of false positives below the threshold plus false negatives above it is chosen
+
+    :param threshold: Jaccard similarity from which texts count as near duplicates
+    :param n_permutations: signature length
+
+    :return number of bands and rows in a band
+    """
+    similarity = np.linspace(0, 1, 201)
+    best, best_error = (1, n_permutations), np.inf
+
+    for rows in range(1, n_permutations + 1):
+        bands = n_permutations // rows
+        probability = 1 - (1 - similarity ** rows) ** bands
+        error = np.where(similarity < threshold, probability, 1 - probability).mean()
+        if error < best_error:
+            best, best_error = (bands, rows), error
+
+    return best
+
+
+def find_near_duplicates(
+    texts: List[str],
+    threshold: float,
+    n_permutations: int = MINHASH_PERMUTATIONS,
+    shingle_size: int = MINHASH_SHINGLE_SIZE,
+    cores: Optional[int] = None
+    ) -> NDArray:
+    """
+    groups texts whose character shingles have Jaccard similarity of at least `threshold`
+
+    Texts are normalised, turned into MinHash signatures and split into LSH bands. Texts that share a band
+    bucket are compared with the first text of the bucket by the share of equal signature values,
+    confirmed pairs are joined into clusters by connected components. Work grows linearly with the number of texts
+    plus the size of the buckets instead of comparing all pairs. Empty texts are never grouped
+
+    :param texts: list of texts
+    :param threshold: Jaccard similarity from which texts count as near duplicates
+    :param n_permutations: signature length, longer signatures give more exact similarity estimates
+    :param shingle_size: number of characters in a shingle
+    :param cores: number of cores to use, all available cores by default
+
+    :return cluster id of every text, texts without near duplicates get their own cluster
+    """
+    normalised = [normalise(text) if isinstance(text, str) else "" for text in texts]
+    present = np.flatnonzero([len(text) > 0 for text in normalised])
+    signatures = minhash_signatures([normalised[i] for i in present], n_permutations, shingle_size, cores)
+
+    bands, rows = lsh_params(threshold, n_permutations)
+    sources, targets = [], []
+
+    for band in range(bands):
+        keys = np.zeros(len(present), dtype=np.uint64)
+        for column in signatures[:, band * rows:(band + 1) * rows].T:
+            keys = (keys ^ column.astype(np.uint64)) * BASE
+
+        order = np.argsort(keys, kind="stable")
+        first = np.concatenate([[True], keys[order][1:] != keys[order][:-1]]) if len(order) else np.array([], dtype=bool)
+        leaders = order[np.flatnonzero(first)[np.cumsum(first) - 1]]
+
+        candidates = order[~first]
+        candidate_leaders = leaders[~first]
+        agreement = (signatures[candidates] == signatures[candidate_leaders]).mean(axis=1)
+        confirmed = agreement >= threshold
+
+        sources.append(candidates[confirmed])
+        targets.append(candidate_leaders[confirmed])
+
+    sources = np.concatenate(sources) if sources else np.array([], dtype=np.int64)
+    targets = np.concatenate(targets) if targets else np.array([], dtype=np.int64)
+
+    graph = sp.coo_matrix((np.ones(len(sources)), (sources, targets)), shape=(len(present), len(present)))
+    _, components = connected_components(graph, directed=False)
+
+    clusters = np.arange(len(texts)) + len(present)
+    clusters[present] = components
+    _, clusters = np.unique(clusters, return_inverse=True)
+
+    return clusters
+
+
+def describe_clusters(texts: pd.Series, y: pd.Series, clusters: NDArray) -> pd.DataFrame:
+    """
+    summarises clusters of near duplicates
+
+    :param texts: texts the clusters were found on
+    :param y: targets
+    :param clusters: cluster id of every text
+
+    :return dataframe with one row per cluster of two or more texts: size, number of distinct labels,
+        conflicting labels flag and an example text, largest clusters first
+    """
+    df = pd.DataFrame({"cluster": clusters, "text": texts.to_numpy(), "target": y.to_numpy()})
+    grouped = df.groupby("cluster")
+
+    report = pd.DataFrame({
+        "size": grouped.size(),
+        "labels": grouped["target"].nunique(),
+        "example": grouped["text"].first()
+    })
+    report = report[report["size"] > 1]
+    report["conflicting labels"] = report["labels"] > 1
+
+    return report.sort_values(["size", "labels"], ascending=False)
@@ -0,0 +1,140 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from nptyping import NDArray
+from core.timing_utils import span
+from utils.data_utils import clean_near_duplicates
+
+BASE = np.uint64(0x100000001B3)
+
+
+def hash_rows(column_hashes: Dict[str, NDArray], columns: List[str]) -> NDArray:
+    """
+    combines hashes of the columns into one 64-bit hash per row
+
+    :param column_hashes: column name -> uint64 hash of every value
+    :param columns: columns to combine, order matters
+
+    :return uint64 array
+    """
+    hashes = np.zeros(len(column_hashes[columns[0]]), dtype=np.uint64)
+    for column in columns:
+        hashes = (hashes ^ column_hashes[column]) * BASE
+    return hashes
+
+
+def first_occurrences(hashes: NDArray) -> NDArray:
+    """
+    :param hashes: uint64 row hashes
+
+    :return boolean mask of rows whose hash was not seen before, as ~duplicated(keep='first')
+    """
+    return ~pd.Series(hashes, copy=False).duplicated().to_numpy()
+
+
+@span("profile_data")
+def profile_data(
+    df: pd.DataFrame,
+    text_columns: List[str],
+    target_column: str,
+    threshold: int,
+    near_duplicate_threshold: Optional[float] = None,
+    near_duplicate_strategy: str = "drop",
+    drop_conflicting: bool = False
+    ) -> Tuple[Dict[str, Any], Optional[pd.DataFrame], pd.DataFrame]:
+    """
+    computes all EDA statistics with one hash per column and one copy of the data
+
+    Every column is factorised once and its codes are hashed, row hashes for all columns and for the relevant
+    columns are combined from them. Duplicates are found on the row hashes, classes are counted on the factorised
+    target of the rows left, and only the rows that pass all the checks are copied. Values are compared the way
+    df.duplicated compares them, since it factorises columns as well: 1, 1.0 and True are equal, 1 and '1'
+    are not, None and NaN are equal. Numbers are the same as of clean_duplicates, clean_relevant_duplicates,
+    check_value_counts and compute_percentage_of_suitable_data run one after another, the cleaned dataframe has
+    the same rows, columns and index, unless two different rows collide on their 64-bit hashes
+
+    :param df: pd.DataFrame which is going to be used for modeling
+    :param text_columns: list of column names that contain text relevant to the task
+    :param target_column: str, column where markup is stored
+    :param threshold: minimal observation count
+    :param near_duplicate_threshold: Jaccard similarity from which rows count as near duplicates,
+        near duplicates are kept when None
+    :param near_duplicate_strategy: 'drop' or 'collapse', see clean_near_duplicates
+    :param drop_conflicting: removes near duplicate clusters with conflicting labels
+
+    :return statistics, near duplicate clusters or None and cleaned dataframe
+
+    Example
+
+    >>> df
+            text        target  age
+        0    aaaaaa       1     12
+        1      eeee       1     124
+        2   ggggggg       1     0
+        3     hhhhh       0     8
+        4      ffff       1     10
+        5     aaaaaa      1     12
+        6     hhhhh       0     NaN
+        7    ccccc        NaN   NaN
+    >>> statistics, clusters, df = profile_data(df=df, text_columns=['text'], target_column='target', threshold=1)
+    >>> statistics
+    {'full_length': 8, 'cnt_duplicates': 1, 'relevant_length': 7, 'cnt_relevant_duplicates': 1,
+     'cnt_near_duplicates': 0, 'v_c': 50.0, 'na_check': 100.0}
+    >>> df
+            text    target
+        0   aaaaaa     1.0
+        1     eeee     1.0
+        2  ggggggg     1.0
+        4     ffff     1.0
+    """
+    relevant_columns = text_columns + [target_column]
+    column_hashes = {
+        column: pd.util.hash_array(pd.factorize(df[column])[0].astype(np.int64), categorize=False)
+        for column in df.columns
+    }
+
+    rows = np.flatnonzero(first_occurrences(hash_rows(column_hashes, list(df.columns))))
+    full_length, relevant_length = len(df), len(rows)
+
+    if set(df.columns) != set(relevant_columns):
+        rows = rows[first_occurrences(hash_rows(column_hashes, relevant_columns)[rows])]
+
+    statistics = {
+        "full_length": full_length,
+        "cnt_duplicates": full_length - relevant_length,
+        "relevant_length": relevant_length,
+        "cnt_relevant_duplicates": relevant_length - len(rows),
+        "cnt_near_duplicates": 0
+    }
+
+    clusters = None
+    if near_duplicate_threshold is None:
+        codes, _ = pd.factorize(df[target_column])
+        codes = codes[rows]
+    else:
+        statistics["cnt_near_duplicates"], clusters, df = clean_near_duplicates(
+            df=df[relevant_columns].take(rows),
+            text_columns=text_columns,
+            target_column=target_column,
+            threshold=near_duplicate_threshold,
+            strategy=near_duplicate_strategy,
+            drop_conflicting=drop_conflicting
+        )
+        rows = np.arange(len(df))
+        codes, _ = pd.factorize(df[target_column])
+
+    counts = np.bincount(codes[codes >= 0], minlength=codes.max() + 1 if len(codes) else 0)
+    present = counts > 0
+    eligible = counts > threshold
+    labelled = codes >= 0
+    labelled[labelled] = eligible[codes[labelled]]
+    keep = np.flatnonzero(labelled)
+
+    statistics["v_c"] = eligible.sum() / present.sum() * 100 if present.any() else 0.0
+
+    df = df[relevant_columns].take(rows[keep])
+    df.index = keep
+    statistics["na_check"] = (1 - df[target_column].isna().sum() / full_length) * 100
+
+    return statistics, clusters, df
@@ -0,0 +1,145 @@
+from typing import Any, List, Mapping
+
+import numpy as np
+import pandas as pd
+
+from core.text_utils import assemble_text
+from utils.cache_utils import fingerprint
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+STRING_DTYPE = "string[pyarrow]" if pyarrow is not None else "string"
+PREVIEW_SIZE = 5
+
+
+class SessionDataset:
+    """
+    Cleaned texts and labels kept in the session state of one user.
+
+    Texts are stored once as an arrow-backed string array, a single text column that is already stored this way
+    is kept as is, so the session holds a view of the cached cleaned frame instead of a copy.
+    Labels are a categorical: small integer codes plus one copy of every class. `X` and `y` give the texts and labels
+    in the form training, label audit and export expect, the cleaned frame itself is not kept, only its first rows
+    """
+
+    def __init__(
+        self,
+        texts: pd.Series,
+        labels: pd.Series,
+        text_columns: List[str],
+        target_column: str,
+        preview: pd.DataFrame
+        ):
+        """
+        :param texts: arrow-backed strings, one per row
+        :param labels: categorical series of targets named after the target column
+        :param text_columns: list of column names the texts were joined from
+        :param target_column: column where markup is stored
+        :param preview: first rows of the cleaned frame
+        """
+        self.texts = texts
+        self.labels = labels
+        self.text_columns = text_columns
+        self.target_column = target_column
+        self.preview = preview
+        self._key = None
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, text_columns: List[str], target_column: str) -> "SessionDataset":
+        """
+        joins text columns and encodes targets of the cleaned frame
+
+        :param df: cleaned dataframe
+        :param text_columns: list of column names that contain text relevant to the task
+        :param target_column: column where markup is stored
+
+        :return dataset
+
+        Example
+
+        >>> dataset = SessionDataset.from_frame(df, ["text"], "target")
+        >>> dataset.X.dtype, dataset.labels.cat.codes.dtype
+        (string[pyarrow], dtype('int8'))
+        """
+        column = df[text_columns[0]] if len(text_columns) == 1 else None
+        if column is not None and column.dtype == STRING_DTYPE and not column.hasnans:
+            texts = column.rename(None)
+        else:
+            texts = assemble_text(df=df, text_columns=text_columns).astype(STRING_DTYPE)
+
+        labels = df[target_column].astype("category").cat.remove_unused_categories()
+
+        return cls(
+            texts=texts,
+            labels=labels,
+            text_columns=text_columns,
+            target_column=target_column,
+            preview=df.head(PREVIEW_SIZE).copy()
+        )
+
+    def __len__(self) -> int:
+
+        return len(self.texts)
+
+    @property
+    def X(self) -> pd.Series:
+        """
+        texts as a series of strings
+        """
+        return self.texts
+
+    @property
+    def y(self) -> np.ndarray:
+        """
+        labels decoded from the categorical codes, classes are shared between rows rather than copied
+        """
+        return self.labels.to_numpy()
+
+    @property
+    def classes(self) -> pd.Index:
+
+        return self.labels.cat.categories
+
+    @property
+    def key(self) -> str:
+        """
+        fingerprint of texts and labels used as a cache key, computed once
+        """
+        if self._key is None:
+            self._key = fingerprint(self.texts, self.labels.cat.codes.to_numpy().tobytes(), list(self.classes))
+        return self._key
+
+    def memory_usage(self) -> pd.Series:
+        """
+        :return bytes taken by texts, labels and preview
+        """
+        return pd.Series({
+            "texts": self.texts.memory_usage(index=False, deep=True),
+            "labels": self.labels.memory_usage(index=False, deep=True),
+            "preview": self.preview.memory_usage(index=True, deep=True).sum(),
+        })
+
+
+def session_memory(state: Mapping[str, Any]) -> pd.DataFrame:
+    """
+    estimates memory held by the datasets and dataframes in the session state of one user
+
+    :param state: st.session_state or any mapping
+
+    :return dataframe with megabytes per stored object, datasets are split into their parts
+    """
+    sizes = {}
+    for name, value in state.items():
+        if isinstance(value, SessionDataset):
+            for part, size in value.memory_usage().items():
+                sizes[f"{name}: {part}"] = size
+        elif isinstance(value, (pd.DataFrame, pd.Series)):
+            sizes[name] = np.sum(value.memory_usage(deep=True))
+
+    table = pd.DataFrame({"MB": pd.Series(sizes, dtype=float) / 2 ** 20})
+    if len(table):
+        table.loc["total"] = table["MB"].sum()
+    return table
@@ -0,0 +1,95 @@
+import pandas as pd
+import streamlit as st
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+from core.timing_utils import flatten_spans
+from utils.constants import JOB_POLL_SECONDS
+from utils.job_utils import JobRunner
+from utils.session_utils import session_memory
+
+
+def render_timings(timings: Dict[str, List[Dict[str, Any]]]) -> None:
+    """
+    shows time and memory spent on every stage of every page in the sidebar
+
+    :param timings: page name -> list of span dictionaries, see core.timing_utils.Span.to_dict
+    """
+    if not timings:
+        return
+
+    with st.sidebar.expander("Timing breakdown"):
+        for page, spans in timings.items():
+            if not spans:
+                continue
+            st.caption(page)
+            table = pd.DataFrame(flatten_spans(spans)).set_index("name")
+            table.columns = ["wall, s", "CPU, s", "peak RSS +, MB"]
+            st.dataframe(table.style.format(precision=2))
+
+
+def render_memory(state: Mapping[str, Any]) -> None:
+    """
+    shows memory held by the data of the current session in the sidebar
+
+    :param state: session state
+    """
+    table = session_memory(state)
+    if not len(table):
+        return
+
+    with st.sidebar.expander("Session memory"):
+        st.dataframe(table.style.format(precision=2))
+
+
+def render_job(
+    runner: JobRunner,
+    key: str,
+    label: str,
+    function: Callable[..., Any],
+    **kwargs: Any
+    ) -> Optional[Tuple[Any, List[Dict[str, Any]]]]:
+    """
+    runs a function as a background job and shows its progress with a cancel button
+
+    The job is submitted on the first call, later reruns only poll it, so it keeps running when the user
+    switches pages and its result is picked up on the next visit. Failed and cancelled jobs can be restarted
+
+    :param runner: job runner
+    :param key: fingerprint of the job inputs
+    :param label: what the job does, e.g. "Training model"
+    :param function: picklable function accepting `progress` keyword argument
+    :param kwargs: keyword arguments of the function
+
+    :return result of the job and its timing spans when the job is done, None otherwise
+    """
+    status = runner.status(key)
+
+    if status["status"] == "unknown":
+        runner.submit(key, function, **kwargs)
+    elif status["status"] == "done":
+        return runner.result(key)
+    elif status["status"] in ("failed", "cancelled"):
+        if status["status"] == "failed":
+            st.error(f"{label} failed: {status['error']}")
+        else:
+            st.warning(f"{label} was cancelled")
+        if st.button("Restart", key=f"restart {key}"):
+            runner.submit(key, function, **kwargs)
+            st.rerun()
+        return None
+
+    @st.fragment(run_every=JOB_POLL_SECONDS)
+    def poll() -> None:
+        status = runner.status(key)
+        if status["status"] not in ("queued", "running"):
+            st.rerun()
+
+        text = f"{label}: waiting for a free worker" if status["status"] == "queued" \
+            else f"{label}: {status['done']} of {status['total']} steps"
+        st.progress(status["progress"], text=text)
+
+        if st.button("Cancel", key=f"cancel {key}"):
+            runner.cancel(key)
+            st.rerun()
+
+    poll()
+    return None